@@ -0,0 +1,236 @@
+"""
+Move historical rows out of the hot appointment tables into
+ArchivedAvailability / ArchivedAppointment.
+
+Two kinds of row are archived once they are past their horizon:
+- availabilities that ended more than APPOINTMENT_ARCHIVE_SLOT_DAYS ago
+  and never got an appointment;
+- appointments in a final status whose slot started more than
+  APPOINTMENT_ARCHIVE_APPOINTMENT_DAYS ago, together with their slot and
+  their action logs (kept as JSON on the archived row).
+
+Appointments that an Order or ChatRoom points at stay in the hot table.
+Both are one-to-one with CASCADE, so moving the row would delete the
+payment or the conversation. Appointments another hot appointment was
+rescheduled from stay too, until that one is archived.
+
+Each chunk is copied and deleted in one transaction, with its rows locked
+SKIP LOCKED so the periodic task and a manual run can overlap. Hot rows
+are removed with raw DELETEs. Otherwise the model signals would recount
+the dashboards' summary days, emptying their history, and drop the
+returning-patient flag of patients whose history just moved.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from .availability_calendar import invalidate_availability_calendar
+from .models import (
+    Appointment,
+    AppointmentActionLog,
+    AppointmentAvailability,
+    ArchivedAppointment,
+    ArchivedAvailability,
+)
+
+DEFAULT_SLOT_DAYS = 30
+DEFAULT_APPOINTMENT_DAYS = 365
+DEFAULT_CHUNK_SIZE = 500
+
+# Statuses an appointment never leaves
+FINAL_STATUSES = (
+    'completed',
+    'no_show',
+    'cancelled_by_patient',
+    'cancelled_by_doctor',
+    'cancelled_by_admin',
+    'payment_expired',
+    'rescheduled',
+)
+
+HOT_MODELS = (AppointmentAvailability, Appointment, AppointmentActionLog)
+
+_SLOT_FIELDS = ('id', 'doctor_id', 'start_time', 'end_time', 'slot_type', 'timezone', 'is_booked', 'created_at')
+_APPOINTMENT_FIELDS = (
+    'id', 'availability_id', 'patient_id', 'status', 'booked_at', 'extended_info', 'note',
+    'created_by_id', 'updated_by_id', 'is_deleted', 'price', 'is_initial',
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def archivable_availabilities(cutoff):
+    return AppointmentAvailability.objects.filter(end_time__lt=cutoff, is_booked=False, appointment__isnull=True)
+
+
+def archivable_appointments(cutoff):
+    rescheduled_from = Appointment.objects.filter(rescheduled_from__isnull=False).values('rescheduled_from')
+    return Appointment.objects.filter(
+        status__in=FINAL_STATUSES,
+        availability__start_time__lt=cutoff,
+        order__isnull=True,
+        chatroom__isnull=True,
+    ).exclude(id__in=rescheduled_from)
+
+
+def _archived_slot(slot):
+    return ArchivedAvailability(**{name: getattr(slot, name) for name in _SLOT_FIELDS})
+
+
+def _archive_slot_chunk(cutoff, chunk_size):
+    with transaction.atomic():
+        slots = list(
+            archivable_availabilities(cutoff)
+            .select_for_update(skip_locked=True, of=('self',))
+            .order_by('start_time', 'id')[:chunk_size]
+        )
+        if not slots:
+            return 0
+        ArchivedAvailability.objects.bulk_create([_archived_slot(slot) for slot in slots], ignore_conflicts=True)
+        AppointmentAvailability.objects.filter(id__in=[slot.id for slot in slots])._raw_delete(connection.alias)
+        invalidate_availability_calendar(*{slot.doctor_id for slot in slots})
+    return len(slots)
+
+
+def _logs_by_appointment(appointment_ids):
+    logs = {}
+    rows = AppointmentActionLog.objects.filter(appointment_id__in=appointment_ids).order_by('performed_at', 'id').values(
+        'id', 'appointment_id', 'action_type', 'performed_by_id', 'performed_at', 'note'
+    )
+    for row in rows:
+        logs.setdefault(row.pop('appointment_id'), []).append({
+            **row, 'id': str(row['id']), 'performed_at': row['performed_at'].isoformat(),
+        })
+    return logs
+
+
+def _archive_appointment_chunk(cutoff, chunk_size):
+    with transaction.atomic():
+        appointments = list(
+            archivable_appointments(cutoff)
+            .select_related('availability')
+            .select_for_update(skip_locked=True, of=('self', 'availability'))
+            .order_by('availability__start_time', 'id')[:chunk_size]
+        )
+        if not appointments:
+            return 0
+        appointment_ids = [appointment.id for appointment in appointments]
+        logs = _logs_by_appointment(appointment_ids)
+
+        ArchivedAvailability.objects.bulk_create(
+            [_archived_slot(appointment.availability) for appointment in appointments], ignore_conflicts=True
+        )
+        ArchivedAppointment.objects.bulk_create([
+            ArchivedAppointment(
+                **{name: getattr(appointment, name) for name in _APPOINTMENT_FIELDS},
+                rescheduled_from=appointment.rescheduled_from_id,
+                logs=logs.get(appointment.id, []),
+            )
+            for appointment in appointments
+        ], ignore_conflicts=True)
+
+        # Children first so no FK is ever left dangling mid-transaction
+        AppointmentActionLog.objects.filter(appointment_id__in=appointment_ids)._raw_delete(connection.alias)
+        Appointment.objects.filter(id__in=appointment_ids)._raw_delete(connection.alias)
+        AppointmentAvailability.objects.filter(
+            id__in=[appointment.availability_id for appointment in appointments]
+        )._raw_delete(connection.alias)
+    return len(appointments)
+
+
+def hot_table_sizes():
+    """
+    {table: {"rows": exact count, "bytes": data + index size or None}} for
+    the hot tables. Sizes come from MySQL's information_schema, which is an
+    estimate until the table is next analysed; other backends report None.
+    """
+    sizes = {model._meta.db_table: {"rows": model.objects.count(), "bytes": None} for model in HOT_MODELS}
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT table_name, data_length + index_length FROM information_schema.tables "
+                f"WHERE table_schema = DATABASE() AND table_name IN ({', '.join(['%s'] * len(sizes))})",
+                list(sizes),
+            )
+            for table, size in cursor.fetchall():
+                sizes[table]["bytes"] = int(size)
+    return sizes
+
+
+def run_archive(slot_days=None, appointment_days=None, chunk_size=None, max_chunks=None, dry_run=False):
+    """
+    Archive everything past its horizon, one chunk per transaction.
+    Returns the cutoffs, rows moved (or that would be, with dry_run), how
+    many old final appointments stay hot (referenced, or left for a later
+    run by max_chunks) and the hot table sizes before and after.
+    """
+    current = now()
+    slot_cutoff = current - timedelta(days=slot_days or _setting('APPOINTMENT_ARCHIVE_SLOT_DAYS', DEFAULT_SLOT_DAYS))
+    appointment_cutoff = current - timedelta(
+        days=appointment_days or _setting('APPOINTMENT_ARCHIVE_APPOINTMENT_DAYS', DEFAULT_APPOINTMENT_DAYS)
+    )
+    chunk_size = chunk_size or _setting('APPOINTMENT_ARCHIVE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+    report = {
+        "slot_cutoff": slot_cutoff.isoformat(),
+        "appointment_cutoff": appointment_cutoff.isoformat(),
+        "before": hot_table_sizes(),
+    }
+    if dry_run:
+        report["availabilities"] = archivable_availabilities(slot_cutoff).count()
+        report["appointments"] = archivable_appointments(appointment_cutoff).count()
+    else:
+        for key, archive_chunk, cutoff in (
+            ("appointments", _archive_appointment_chunk, appointment_cutoff),
+            ("availabilities", _archive_slot_chunk, slot_cutoff),
+        ):
+            moved = chunks = 0
+            while max_chunks is None or chunks < max_chunks:
+                count = archive_chunk(cutoff, chunk_size)
+                moved += count
+                chunks += 1
+                if count < chunk_size:
+                    break
+            report[key] = moved
+
+    report["kept_hot"] = Appointment.objects.filter(
+        status__in=FINAL_STATUSES, availability__start_time__lt=appointment_cutoff
+    ).count() - (report["appointments"] if dry_run else 0)
+    report["after"] = report["before"] if dry_run else hot_table_sizes()
+    return report
+
+
+def _start_key(appointment):
+    return appointment.availability.start_time, appointment.id
+
+
+class ReadThrough:
+    """
+    Hot and archived appointments as one sequence ordered by (slot start,
+    id), for Django's Paginator: count() is two COUNTs and a slice [a:b]
+    reads at most b rows from each table. Both querysets must already be
+    ordered by ('availability__start_time', 'id').
+    """
+
+    def __init__(self, hot, archived):
+        self.hot = hot
+        self.archived = archived
+
+    def count(self):
+        return self.hot.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        stop = index.stop
+        hot = list(self.hot if stop is None else self.hot[:stop])
+        archived = list(self.archived if stop is None else self.archived[:stop])
+        return list(heapq.merge(hot, archived, key=_start_key))[index]
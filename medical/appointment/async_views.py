@@ -0,0 +1,107 @@
+"""
+Async (ASGI-native) versions of the appointment read endpoints.
+
+Same querysets, serializers, pagination and response bodies as
+ListMyAvailabilityView, ListMyAppointmentsView and AppointmentDetailView,
+but every database read goes through the async ORM (aget, acount, async
+iteration), so a slow client holds a coroutine rather than one of the
+sync thread-pool workers DRF views run on under ASGI.
+
+DRF views are sync-only, so these are plain Django class-based views that
+authenticate the JWT themselves and render with DRF's JSON encoder.
+Serialization does no I/O: optimize_for_serializer loads every nested
+relation up front.
+"""
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from users.authentication import averify_token
+from .models import Appointment, ArchivedAppointment
+from .pagination import AppointmentKeysetPagination, AvailabilityKeysetPagination
+from .queryset_optimizer import optimize_for_serializer
+from .serializers import AppointmentAvailabilitySerializer, AppointmentSerializer
+from .views import my_appointments_queryset, my_availability_queryset
+
+
+async def aauthenticate(request):
+    """Async equivalent of JWTAuthentication.authenticate; returns the user."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        raise NotAuthenticated()
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        raise NotAuthenticated()
+    return await averify_token(raw_token)
+
+
+class AsyncJWTReadView(View):
+    """Base for the async read views: GET only, JWT auth, DRF-style errors."""
+    http_method_names = ['get']
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            request.user = await aauthenticate(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.error_response(exc)
+
+    def error_response(self, exc):
+        status_code = 401 if isinstance(exc, (NotAuthenticated, AuthenticationFailed)) else exc.status_code
+        return JsonResponse({"detail": str(exc.detail)}, status=status_code)
+
+    def render(self, data, status=200):
+        return JsonResponse(data, status=status, encoder=JSONEncoder, safe=False)
+
+
+class AsyncListView(AsyncJWTReadView):
+    serializer_class = None
+    pagination_class = None
+
+    def get_queryset(self, request):
+        raise NotImplementedError
+
+    async def get(self, request):
+        drf_request = Request(request)
+        queryset = optimize_for_serializer(self.get_queryset(request), self.serializer_class)
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, drf_request, view=self)
+        data = self.serializer_class(page, many=True, context={'request': drf_request}).data
+        return self.render(paginator.get_paginated_response(data).data)
+
+
+class AsyncListMyAvailabilityView(AsyncListView):
+    serializer_class = AppointmentAvailabilitySerializer
+    pagination_class = AvailabilityKeysetPagination
+
+    def get_queryset(self, request):
+        return my_availability_queryset(request.user, request.GET)
+
+
+class AsyncListMyAppointmentsView(AsyncListView):
+    serializer_class = AppointmentSerializer
+    pagination_class = AppointmentKeysetPagination
+
+    def get_queryset(self, request):
+        return my_appointments_queryset(request.user)
+
+
+class AsyncAppointmentDetailView(AsyncJWTReadView):
+    async def get(self, request, pk):
+        queryset = optimize_for_serializer(Appointment.objects.all(), AppointmentSerializer)
+        try:
+            appointment = await queryset.aget(pk=pk)
+        except Appointment.DoesNotExist:
+            # Admins read through to the archive, as AppointmentDetailView does
+            if request.user.role != 'admin':
+                return self.render({"detail": "No Appointment matches the given query."}, status=404)
+            archived = optimize_for_serializer(ArchivedAppointment.objects.all(), AppointmentSerializer)
+            try:
+                appointment = await archived.aget(pk=pk)
+            except ArchivedAppointment.DoesNotExist:
+                return self.render({"detail": "No ArchivedAppointment matches the given query."}, status=404)
+        return self.render(AppointmentSerializer(appointment, context={'request': Request(request)}).data)
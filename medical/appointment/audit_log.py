@@ -0,0 +1,270 @@
+"""
+Write-behind buffer for AppointmentActionLog.
+
+Views call record_action() where they used to create the row. Each action
+type has a durability (APPOINTMENT_AUDIT_DURABILITY, default "buffered"):
+
+  sync      written in the caller's transaction, as before
+  buffered  queued once the caller's transaction commits and written in
+            batches (bulk_create) by the flusher
+
+and the buffer is chosen by APPOINTMENT_AUDIT_BUFFER:
+
+  sync      no buffering at all; every action is written in the request
+  memory    per-process queue drained by a daemon thread every
+            APPOINTMENT_AUDIT_FLUSH_SECONDS, or as soon as a batch fills,
+            and at interpreter exit. Lost if the process is killed.
+  redis     shared Redis list drained by the appointment.tasks
+            .flush_action_logs beat task. Survives web process restarts.
+            Each flusher claims a batch by moving it (LMOVE, Redis 6.2+)
+            into a list of its own and deletes that list only once the
+            batch is written, so overlapping flushers never drop each
+            other's entries. A claim left behind by a flusher that died is
+            put back on the queue after APPOINTMENT_AUDIT_CLAIM_TIMEOUT
+            seconds.
+
+Entries get their id and performed_at when the action happens, so the
+trail reads the same whichever path wrote it, and writing an entry twice
+(a flusher dying between insert and releasing its claim) is a no-op.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from users.models import User
+from .models import Appointment, AppointmentActionLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_SECONDS = 2.0
+DEFAULT_CLAIM_TIMEOUT = 300
+REDIS_KEY = "appointment_audit_log"
+# Sorted set of claim list keys, scored by when they were claimed
+REDIS_CLAIMS_KEY = "appointment_audit_log:claims"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _batch_size():
+    return _setting('APPOINTMENT_AUDIT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def durability(action_type):
+    if _setting('APPOINTMENT_AUDIT_BUFFER', 'sync') == 'sync':
+        return 'sync'
+    return _setting('APPOINTMENT_AUDIT_DURABILITY', {}).get(action_type, 'buffered')
+
+
+def _pk(value):
+    return getattr(value, 'pk', value)
+
+
+def _entry(appointment, action_type, performed_by=None, note=None):
+    return {
+        "id": str(uuid.uuid4()),
+        "appointment_id": str(_pk(appointment)),
+        "action_type": action_type,
+        "performed_by_id": _pk(performed_by),
+        "performed_at": now().isoformat(),
+        "note": note,
+    }
+
+
+def _row(entry):
+    return AppointmentActionLog(
+        id=uuid.UUID(entry["id"]),
+        appointment_id=uuid.UUID(entry["appointment_id"]),
+        action_type=entry["action_type"],
+        performed_by_id=entry["performed_by_id"],
+        performed_at=parse_datetime(entry["performed_at"]),
+        note=entry["note"],
+    )
+
+
+def write_entries(entries):
+    """
+    bulk_create the entries, dropping those whose appointment has been
+    deleted meanwhile and clearing a deleted performer (the FK's SET_NULL).
+    Returns the number of rows written.
+    """
+    if not entries:
+        return 0
+    appointment_ids = set(
+        Appointment.objects.filter(id__in={entry["appointment_id"] for entry in entries})
+        .values_list('id', flat=True)
+    )
+    user_ids = set(
+        User.objects.filter(id__in={entry["performed_by_id"] for entry in entries} - {None})
+        .values_list('id', flat=True)
+    )
+    rows = []
+    for entry in entries:
+        row = _row(entry)
+        if row.appointment_id not in appointment_ids:
+            logger.warning("Dropping %s action log for deleted appointment %s", row.action_type, row.appointment_id)
+            continue
+        if row.performed_by_id not in user_ids:
+            row.performed_by_id = None
+        rows.append(row)
+    AppointmentActionLog.objects.bulk_create(rows, batch_size=_batch_size(), ignore_conflicts=True)
+    return len(rows)
+
+
+class MemoryBuffer:
+    def __init__(self):
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def push(self, entries):
+        self._entries.extend(entries)
+        self._ensure_flusher()
+        if len(self._entries) >= _batch_size():
+            self._wake.set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def flush(self):
+        written = 0
+        with self._lock:
+            while self._entries:
+                batch = [self._entries.popleft() for _ in range(min(_batch_size(), len(self._entries)))]
+                try:
+                    written += write_entries(batch)
+                except Exception:
+                    # Put the batch back for the next attempt
+                    self._entries.extendleft(reversed(batch))
+                    raise
+        return written
+
+    def _ensure_flusher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="audit-log-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(_setting('APPOINTMENT_AUDIT_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS))
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing buffered appointment action logs failed")
+            finally:
+                close_old_connections()
+
+
+class RedisBuffer:
+    def __init__(self):
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+
+            url = _setting('APPOINTMENT_AUDIT_REDIS_URL', 'redis://127.0.0.1:6379')
+            self._client = redis.Redis.from_url(url)
+        return self._client
+
+    def push(self, entries):
+        self.client.rpush(REDIS_KEY, *[json.dumps(entry) for entry in entries])
+
+    def __len__(self):
+        return self.client.llen(REDIS_KEY)
+
+    def _release(self, claim):
+        pipe = self.client.pipeline()
+        pipe.delete(claim)
+        pipe.zrem(REDIS_CLAIMS_KEY, claim)
+        pipe.execute()
+
+    def _requeue(self, claim):
+        # Back to the head of the queue, in their original order
+        while self.client.lmove(claim, REDIS_KEY, 'RIGHT', 'LEFT') is not None:
+            pass
+        self._release(claim)
+
+    def _requeue_stale_claims(self):
+        timeout = _setting('APPOINTMENT_AUDIT_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT)
+        for claim in self.client.zrangebyscore(REDIS_CLAIMS_KEY, 0, time.time() - timeout):
+            logger.warning("Requeueing abandoned action log claim %s", claim)
+            self._requeue(claim)
+
+    def _claim(self, batch_size):
+        """Move up to batch_size entries into a new claim list; returns (claim, raw entries)."""
+        claim = f"{REDIS_KEY}:claim:{uuid.uuid4().hex}"
+        self.client.zadd(REDIS_CLAIMS_KEY, {claim: time.time()})
+        pipe = self.client.pipeline(transaction=False)
+        for _ in range(batch_size):
+            pipe.lmove(REDIS_KEY, claim, 'LEFT', 'RIGHT')
+        return claim, [item for item in pipe.execute() if item is not None]
+
+    def flush(self):
+        written = 0
+        batch_size = _batch_size()
+        self._requeue_stale_claims()
+        while True:
+            claim, raw = self._claim(batch_size)
+            if not raw:
+                self._release(claim)
+                return written
+            try:
+                written += write_entries([json.loads(item) for item in raw])
+            except Exception:
+                self._requeue(claim)
+                raise
+            self._release(claim)
+
+
+_buffers = {"memory": MemoryBuffer(), "redis": RedisBuffer()}
+
+
+def get_buffer():
+    """The configured buffer, or None when APPOINTMENT_AUDIT_BUFFER is 'sync'."""
+    return _buffers.get(_setting('APPOINTMENT_AUDIT_BUFFER', 'sync'))
+
+
+def record_actions(entries):
+    """Record (appointment, action_type, performed_by, note) tuples."""
+    entries = [_entry(*entry) for entry in entries]
+    durable = [entry for entry in entries if durability(entry["action_type"]) == 'sync']
+    buffered = [entry for entry in entries if durability(entry["action_type"]) != 'sync']
+    if durable:
+        AppointmentActionLog.objects.bulk_create([_row(entry) for entry in durable])
+    if buffered:
+        buffer = get_buffer()
+        transaction.on_commit(lambda: buffer.push(buffered))
+
+
+def record_action(appointment, action_type, performed_by=None, note=None):
+    record_actions([(appointment, action_type, performed_by, note)])
+
+
+def flush_action_logs():
+    """Write everything buffered so far. Returns the number of rows written."""
+    buffer = get_buffer()
+    return buffer.flush() if buffer is not None else 0
+
+
+@atexit.register
+def _flush_memory_buffer():
+    if len(_buffers["memory"]):
+        try:
+            _buffers["memory"].flush()
+        except Exception:
+            logger.exception("Could not flush buffered appointment action logs at exit")
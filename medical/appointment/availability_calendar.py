@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import AppointmentAvailability
+from .recurring import virtual_slots
+
+CACHE_PREFIX = "availability_calendar"
+DEFAULT_CACHE_TTL = 300  # seconds
+
+
+def _version_key(doctor_id=None):
+    return f"{CACHE_PREFIX}:version:{doctor_id if doctor_id is not None else 'all'}"
+
+
+def _initial_version():
+    # Seeded from the clock so a version key that was evicted never comes
+    # back with a number that older cached entries still use.
+    return int(time.time() * 1000)
+
+
+def _get_version(doctor_id=None):
+    key = _version_key(doctor_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(doctor_id=None):
+    key = _version_key(doctor_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key missing (never read, or evicted): a fresh seed invalidates
+        cache.add(key, _initial_version(), timeout=None)
+
+
+def _bump_versions(doctor_ids):
+    for doctor_id in doctor_ids:
+        _bump_version(doctor_id)
+    _bump_version()
+
+
+def invalidate_availability_calendar(*doctor_ids):
+    """
+    Invalidate cached calendars for the given doctors (and the all-doctors
+    view). Runs immediately and again after the surrounding transaction
+    commits, so a reader can't re-cache rows that are about to change.
+    """
+    doctor_ids = {doctor_id for doctor_id in doctor_ids if doctor_id is not None}
+    _bump_versions(doctor_ids)
+    transaction.on_commit(lambda: _bump_versions(doctor_ids))
+
+
+def build_availability_calendar(start_date, end_date, timezone_str, doctor_id=None):
+    """
+    Free-slot calendar for [start_date, end_date] (local dates in
+    timezone_str) in a columnar shape: one entry per doctor with parallel
+    `days`, `free_counts` and `start_times` arrays. Includes the open
+    slots of recurring templates.
+    """
+    tz = ZoneInfo(timezone_str)
+    window_start = datetime.combine(start_date, datetime.min.time(), tzinfo=tz)
+    window_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+
+    queryset = AppointmentAvailability.objects.filter(
+        is_booked=False,
+        start_time__gte=window_start,
+        start_time__lt=window_end,
+    )
+    if doctor_id is not None:
+        queryset = queryset.filter(doctor_id=doctor_id)
+    rows = list(queryset.order_by('doctor_id', 'start_time').values_list('doctor_id', 'start_time'))
+    virtual = virtual_slots(window_start, window_end, doctor_ids=[doctor_id] if doctor_id is not None else None)
+    if virtual:
+        rows = sorted(rows + [(slot.doctor_id, slot.start_time) for slot in virtual])
+
+    by_doctor = OrderedDict()
+    for row_doctor_id, start_time in rows:
+        local = start_time.astimezone(tz)
+        days = by_doctor.setdefault(row_doctor_id, OrderedDict())
+        days.setdefault(local.date().isoformat(), []).append(local.strftime('%H:%M'))
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "timezone": timezone_str,
+        "doctors": [
+            {
+                "doctor_id": row_doctor_id,
+                "days": list(days.keys()),
+                "free_counts": [len(times) for times in days.values()],
+                "start_times": list(days.values()),
+            }
+            for row_doctor_id, days in by_doctor.items()
+        ],
+    }
+
+
+def get_availability_calendar(start_date, end_date, timezone_str, doctor_id=None):
+    """Cached wrapper around build_availability_calendar."""
+    version = _get_version(doctor_id)
+    key = (
+        f"{CACHE_PREFIX}:v{version}:{doctor_id if doctor_id is not None else 'all'}:"
+        f"{timezone_str}:{start_date.isoformat()}:{end_date.isoformat()}"
+    )
+    data = cache.get(key)
+    if data is None:
+        data = build_availability_calendar(start_date, end_date, timezone_str, doctor_id=doctor_id)
+        ttl = getattr(settings, 'AVAILABILITY_CALENDAR_CACHE_TTL', DEFAULT_CACHE_TTL)
+        cache.set(key, data, timeout=ttl)
+    return data
@@ -0,0 +1,5 @@
+"""
+Booking-flow benchmarks. These write real rows, so point them at a
+disposable database (never production); seeded users use the
+@bench.invalid email domain and are deleted afterwards.
+"""
@@ -0,0 +1,88 @@
+"""
+Load test for the sync (DRF) and async read endpoints served through
+Django's ASGI handler in-process.
+
+Each level keeps `concurrency` requests in flight. The concurrency ceiling
+of a variant is the highest level whose p99 stays within the latency
+budget with no errors.
+"""
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from appointment.benchmarks.booking_strategies import cleanup, percentile, seed
+from appointment.models import Appointment
+
+# variant -> (sync url name, async url name)
+ENDPOINTS = {
+    "availability_list": ("list-my-availabilities", "async-list-my-availabilities"),
+    "appointment_list": ("list-my-appointments", "async-list-my-appointments"),
+    "appointment_detail": ("appointment-detail", "async-appointment-detail"),
+}
+
+
+async def _run_level(url, token, concurrency, requests):
+    client = AsyncClient()
+    headers = {"Authorization": f"Bearer {token}"}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+                if response.status_code != 200:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": errors,
+    }
+
+
+def run_async_views_load_test(levels=(1, 10, 50, 100), requests_per_level=200, slo_ms=250.0, slot_count=200):
+    """Returns one summary per (endpoint, implementation) with per-level results and the ceiling."""
+    cleanup()
+    doctor, slots, patients = seed(slot_count, 1, tag="asyncviews")
+    try:
+        booked = slots[: slot_count // 2]
+        Appointment.objects.bulk_create([
+            Appointment(availability=slot, patient=patients[0], status="booked") for slot in booked
+        ])
+        detail_id = Appointment.objects.filter(availability=booked[0]).values_list("id", flat=True).get()
+        token = str(AccessToken.for_user(doctor))
+
+        summaries = []
+        for endpoint, url_names in ENDPOINTS.items():
+            for implementation, url_name in zip(("sync", "async"), url_names):
+                args = [detail_id] if endpoint == "appointment_detail" else []
+                url = reverse(url_name, args=args)
+                results = [
+                    async_to_sync(_run_level)(url, token, concurrency, requests_per_level)
+                    for concurrency in levels
+                ]
+                within_budget = [r["concurrency"] for r in results if r["errors"] == 0 and r["p99_ms"] <= slo_ms]
+                summaries.append({
+                    "endpoint": endpoint,
+                    "implementation": implementation,
+                    "ceiling": max(within_budget) if within_budget else 0,
+                    "levels": results,
+                })
+        return summaries
+    finally:
+        cleanup()
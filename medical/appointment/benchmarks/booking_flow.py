@@ -0,0 +1,224 @@
+"""
+Load test for the whole booking flow: N doctors x M slots and a pool of
+patients who book, reschedule and cancel through BookAppointmentView,
+RescheduleAppointmentView and CancelAppointmentView at the same time.
+
+Each patient runs one script (book a random slot, then maybe reschedule
+to another, then maybe cancel) and patients run concurrently on a thread
+pool. Threads rather than processes so every client shares the slot-hold
+cache, as the web workers do behind one cache server.
+
+The report holds, per operation, throughput, p50/p95/p99 latency, queries
+per request and outcome counts (ok, rejected = 4xx, error = 5xx or an
+exception), plus the final-state consistency checks. Write it as JSON
+with run_booking_flow(output=...) to diff runs between releases.
+"""
+import json
+import platform
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+from unittest import mock
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from appointment.benchmarks.booking_strategies import BENCH_EMAIL_DOMAIN, _run_workers, cleanup, percentile
+from appointment.models import Appointment, AppointmentAvailability
+from appointment.views import BookAppointmentView, CancelAppointmentView, RescheduleAppointmentView
+from users.models import User
+
+OPERATIONS = ("book", "reschedule", "cancel")
+LIVE_STATUSES = ("pending", "booked")
+
+_book_view = BookAppointmentView.as_view()
+_cancel_view = CancelAppointmentView.as_view()
+_reschedule_view = RescheduleAppointmentView.as_view()
+
+
+def _bulk_users(tag, role, count):
+    users = []
+    for i in range(count):
+        user = User(email=f"{tag}-{role}{i}@{BENCH_EMAIL_DOMAIN}", role=role, first_name="Bench", last_name=str(i))
+        # No hashing: an unusable password is just a marker string
+        user.set_unusable_password()
+        users.append(user)
+    User.objects.bulk_create(users, batch_size=1000)
+    return list(User.objects.filter(email__startswith=f"{tag}-{role}", email__endswith=BENCH_EMAIL_DOMAIN).order_by("id"))
+
+
+def seed_flow(doctor_count, slots_per_doctor, patient_count, tag="flow"):
+    """Bulk-create doctors, their future slots and patients. Returns (doctors, slots, patients)."""
+    doctors = _bulk_users(tag, "doctor", doctor_count)
+    patients = _bulk_users(tag, "patient", patient_count)
+    start = now() + timedelta(days=30)
+    AppointmentAvailability.objects.bulk_create([
+        AppointmentAvailability(
+            doctor=doctor,
+            start_time=start + timedelta(minutes=15 * i),
+            end_time=start + timedelta(minutes=15 * (i + 1)),
+            slot_type="short",
+            timezone="Australia/Brisbane",
+        )
+        for doctor in doctors
+        for i in range(slots_per_doctor)
+    ], batch_size=1000)
+    slots = list(AppointmentAvailability.objects.filter(doctor__in=doctors).order_by("doctor_id", "start_time"))
+    return doctors, slots, patients
+
+
+def _call(operation, view, user, path, data, slot_id=None, **kwargs):
+    request = APIRequestFactory().post(path, data, format="json")
+    force_authenticate(request, user=user)
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        error = None
+        try:
+            response = view(request, **kwargs)
+        except Exception as exc:
+            # Lock wait timeouts / deadlocks surface here; counted as errors
+            response, error = None, type(exc).__name__
+        latency = time.perf_counter() - started
+    return response, {
+        "operation": operation,
+        "status": response.status_code if response is not None else None,
+        "latency": latency,
+        "queries": len(queries),
+        "slot_id": slot_id,
+        "exception": error,
+    }
+
+
+def _patient_script(job):
+    patient, slot_ids, seed, reschedule_ratio, cancel_ratio = job
+    rng = random.Random(seed)
+    calls = []
+
+    slot_id = rng.choice(slot_ids)
+    response, call = _call(
+        "book", _book_view, patient, "/api/v1/appointments/", {"availability_id": slot_id}, slot_id=slot_id
+    )
+    calls.append(call)
+    if call["status"] != 201:
+        return calls
+    appointment_id = response.data["id"]
+
+    if rng.random() < reschedule_ratio:
+        slot_id = rng.choice(slot_ids)
+        response, call = _call(
+            "reschedule", _reschedule_view, patient, f"/api/v1/appointments/{appointment_id}/reschedule/",
+            {"new_availability_id": slot_id}, slot_id=slot_id, appointment_id=appointment_id,
+        )
+        calls.append(call)
+        if call["status"] == 200:
+            appointment_id = response.data["new_appointment_id"]
+
+    if rng.random() < cancel_ratio:
+        _, call = _call(
+            "cancel", _cancel_view, patient, f"/api/v1/appointments/{appointment_id}/cancel/", {},
+            appointment_id=appointment_id,
+        )
+        calls.append(call)
+    return calls
+
+
+def _summarise(calls, elapsed):
+    rows = []
+    for operation in OPERATIONS:
+        selected = [call for call in calls if call["operation"] == operation]
+        latencies = [call["latency"] for call in selected]
+        queries = [call["queries"] for call in selected]
+        statuses = defaultdict(int)
+        exceptions = defaultdict(int)
+        for call in selected:
+            statuses[str(call["status"])] += 1
+            if call["exception"]:
+                exceptions[call["exception"]] += 1
+        rows.append({
+            "operation": operation,
+            "requests": len(selected),
+            "ok": sum(1 for call in selected if call["status"] is not None and call["status"] < 300),
+            "rejected": sum(1 for call in selected if call["status"] is not None and 400 <= call["status"] < 500),
+            "errors": sum(1 for call in selected if call["status"] is None or call["status"] >= 500),
+            "throughput_rps": round(len(selected) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "queries_avg": round(sum(queries) / len(queries), 1) if queries else 0.0,
+            "queries_max": max(queries, default=0),
+            "statuses": dict(sorted(statuses.items())),
+            "exceptions": dict(sorted(exceptions.items())),
+        })
+    return rows
+
+
+def check_consistency(slot_ids, calls):
+    """
+    Final-state invariants over the seeded slots:
+      double_bookings   slots that ended with more than one live appointment,
+                        or that more than one book/reschedule won during the run
+      orphaned_slots    slots marked booked with no live appointment
+      unflagged_slots   slots with a live appointment but is_booked=False
+    """
+    live = defaultdict(int)
+    for availability_id in Appointment.objects.filter(
+        availability_id__in=slot_ids, status__in=LIVE_STATUSES
+    ).values_list("availability_id", flat=True):
+        live[availability_id] += 1
+    booked = set(
+        AppointmentAvailability.objects.filter(id__in=slot_ids, is_booked=True).values_list("id", flat=True)
+    )
+
+    wins = defaultdict(int)
+    for call in calls:
+        if call["operation"] in ("book", "reschedule") and call["status"] in (200, 201):
+            wins[call["slot_id"]] += 1
+    return {
+        "double_bookings": sum(count - 1 for count in live.values() if count > 1)
+        + sum(count - 1 for count in wins.values() if count > 1),
+        "orphaned_slots": len(booked - set(live)),
+        "unflagged_slots": len(set(live) - booked),
+        "live_appointments": sum(live.values()),
+    }
+
+
+def run_booking_flow(doctors=10, slots_per_doctor=50, patients=200, workers=8,
+                     reschedule_ratio=0.5, cancel_ratio=0.3, seed=0, output=None):
+    """
+    Seed, run every patient's script on `workers` threads and check the
+    result. Returns the report; also writes it as JSON to `output`.
+    """
+    cleanup()
+    _, slots, patient_users = seed_flow(doctors, slots_per_doctor, patients)
+    slot_ids = [str(slot.id) for slot in slots]
+    rng = random.Random(seed)
+    jobs = [(patient, slot_ids, rng.random(), reschedule_ratio, cancel_ratio) for patient in patient_users]
+
+    with mock.patch("appointment.views.send_appointment_confirmation"):
+        started = time.perf_counter()
+        results = _run_workers(jobs, workers, _patient_script)
+        elapsed = time.perf_counter() - started
+    calls = [call for script in results for call in script]
+
+    report = {
+        "config": {
+            "doctors": doctors, "slots_per_doctor": slots_per_doctor, "patients": patients, "workers": workers,
+            "reschedule_ratio": reschedule_ratio, "cancel_ratio": cancel_ratio, "seed": seed,
+        },
+        "environment": {
+            "database": connection.vendor, "django": django.get_version(), "python": platform.python_version(),
+        },
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(calls) / elapsed, 1) if elapsed else 0.0,
+        "results": _summarise(calls, elapsed),
+        "consistency": check_consistency([slot.id for slot in slots], calls),
+    }
+    cleanup()
+    if output:
+        with open(output, "w") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+    return report
@@ -0,0 +1,136 @@
+import queue
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from appointment.models import Appointment, AppointmentAvailability
+from appointment.views import BookAppointmentView
+from users.models import User
+
+BENCH_EMAIL_DOMAIN = "bench.invalid"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def seed(slot_count, patient_count, tag="booking"):
+    doctor = User.objects.create_user(
+        email=f"{tag}-doctor@{BENCH_EMAIL_DOMAIN}", password=None, role="doctor", first_name="Bench"
+    )
+    patients = [
+        User.objects.create_user(email=f"{tag}-patient{i}@{BENCH_EMAIL_DOMAIN}", password=None, role="patient")
+        for i in range(patient_count)
+    ]
+    start = now() + timedelta(days=30)
+    AppointmentAvailability.objects.bulk_create([
+        AppointmentAvailability(
+            doctor=doctor,
+            start_time=start + timedelta(minutes=15 * i),
+            end_time=start + timedelta(minutes=15 * (i + 1)),
+            slot_type="short",
+            timezone="Australia/Brisbane",
+        )
+        for i in range(slot_count)
+    ])
+    slots = list(AppointmentAvailability.objects.filter(doctor=doctor).order_by("start_time"))
+    return doctor, slots, patients
+
+
+def cleanup():
+    # Cascades to availabilities, appointments and logs
+    User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").delete()
+
+
+def _run_workers(jobs, workers, handler):
+    """Run `handler(job)` over `jobs` on `workers` threads; returns handler results."""
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            while True:
+                try:
+                    job = pending.get_nowait()
+                except queue.Empty:
+                    return
+                result = handler(job)
+                with lock:
+                    results.append(result)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def _book(job):
+    slot, patient = job
+    request = APIRequestFactory().post("/api/v1/appointments/", {"availability_id": str(slot.id)}, format="json")
+    force_authenticate(request, user=patient)
+    started = time.perf_counter()
+    try:
+        status_code = BookAppointmentView.as_view()(request).status_code
+    except Exception:
+        # Lock wait timeouts / deadlocks surface here; counted as errors
+        status_code = None
+    return slot.id, status_code, time.perf_counter() - started
+
+
+def run_booking_race(strategy, slot_count=50, contenders=8, workers=8):
+    """
+    Every slot is raced by `contenders` patients at once (flash sale).
+    Returns throughput, latency percentiles and consistency counters.
+    """
+    cleanup()
+    _, slots, patients = seed(slot_count, contenders, tag=strategy)
+    jobs = [(slot, patients[i]) for slot in slots for i in range(contenders)]
+
+    with override_settings(APPOINTMENT_BOOKING_STRATEGY=strategy), \
+            mock.patch("appointment.views.send_appointment_confirmation"):
+        started = time.perf_counter()
+        results = _run_workers(jobs, workers, _book)
+        elapsed = time.perf_counter() - started
+
+    latencies = [latency for _, _, latency in results]
+    wins = {}
+    for slot_id, status_code, _ in results:
+        if status_code == 201:
+            wins[slot_id] = wins.get(slot_id, 0) + 1
+
+    slot_ids = [slot.id for slot in slots]
+    orphaned = AppointmentAvailability.objects.filter(
+        id__in=slot_ids, is_booked=True, appointment__isnull=True
+    ).count()
+    summary = {
+        "strategy": strategy,
+        "requests": len(results),
+        "booked": sum(wins.values()),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "errors": sum(1 for _, status_code, _ in results if status_code is None),
+        "double_bookings": sum(count - 1 for count in wins.values() if count > 1),
+        "orphaned_slots": orphaned,
+        "appointments": Appointment.objects.filter(availability_id__in=slot_ids).count(),
+    }
+    cleanup()
+    return summary
@@ -0,0 +1,67 @@
+"""
+Page-number vs keyset pagination on a doctor's availability listing, at
+page 1 and deep in the list.
+"""
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from appointment.benchmarks.booking_strategies import cleanup, percentile, seed
+from appointment.models import AppointmentAvailability
+from appointment.pagination import encode_cursor
+from appointment.views import ListMyAvailabilityView
+
+URL = "/api/v1/appointments/availabilities/list/"
+
+
+def _timed_get(doctor, params, repeats):
+    view = ListMyAvailabilityView.as_view()
+    latencies = []
+    for _ in range(repeats):
+        request = APIRequestFactory().get(URL, params)
+        force_authenticate(request, user=doctor)
+        started = time.perf_counter()
+        response = view(request)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    with CaptureQueriesContext(connection) as ctx:
+        request = APIRequestFactory().get(URL, params)
+        force_authenticate(request, user=doctor)
+        view(request)
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "queries": len(ctx.captured_queries),
+    }
+
+
+def run_pagination_benchmark(deep_page=500, page_size=10, repeats=20):
+    """
+    Seed one doctor with enough slots for `deep_page` pages and time page 1
+    and page `deep_page` under both paginators. Returns a list of rows.
+    """
+    cleanup()
+    doctor, _, _ = seed(deep_page * page_size, 0, tag="pagination")
+    try:
+        # Key of the last row before the deep page, as a client following
+        # `next` links would hold it.
+        offset = (deep_page - 1) * page_size - 1
+        before_deep = (
+            AppointmentAvailability.objects.filter(doctor=doctor)
+            .order_by("start_time", "id")
+            .values_list("start_time", "id")[offset]
+        )
+        cases = [
+            ("page_number", 1, {"page": 1, "page_size": page_size}),
+            ("page_number", deep_page, {"page": deep_page, "page_size": page_size}),
+            ("keyset", 1, {"cursor": "", "page_size": page_size}),
+            ("keyset", deep_page, {"cursor": encode_cursor(before_deep), "page_size": page_size}),
+        ]
+        return [
+            {"paginator": paginator, "page": page, **_timed_get(doctor, params, repeats)}
+            for paginator, page, params in cases
+        ]
+    finally:
+        cleanup()
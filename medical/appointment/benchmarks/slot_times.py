@@ -0,0 +1,90 @@
+"""
+Microbenchmark for generating a long-range slot grid: the previous
+per-slot pytz implementation against appointment.slot_times, cold (empty
+caches) and warm. Pure CPU; touches no database.
+"""
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from appointment.benchmarks.booking_strategies import percentile
+from appointment import slot_times
+from appointment.slots import generate_slot_grid
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def legacy_generate_slot_grid(start_date, end_date, days_of_week, start_time_str, end_time_str, slot_type, timezone_str):
+    """generate_slot_grid as it was before slot_times: pytz localize per day, strftime per date."""
+    tz = pytz.timezone(timezone_str)
+    interval = slot_times.SLOT_INTERVALS.get(slot_type, slot_times.SLOT_INTERVALS["long"])
+    day_start = datetime.strptime(start_time_str, '%H:%M').time()
+    day_end = datetime.strptime(end_time_str, '%H:%M').time()
+    days_of_week = set(days_of_week)
+
+    grid = OrderedDict()
+    current_date = start_date
+    while current_date <= end_date:
+        if current_date.strftime('%A') in days_of_week:
+            start_dt = tz.localize(datetime.combine(current_date, day_start))
+            end_dt = tz.localize(datetime.combine(current_date, day_end))
+
+            slots = []
+            slot_start = start_dt
+            while slot_start + interval <= end_dt:
+                slots.append((slot_start, slot_start + interval))
+                slot_start = slot_start + interval
+            grid[current_date] = slots
+        current_date += timedelta(days=1)
+    return grid
+
+
+def _clear_caches():
+    for cached in (slot_times.get_zone, slot_times.parse_clock, slot_times.local_to_utc, slot_times._offsets):
+        cached.cache_clear()
+
+
+def _time(function, args, repeats, before=None):
+    latencies = []
+    for _ in range(repeats):
+        if before:
+            before()
+        started = time.perf_counter()
+        grid = function(*args)
+        latencies.append(time.perf_counter() - started)
+    return grid, latencies
+
+
+def _instants(grid):
+    return {day: [(start.timestamp(), end.timestamp()) for start, end in slots] for day, slots in grid.items()}
+
+
+def run_slot_time_benchmark(days=365, timezone_str="Australia/Sydney", start_time="00:00", end_time="23:45",
+                            slot_type="short", repeats=5):
+    """
+    Generate `days` days of slots from today under each implementation.
+    Returns one row per variant plus how many days the two disagree on
+    (DST transition days, where the legacy grid drifts by the shift).
+    """
+    start_date = date.today()
+    args = (start_date, start_date + timedelta(days=days - 1), WEEKDAYS, start_time, end_time, slot_type, timezone_str)
+
+    legacy_grid, legacy = _time(legacy_generate_slot_grid, args, repeats)
+    grid, cold = _time(generate_slot_grid, args, repeats, before=_clear_caches)
+    _, warm = _time(generate_slot_grid, args, repeats)
+
+    slots = sum(len(day_slots) for day_slots in grid.values())
+    rows = [
+        {"variant": name, "slots": count, "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+         "best_ms": round(min(latencies) * 1000, 2)}
+        for name, count, latencies in (
+            ("legacy_pytz", sum(len(day_slots) for day_slots in legacy_grid.values()), legacy),
+            ("slot_times_cold", slots, cold),
+            ("slot_times_warm", slots, warm),
+        )
+    ]
+    new, old = _instants(grid), _instants(legacy_grid)
+    differing_days = sorted(day.isoformat() for day in new if new[day] != old.get(day))
+    return {"days": days, "timezone": timezone_str, "results": rows, "differing_days": differing_days}
@@ -6,4 +6,7 @@ NEW_PATIENT_FEE = Decimal('80.00')        # First-time patients pay $80
 RETURNING_PATIENT_FEE = Decimal('50.00')  # Returning patients pay $50 regardless of appointment type
 
 # Status options for determining patient history
-COMPLETED_APPOINTMENT_STATUSES = ['booked', 'completed']
\ No newline at end of file
+COMPLETED_APPOINTMENT_STATUSES = ['booked', 'completed']
+
+# Minutes a `pending` appointment may wait for payment before it expires
+PAYMENT_WINDOW_MINUTES = 15
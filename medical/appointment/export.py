@@ -0,0 +1,120 @@
+"""
+Streaming CSV / NDJSON export of appointments.
+
+Rows are read with values() projections in keyset batches on
+(availability__start_time, id) and written out as they arrive, so memory
+stays flat however many appointments match. Batching by key rather than
+relying on one long `.iterator()` matters on MySQL, whose driver buffers a
+whole result set client-side.
+"""
+import csv
+import json
+
+from .models import Appointment
+from .pagination import keyset_filter
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_BATCH_SIZE = 2000
+
+ORDERING = ("availability__start_time", "id")
+
+_VALUES = (
+    "id",
+    "status",
+    "availability__start_time",
+    "availability__end_time",
+    "availability__doctor_id",
+    "availability__doctor__first_name",
+    "availability__doctor__last_name",
+    "availability__doctor__email",
+    "patient_id",
+    "patient__first_name",
+    "patient__last_name",
+    "patient__email",
+    "price",
+    "is_initial",
+    "booked_at",
+)
+
+COLUMNS = (
+    "id",
+    "status",
+    "start_time",
+    "end_time",
+    "doctor_id",
+    "doctor_name",
+    "doctor_email",
+    "patient_id",
+    "patient_name",
+    "patient_email",
+    "price",
+    "is_initial",
+    "booked_at",
+)
+
+
+def export_queryset(start=None, end=None, statuses=None):
+    """Appointments starting in [start, end), optionally limited to `statuses`."""
+    queryset = Appointment.objects.filter(is_deleted=False)
+    if start is not None:
+        queryset = queryset.filter(availability__start_time__gte=start)
+    if end is not None:
+        queryset = queryset.filter(availability__start_time__lt=end)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset
+
+
+def iter_export_rows(queryset, batch_size=EXPORT_BATCH_SIZE):
+    """Yield one flat dict per appointment, in start-time order."""
+    last_key = None
+    while True:
+        batch = queryset
+        if last_key is not None:
+            batch = batch.filter(keyset_filter(ORDERING, last_key))
+        batch = batch.order_by(*ORDERING).values(*_VALUES)[:batch_size]
+
+        count = 0
+        for row in batch.iterator(chunk_size=batch_size):
+            count += 1
+            last_key = [row["availability__start_time"], row["id"]]
+            yield {
+                "id": str(row["id"]),
+                "status": row["status"],
+                "start_time": row["availability__start_time"].isoformat(),
+                "end_time": row["availability__end_time"].isoformat(),
+                "doctor_id": row["availability__doctor_id"],
+                "doctor_name": f"{row['availability__doctor__first_name']} {row['availability__doctor__last_name']}".strip(),
+                "doctor_email": row["availability__doctor__email"],
+                "patient_id": row["patient_id"],
+                "patient_name": f"{row['patient__first_name']} {row['patient__last_name']}".strip(),
+                "patient_email": row["patient__email"],
+                "price": str(row["price"]),
+                "is_initial": row["is_initial"],
+                "booked_at": row["booked_at"].isoformat(),
+            }
+        if count < batch_size:
+            return
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[column] for column in COLUMNS])
+
+
+def stream_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, separators=(",", ":")) + "\n"
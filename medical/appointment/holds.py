@@ -0,0 +1,112 @@
+"""
+Short-lived slot holds kept in the cache (atomic add + TTL).
+
+A patient's hold lasts for the payment window, so competing booking
+attempts are turned away by a cache lookup instead of a MySQL round trip.
+Holds are released when the slot becomes free again (cancel, reschedule,
+payment expiry) or when payment confirms the appointment, after which the
+database row is the source of truth.
+
+A patient holds at most one slot: taking a new hold (or booking another
+slot) releases the one they had, so nobody can keep a doctor's week
+blocked by renewing holds. The patient's current slot is kept under a
+per-patient key, updated under a short per-patient lock so concurrent
+requests from the same patient can't each keep a hold.
+"""
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .constants import PAYMENT_WINDOW_MINUTES
+
+CACHE_PREFIX = "slot_hold"
+PATIENT_PREFIX = "slot_hold_patient"
+LOCK_PREFIX = "slot_hold_lock"
+LOCK_TIMEOUT = 5  # seconds; only guards a few cache operations
+LOCK_ATTEMPTS = 10
+
+
+def hold_ttl():
+    return getattr(settings, 'SLOT_HOLD_TTL_SECONDS', PAYMENT_WINDOW_MINUTES * 60)
+
+
+class HoldInProgress(Exception):
+    """Another request of the same patient is changing their hold right now."""
+
+
+def _slot_id(availability_id):
+    # UUID from the URL, any spelling of it from a request body: one key per slot
+    try:
+        return str(uuid.UUID(str(availability_id)))
+    except ValueError:
+        return str(availability_id)
+
+
+def _key(availability_id):
+    return f"{CACHE_PREFIX}:{_slot_id(availability_id)}"
+
+
+def _patient_key(patient_id):
+    return f"{PATIENT_PREFIX}:{patient_id}"
+
+
+def _lock_patient(patient_id):
+    lock = f"{LOCK_PREFIX}:{patient_id}"
+    for attempt in range(LOCK_ATTEMPTS):
+        if cache.add(lock, 1, timeout=LOCK_TIMEOUT):
+            return lock
+        time.sleep(0.005 * (attempt + 1))
+    return None
+
+
+def get_hold(availability_id):
+    """Return {"patient_id", "expires_at"} for the slot's hold, or None."""
+    return cache.get(_key(availability_id))
+
+
+def _add_hold(availability_id, value, ttl):
+    if cache.add(_key(availability_id), value, timeout=ttl):
+        return True
+    current = get_hold(availability_id)
+    if current is None:
+        # Expired between add() and get(); try once more
+        return cache.add(_key(availability_id), value, timeout=ttl)
+    return current["patient_id"] == value["patient_id"]
+
+
+def acquire_hold(availability_id, patient_id):
+    """
+    Hold the slot for `patient_id`, releasing any other slot they held.
+    Returns True if the patient now holds it (including when they already
+    did), False if another patient does. Raises HoldInProgress if another
+    request of the same patient is taking a hold at the same moment.
+    """
+    lock = _lock_patient(patient_id)
+    if lock is None:
+        raise HoldInProgress()
+    try:
+        ttl = hold_ttl()
+        if not _add_hold(availability_id, {"patient_id": patient_id, "expires_at": time.time() + ttl}, ttl):
+            return False
+        previous = cache.get(_patient_key(patient_id))
+        if previous is not None and previous != _slot_id(availability_id):
+            release_hold(previous, patient_id)
+        cache.set(_patient_key(patient_id), _slot_id(availability_id), timeout=ttl)
+        return True
+    finally:
+        cache.delete(lock)
+
+
+def release_hold(availability_id, patient_id=None):
+    """Release the slot's hold; with `patient_id`, only if that patient owns it."""
+    if patient_id is not None:
+        current = get_hold(availability_id)
+        if current is None or current["patient_id"] != patient_id:
+            return
+    cache.delete(_key(availability_id))
+
+
+def release_holds(availability_ids):
+    cache.delete_many([_key(availability_id) for availability_id in availability_ids])
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from appointment.archive import run_archive
+
+
+def _size(sizes):
+    return ", ".join(
+        f"{table}={size['rows']} rows" + (f" / {size['bytes'] // 1024} KiB" if size['bytes'] is not None else "")
+        for table, size in sizes.items()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Move unbooked past availabilities and old final-status appointments (with their slots and '
+        'action logs) into the archive tables, in chunks. Reports hot table sizes before and after.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slot-days', type=int, help='Archive unbooked slots that ended this many days ago')
+        parser.add_argument('--appointment-days', type=int,
+                            help='Archive final-status appointments whose slot started this many days ago')
+        parser.add_argument('--chunk-size', type=int, help='Rows moved per transaction')
+        parser.add_argument('--max-chunks', type=int, help='Stop after this many chunks of each kind')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would move')
+
+    def handle(self, *args, **options):
+        report = run_archive(
+            slot_days=options['slot_days'],
+            appointment_days=options['appointment_days'],
+            chunk_size=options['chunk_size'],
+            max_chunks=options['max_chunks'],
+            dry_run=options['dry_run'],
+        )
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        self.stdout.write(f"Hot tables before: {_size(report['before'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['appointments']} appointments (before {report['appointment_cutoff']}) and "
+            f"{report['availabilities']} unbooked availabilities (before {report['slot_cutoff']}); "
+            f"{report['kept_hot']} old appointments kept hot (order/chat room or reschedule references)."
+        ))
+        self.stdout.write(f"Hot tables after: {_size(report['after'])}")
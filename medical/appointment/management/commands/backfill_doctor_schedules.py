@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from appointment.models import AppointmentAvailability, DoctorDailySchedule
+from appointment.schedule_summary import rebuild_doctor_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the DoctorDailySchedule summary rows from availabilities and appointments. '
+        'Safe to re-run; reports how many rows were out of date.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', type=int, action='append', help='Only this doctor id (repeatable)')
+
+    def handle(self, *args, **options):
+        doctor_ids = options['doctor']
+        if not doctor_ids:
+            # Doctors with only stale summary rows left need visiting too
+            doctor_ids = set(
+                AppointmentAvailability.objects.order_by().values_list('doctor_id', flat=True).distinct()
+            ) | set(
+                DoctorDailySchedule.objects.order_by().values_list('doctor_id', flat=True).distinct()
+            )
+        doctors = days = changed = 0
+        for doctor_id in sorted(doctor_ids):
+            doctor_days, doctor_changed = rebuild_doctor_schedule(doctor_id)
+            doctors += 1
+            days += doctor_days
+            changed += doctor_changed
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {days} day rows for {doctors} doctors ({changed} created, updated or removed)."
+        ))
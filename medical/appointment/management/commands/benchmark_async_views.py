@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from appointment.benchmarks.async_views import run_async_views_load_test
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the sync and async appointment read endpoints through the ASGI handler and '
+        'report the concurrency each sustains within a p99 budget. Use a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--levels', default='1,10,50,100', help='Comma-separated in-flight request counts')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per level')
+        parser.add_argument('--slo-ms', type=float, default=250.0, help='p99 latency budget')
+        parser.add_argument('--slots', type=int, default=200, help='Slots seeded for the test doctor')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['levels'].split(',') if level]
+        summaries = run_async_views_load_test(
+            levels=levels,
+            requests_per_level=options['requests'],
+            slo_ms=options['slo_ms'],
+            slot_count=options['slots'],
+        )
+        for summary in summaries:
+            self.stdout.write(
+                f"{summary['endpoint']:<20} {summary['implementation']:<6} "
+                f"ceiling={summary['ceiling']} (p99 <= {options['slo_ms']}ms)"
+            )
+            for level in summary['levels']:
+                self.stdout.write(
+                    f"    c={level['concurrency']:<5} throughput={level['throughput_rps']} req/s "
+                    f"p50={level['p50_ms']}ms p99={level['p99_ms']}ms errors={level['errors']}"
+                )
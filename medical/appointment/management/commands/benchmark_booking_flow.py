@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from appointment.benchmarks.booking_flow import run_booking_flow
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test booking, rescheduling and cancelling across many doctors and patients at once; '
+        'reports throughput, p50/p95/p99 latency, queries per request and double bookings, '
+        'optionally as JSON. Use a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctors', type=int, default=10)
+        parser.add_argument('--slots', type=int, default=50, help='Slots per doctor')
+        parser.add_argument('--patients', type=int, default=200, help='Patients, one booking script each')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent client threads')
+        parser.add_argument('--reschedule-ratio', type=float, default=0.5, help='Share of bookings then rescheduled')
+        parser.add_argument('--cancel-ratio', type=float, default=0.3, help='Share of bookings then cancelled')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for slot choices')
+        parser.add_argument('--output', help='Write the full report as JSON to this path')
+
+    def handle(self, *args, **options):
+        report = run_booking_flow(
+            doctors=options['doctors'],
+            slots_per_doctor=options['slots'],
+            patients=options['patients'],
+            workers=options['workers'],
+            reschedule_ratio=options['reschedule_ratio'],
+            cancel_ratio=options['cancel_ratio'],
+            seed=options['seed'],
+            output=options['output'],
+        )
+        for row in report['results']:
+            self.stdout.write(
+                f"{row['operation']:<10} requests={row['requests']} ok={row['ok']} rejected={row['rejected']} "
+                f"errors={row['errors']} throughput={row['throughput_rps']} req/s p50={row['p50_ms']}ms "
+                f"p95={row['p95_ms']}ms p99={row['p99_ms']}ms queries={row['queries_avg']} (max {row['queries_max']})"
+            )
+        consistency = report['consistency']
+        self.stdout.write(
+            f"double_bookings={consistency['double_bookings']} orphaned_slots={consistency['orphaned_slots']} "
+            f"unflagged_slots={consistency['unflagged_slots']} live_appointments={consistency['live_appointments']}"
+        )
+        if options['output']:
+            self.stdout.write(f"Report written to {options['output']}")
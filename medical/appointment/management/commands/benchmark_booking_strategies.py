@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from appointment.benchmarks.booking_strategies import run_booking_race
+
+
+class Command(BaseCommand):
+    help = (
+        'Race concurrent bookings for the same slots under the pessimistic and optimistic '
+        'booking strategies and compare throughput and p99 latency. Use a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, default=50, help='Slots to race for')
+        parser.add_argument('--contenders', type=int, default=8, help='Patients racing for each slot')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent client threads')
+
+    def handle(self, *args, **options):
+        for strategy in ('pessimistic', 'optimistic'):
+            summary = run_booking_race(
+                strategy,
+                slot_count=options['slots'],
+                contenders=options['contenders'],
+                workers=options['workers'],
+            )
+            self.stdout.write(
+                f"{summary['strategy']:<12} requests={summary['requests']} booked={summary['booked']} "
+                f"throughput={summary['throughput_rps']} req/s p50={summary['p50_ms']}ms "
+                f"p99={summary['p99_ms']}ms errors={summary['errors']} double_bookings={summary['double_bookings']} "
+                f"orphaned_slots={summary['orphaned_slots']}"
+            )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from appointment.benchmarks.pagination import run_pagination_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare page-number and keyset (cursor) pagination of the availability listing '
+        'at page 1 and a deep page. Seeds its own rows; use a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deep-page', type=int, default=500, help='Deep page to compare against page 1')
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--repeats', type=int, default=20, help='Requests timed per case')
+
+    def handle(self, *args, **options):
+        rows = run_pagination_benchmark(
+            deep_page=options['deep_page'],
+            page_size=options['page_size'],
+            repeats=options['repeats'],
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['paginator']:<12} page={row['page']:<6} p50={row['p50_ms']}ms "
+                f"p99={row['p99_ms']}ms queries={row['queries']}"
+            )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from appointment.benchmarks.slot_times import run_slot_time_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Time generating a long-range availability slot grid with the previous per-slot pytz code '
+        'and with appointment.slot_times (cold and warm caches). Touches no database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Days of slots to generate')
+        parser.add_argument('--timezone', default='Australia/Sydney')
+        parser.add_argument('--slot-type', choices=['short', 'long'], default='short')
+        parser.add_argument('--repeats', type=int, default=5, help='Runs timed per variant')
+
+    def handle(self, *args, **options):
+        report = run_slot_time_benchmark(
+            days=options['days'],
+            timezone_str=options['timezone'],
+            slot_type=options['slot_type'],
+            repeats=options['repeats'],
+        )
+        for row in report['results']:
+            self.stdout.write(
+                f"{row['variant']:<16} slots={row['slots']:<7} p50={row['p50_ms']}ms best={row['best_ms']}ms"
+            )
+        self.stdout.write(
+            f"Days where the grids differ (DST transitions in {report['timezone']}): "
+            f"{', '.join(report['differing_days']) or 'none'}"
+        )
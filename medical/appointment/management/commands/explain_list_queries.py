@@ -0,0 +1,114 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from appointment.views import (
+    ListAvailableAppointmentsView,
+    ListMyAppointmentsView,
+    ListMyAvailabilityView,
+)
+from chat.message_sync import page_ids
+from order.models import Order
+from users.models import User
+
+SQLITE_SCAN = re.compile(r'\bSCAN (?!.*\bUSING (COVERING )?INDEX\b)')
+POSTGRES_SCAN = re.compile(r'\bSeq Scan\b')
+
+
+def find_full_scans(plan, vendor=None):
+    """Return the plan lines that read a whole table without an index."""
+    vendor = vendor or connection.vendor
+    flagged = []
+    for line in plan.splitlines():
+        if vendor == 'sqlite':
+            if SQLITE_SCAN.search(line):
+                flagged.append(line.strip())
+        elif vendor == 'mysql':
+            # Traditional EXPLAIN row: id select_type table partitions type ...
+            columns = line.split()
+            if len(columns) > 4 and columns[4] == 'ALL':
+                flagged.append(line.strip())
+        elif vendor == 'postgresql':
+            if POSTGRES_SCAN.search(line):
+                flagged.append(line.strip())
+    return flagged
+
+
+def view_queryset(view_class, user, params=None, **kwargs):
+    """Build the queryset a list view would run for `user` and `params`."""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+    view = view_class()
+    view.request = request
+    view.args = ()
+    view.kwargs = kwargs
+    view.format_kwarg = None
+    return view.get_queryset()
+
+
+def list_view_queries():
+    """
+    (label, queryset, allow_full_scan) for the ORM query behind each list
+    view. Users are unsaved stand-ins; only their id and role matter.
+    """
+    doctor = User(id=1, role='doctor')
+    patient = User(id=2, role='patient')
+    admin = User(id=3, role='admin')
+    return [
+        ("ListMyAvailabilityView (doctor)",
+         view_queryset(ListMyAvailabilityView, doctor), False),
+        ("ListMyAvailabilityView (patient, doctor + is_booked filter)",
+         view_queryset(ListMyAvailabilityView, patient, {'doctor': doctor.id, 'is_booked': 'false'}), False),
+        ("ListMyAppointmentsView (doctor)",
+         view_queryset(ListMyAppointmentsView, doctor), False),
+        ("ListMyAppointmentsView (patient)",
+         view_queryset(ListMyAppointmentsView, patient), False),
+        # Admin listing returns every appointment by design
+        ("ListAvailableAppointmentsView (admin)",
+         view_queryset(ListAvailableAppointmentsView, admin), True),
+        ("OrderListAPIView (patient)",
+         Order.objects.filter(user=patient), False),
+        ("OrderListAPIView (doctor)",
+         Order.objects.filter(appointment__availability__doctor=doctor), False),
+        ("MessageListCreateView (latest page)",
+         page_ids(1, None, None, 50), False),
+        ("MessageListCreateView (since_id)",
+         page_ids(1, 100, None, 50), False),
+        ("MessageListCreateView (before_id)",
+         page_ids(1, None, 100, 50), False),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN on the ORM queries behind the list views and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fail-on-scan',
+            action='store_true',
+            help='Exit with an error if any query not expected to scan does a full table scan',
+        )
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query')
+
+    def handle(self, *args, **options):
+        offenders = []
+        for label, queryset, allow_full_scan in list_view_queries():
+            plan = queryset.explain()
+            scans = find_full_scans(plan)
+
+            if scans and not allow_full_scan:
+                offenders.append(label)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {label}"))
+            elif scans:
+                self.stdout.write(self.style.WARNING(f"SCAN (expected)  {label}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK  {label}"))
+
+            for line in (plan.splitlines() if options['verbose_plans'] else scans):
+                self.stdout.write(f"    {line}")
+
+        if offenders and options['fail_on_scan']:
+            raise CommandError(f"Full table scans in: {', '.join(offenders)}")
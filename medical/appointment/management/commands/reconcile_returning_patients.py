@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from appointment.constants import COMPLETED_APPOINTMENT_STATUSES
+from appointment.models import Appointment, ArchivedAppointment
+from appointment.patient_history import (
+    cached_returning_patients,
+    clear_returning_patients,
+    set_returning_patients,
+)
+from users.models import User
+
+CHUNK_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the cached returning-patient flag from the appointments table and report '
+        'drift: patients flagged without a booked/completed appointment (stale) and qualifying '
+        'patients with no cached flag (cold).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without touching the cache')
+
+    def handle(self, *args, **options):
+        qualifying = set()
+        for model in (Appointment, ArchivedAppointment):
+            qualifying.update(
+                model.objects.filter(status__in=COMPLETED_APPOINTMENT_STATUSES)
+                .values_list('patient_id', flat=True)
+                .distinct()
+            )
+        patient_ids = User.objects.filter(role='patient').order_by('id').values_list('id', flat=True)
+
+        checked = 0
+        stale, cold = [], []
+        chunk = []
+        for patient_id in patient_ids.iterator(chunk_size=CHUNK_SIZE):
+            chunk.append(patient_id)
+            if len(chunk) == CHUNK_SIZE:
+                checked += self._reconcile(chunk, qualifying, stale, cold, options['dry_run'])
+                chunk = []
+        if chunk:
+            checked += self._reconcile(chunk, qualifying, stale, cold, options['dry_run'])
+
+        self.stdout.write(f"Checked {checked} patients: {len(stale)} stale, {len(cold)} cold.")
+        if stale:
+            self.stdout.write(f"Stale patient ids: {', '.join(str(patient_id) for patient_id in stale)}")
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS("Cache reconciled."))
+
+    def _reconcile(self, chunk, qualifying, stale, cold, dry_run):
+        cached = cached_returning_patients(chunk)
+        chunk_stale = [patient_id for patient_id in chunk if patient_id in cached and patient_id not in qualifying]
+        chunk_cold = [patient_id for patient_id in chunk if patient_id in qualifying and patient_id not in cached]
+        stale.extend(chunk_stale)
+        cold.extend(chunk_cold)
+        if not dry_run:
+            clear_returning_patients(chunk_stale)
+            set_returning_patients(chunk_cold)
+        return len(chunk)
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 02:25
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Appointment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('booked', 'Booked'), ('payment_expired', 'Payment Expired'), ('cancelled_by_patient', 'Cancelled by Patient'), ('cancelled_by_doctor', 'Cancelled by Doctor'), ('cancelled_by_admin', 'Cancelled by Admin'), ('rescheduled', 'Rescheduled'), ('completed', 'Completed'), ('no_show', 'No Show')], default='booked', max_length=30)),
+                ('booked_at', models.DateTimeField(auto_now_add=True)),
+                ('extended_info', models.JSONField(blank=True, null=True)),
+                ('note', models.TextField(blank=True, null=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=6)),
+                ('is_initial', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AppointmentActionLog',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('action_type', models.CharField(choices=[('created', 'Created'), ('cancelled', 'Cancelled'), ('rescheduled', 'Rescheduled'), ('completed', 'Completed'), ('no_show', 'No Show')], max_length=20)),
+                ('performed_at', models.DateTimeField(auto_now_add=True)),
+                ('note', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AppointmentAvailability',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('slot_type', models.CharField(choices=[('short', 'Short (15 minutes)'), ('long', 'Long (30 minutes)')], max_length=10)),
+                ('timezone', models.CharField(max_length=100)),
+                ('is_booked', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['start_time'],
+            },
+        ),
+    ]
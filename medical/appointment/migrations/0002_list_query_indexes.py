@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Not initial: databases adopted with migrate --fake-initial still build these
+
+    dependencies = [
+        ('appointment', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointmentavailability',
+            index=models.Index(fields=['doctor', 'is_booked', 'start_time'], name='avail_doctor_booked_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'status'], name='appt_patient_status_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 02:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0002_list_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'booked_at'], name='appt_status_booked_at_idx'),
+        ),
+    ]
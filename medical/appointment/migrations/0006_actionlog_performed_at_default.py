@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 02:51
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0005_availabilitytemplate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointmentactionlog',
+            name='performed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2 on 2026-10-17 02:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointment', '0006_actionlog_performed_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAvailability',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('slot_type', models.CharField(choices=[('short', 'Short (15 minutes)'), ('long', 'Long (30 minutes)')], max_length=10)),
+                ('timezone', models.CharField(max_length=100)),
+                ('is_booked', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_availabilities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('booked', 'Booked'), ('payment_expired', 'Payment Expired'), ('cancelled_by_patient', 'Cancelled by Patient'), ('cancelled_by_doctor', 'Cancelled by Doctor'), ('cancelled_by_admin', 'Cancelled by Admin'), ('rescheduled', 'Rescheduled'), ('completed', 'Completed'), ('no_show', 'No Show')], max_length=30)),
+                ('booked_at', models.DateTimeField()),
+                ('rescheduled_from', models.UUIDField(blank=True, null=True)),
+                ('extended_info', models.JSONField(blank=True, null=True)),
+                ('note', models.TextField(blank=True, null=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=6)),
+                ('is_initial', models.BooleanField(default=True)),
+                ('logs', models.JSONField(blank=True, default=list)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_appointments', to=settings.AUTH_USER_MODEL)),
+                ('updated_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('availability', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='appointment', to='appointment.archivedavailability')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedavailability',
+            index=models.Index(fields=['doctor', 'start_time'], name='archived_avail_doctor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['patient', 'status'], name='archived_appt_patient_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class AppointmentAvailability(models.Model):
     SLOT_TYPE_CHOICES = [
@@ -20,6 +21,9 @@ class AppointmentAvailability(models.Model):
     class Meta:
         unique_together = ("doctor", "start_time")
         ordering = ["start_time"]
+        indexes = [
+            models.Index(fields=["doctor", "is_booked", "start_time"], name="avail_doctor_booked_start_idx"),
+        ]
 
     def __str__(self):
         return f"{self.doctor.email} | {self.start_time} - {self.end_time}"
@@ -52,6 +56,13 @@ class Appointment(models.Model):
     price = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
     is_initial = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["patient", "status"], name="appt_patient_status_idx"),
+            # Expiry sweeper: status='pending' AND booked_at <= cutoff
+            models.Index(fields=["status", "booked_at"], name="appt_status_booked_at_idx"),
+        ]
+
     def __str__(self):
         return f"{self.patient.email} -> {self.availability.doctor.email} [{self.status}]"
 
@@ -69,8 +80,132 @@ class AppointmentActionLog(models.Model):
     appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name="logs")
     action_type = models.CharField(max_length=20, choices=ACTION_CHOICES)
     performed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
-    performed_at = models.DateTimeField(auto_now_add=True)
+    # Set when the action happens, not when a buffered entry is written (see audit_log)
+    performed_at = models.DateTimeField(default=timezone.now, editable=False)
     note = models.TextField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.action_type} on {self.appointment} by {self.performed_by}"
+
+
+class DoctorDailySchedule(models.Model):
+    """
+    Per-doctor, per-day counts for the dashboards, keyed by the slot's local
+    date (in its own timezone). Derived data: kept in step by
+    appointment.schedule_summary and rebuildable with
+    `manage.py backfill_doctor_schedules`.
+    """
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_schedules")
+    date = models.DateField()
+    slots = models.PositiveIntegerField(default=0)
+    booked = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    no_show = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("doctor", "date")
+        ordering = ["date"]
+        indexes = [
+            # Admin dashboard: all doctors over a date range
+            models.Index(fields=["date"], name="schedule_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id} | {self.date}: {self.booked}/{self.slots} booked"
+
+
+class AvailabilityTemplate(models.Model):
+    """
+    A doctor's recurring weekly availability (e.g. Mondays 09:00-12:00,
+    short slots). Its slots are computed on read (appointment.recurring) and
+    only written to AppointmentAvailability when a patient holds or books one.
+    """
+    WEEKDAY_CHOICES = [
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    ]
+
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="availability_templates")
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    slot_type = models.CharField(max_length=10, choices=AppointmentAvailability.SLOT_TYPE_CHOICES)
+    timezone = models.CharField(max_length=100)
+    valid_from = models.DateField()
+    valid_until = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["weekday", "start_time"]
+        indexes = [
+            models.Index(fields=["doctor", "is_active"], name="template_doctor_active_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id} | {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+
+class ArchivedAvailability(models.Model):
+    """
+    Cold copy of an AppointmentAvailability moved out of the hot table by
+    appointment.archive. Same field names, so the availability serializers
+    render it unchanged.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_availabilities")
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    slot_type = models.CharField(max_length=10, choices=AppointmentAvailability.SLOT_TYPE_CHOICES)
+    timezone = models.CharField(max_length=100)
+    is_booked = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["start_time"]
+        indexes = [
+            models.Index(fields=["doctor", "start_time"], name="archived_avail_doctor_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id} | {self.start_time} - {self.end_time} (archived)"
+
+
+class ArchivedAppointment(models.Model):
+    """
+    Cold copy of an Appointment (with its action logs as JSON) moved out of
+    the hot table by appointment.archive. Same field names as Appointment,
+    so AppointmentSerializer renders it unchanged.
+    """
+    id = models.UUIDField(primary_key=True, editable=False)
+    availability = models.OneToOneField(ArchivedAvailability, on_delete=models.CASCADE, related_name="appointment")
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_appointments")
+    status = models.CharField(max_length=30, choices=Appointment.STATUS_CHOICES)
+    booked_at = models.DateTimeField()
+    # Plain id: the original may be hot or archived
+    rescheduled_from = models.UUIDField(null=True, blank=True)
+    extended_info = models.JSONField(null=True, blank=True)
+    note = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.SET_NULL, null=True)
+    updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.SET_NULL, null=True)
+    is_deleted = models.BooleanField(default=False)
+    price = models.DecimalField(max_digits=6, decimal_places=2, default=0.00)
+    is_initial = models.BooleanField(default=True)
+    logs = models.JSONField(default=list, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["patient", "status"], name="archived_appt_patient_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.patient_id} [{self.status}] (archived)"
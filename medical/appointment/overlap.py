@@ -0,0 +1,85 @@
+from bisect import bisect_left
+
+from .models import AppointmentAvailability
+
+
+class IntervalIndex:
+    """
+    Sorted array of (start, end) intervals with a running maximum of end
+    times, so "does [start, end) overlap anything?" is a single bisect.
+    Works even if the stored intervals overlap each other.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [start for start, _ in self.intervals]
+        self.max_ends = []
+        running_max = None
+        for _, end in self.intervals:
+            running_max = end if running_max is None or end > running_max else running_max
+            self.max_ends.append(running_max)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlaps(self, start, end):
+        # Every interval starting before `end` is a candidate; one of them
+        # overlaps iff the largest end among them is after `start`.
+        idx = bisect_left(self.starts, end)
+        return idx > 0 and self.max_ends[idx - 1] > start
+
+
+def load_doctor_intervals(doctor, window_start, window_end, exclude_ids=None):
+    """
+    Load the doctor's availabilities touching [window_start, window_end) with
+    one query and return them as an IntervalIndex.
+    """
+    queryset = AppointmentAvailability.objects.filter(
+        doctor=doctor,
+        start_time__lt=window_end,
+        end_time__gt=window_start,
+    )
+    if exclude_ids:
+        queryset = queryset.exclude(id__in=exclude_ids)
+    return IntervalIndex(queryset.values_list('start_time', 'end_time'))
+
+
+def find_conflicts(candidates, existing):
+    """
+    Check a batch of candidate intervals against an IntervalIndex and against
+    each other in O(n log n).
+
+    `candidates` is a list of (key, start, end). Returns a dict with the keys
+    that overlap an existing interval ("existing") and the keys that overlap
+    another candidate ("within_batch"), both in submission order.
+    """
+    existing_conflicts = [key for key, start, end in candidates if existing.overlaps(start, end)]
+
+    batch_conflicts = set()
+    ordered = sorted(range(len(candidates)), key=lambda i: candidates[i][1])
+    latest = None  # index of the candidate with the greatest end so far
+    for i in ordered:
+        _, start, end = candidates[i]
+        if latest is not None and candidates[latest][2] > start:
+            batch_conflicts.add(i)
+            batch_conflicts.add(latest)
+        if latest is None or end > candidates[latest][2]:
+            latest = i
+
+    return {
+        "existing": existing_conflicts,
+        "within_batch": [candidates[i][0] for i in sorted(batch_conflicts)],
+    }
+
+
+def check_doctor_conflicts(doctor, candidates, exclude_ids=None):
+    """
+    Load the doctor's intervals covering the whole batch in one query and
+    run find_conflicts against them.
+    """
+    if not candidates:
+        return {"existing": [], "within_batch": []}
+    window_start = min(start for _, start, _ in candidates)
+    window_end = max(end for _, _, end in candidates)
+    existing = load_doctor_intervals(doctor, window_start, window_end, exclude_ids=exclude_ids)
+    return find_conflicts(candidates, existing)
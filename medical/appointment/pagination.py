@@ -0,0 +1,191 @@
+"""
+Keyset ("seek") pagination for the appointment and availability listings.
+
+Clients opt in with `?cursor=` (empty for the first page) and follow the
+opaque `next` / `previous` links. Each page is a range read on an ordered
+key, WHERE (start_time, id) > (last_start_time, last_id), so page 500 costs
+the same as page 1 and no COUNT(*) is run. Without `cursor` the views keep
+their page-number responses (`count`, `page`).
+"""
+import base64
+import binascii
+import json
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values, reverse=False):
+    payload = json.dumps({"k": [str(value) for value in values], "r": int(reverse)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Return (values, reverse); raises ValueError for a malformed cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        values, reverse = payload["k"], bool(payload["r"])
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError) as e:
+        raise ValueError("malformed cursor") from e
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise ValueError("malformed cursor")
+    return values, reverse
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """
+    Q for rows strictly after `values` in `ordering` (before, if reverse):
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    lookup = "lt" if reverse else "gt"
+    condition = Q()
+    for index, field in enumerate(ordering):
+        exact = {ordering[i]: values[i] for i in range(index)}
+        condition |= Q(**exact, **{f"{field}__{lookup}": values[index]})
+    return condition
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination unless the request carries `cursor`, in which
+    case rows are paged by `ordering` (unique, ascending; last field must be
+    the primary key).
+    """
+    ordering = ("id",)
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = self.cursor_query_param in request.query_params
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view=view)
+        return self._keyset_page(list(self._keyset_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset for async views: same pages, async ORM reads."""
+        self.use_keyset = self.cursor_query_param in request.query_params
+        if self.use_keyset:
+            return self._keyset_page([row async for row in self._keyset_queryset(queryset, request)])
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+    def _keyset_queryset(self, queryset, request):
+        """Ordered, filtered and sliced queryset for the requested cursor page."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.keyset_page_size = self.get_page_size(request)
+
+        cursor = request.query_params[self.cursor_query_param]
+        values, reverse = None, False
+        if cursor:
+            try:
+                values, reverse = decode_cursor(cursor)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            if len(values) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+        self.cursor_values, self.reverse = values, reverse
+
+        if isinstance(queryset, list):
+            return self._keyset_list(queryset, values, reverse)
+
+        direction = "-" if reverse else ""
+        queryset = queryset.order_by(*[direction + field for field in self.ordering])
+        if values is not None:
+            try:
+                queryset = queryset.filter(keyset_filter(self.ordering, values, reverse=reverse))
+            except (DjangoValidationError, ValueError):
+                # Well-formed cursor holding values the key fields can't parse
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[:self.keyset_page_size + 1]
+
+    def _keyset_list(self, rows, values, reverse):
+        """The same page cut from an in-memory list of model instances."""
+        rows = sorted(rows, key=self._key, reverse=reverse)
+        if values is not None and rows:
+            try:
+                key = self._parse_key(type(rows[0]), values)
+            except (DjangoValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            rows = [row for row in rows if (self._key(row) < key if reverse else self._key(row) > key)]
+        return rows[:self.keyset_page_size + 1]
+
+    def _parse_key(self, model, values):
+        key = []
+        for field_path, value in zip(self.ordering, values):
+            *relations, name = field_path.split("__")
+            field_model = model
+            for relation in relations:
+                field_model = field_model._meta.get_field(relation).related_model
+            key.append(field_model._meta.get_field(name).to_python(value))
+        return key
+
+    def _keyset_page(self, rows):
+        values, reverse = self.cursor_values, self.reverse
+        has_more = len(rows) > self.keyset_page_size
+        rows = rows[:self.keyset_page_size]
+        if reverse:
+            rows.reverse()
+
+        # Going forward there is a previous page iff we came from a cursor;
+        # going backward there is always a next page (the one we came from).
+        self.has_next = has_more if not reverse else True
+        self.has_previous = values is not None if not reverse else has_more
+        self.first_key = self._key(rows[0]) if rows else values
+        self.last_key = self._key(rows[-1]) if rows else values
+        return rows
+
+    def _key(self, obj):
+        return [attrgetter(field.replace("__", "."))(obj) for field in self.ordering]
+
+    def get_next_link(self):
+        if not self.use_keyset:
+            return super().get_next_link()
+        if not self.has_next or self.last_key is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, encode_cursor(self.last_key))
+
+    def get_previous_link(self):
+        if not self.use_keyset:
+            return super().get_previous_link()
+        if not self.has_previous or self.first_key is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encode_cursor(self.first_key, reverse=True))
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+
+class AvailabilityKeysetPagination(KeysetPagination):
+    ordering = ("start_time", "id")
+
+
+class AppointmentKeysetPagination(KeysetPagination):
+    ordering = ("availability__start_time", "id")
@@ -0,0 +1,75 @@
+"""
+Memoised "has this patient had a booked/completed appointment?" flag used
+for returning-patient pricing.
+
+Only positive answers are cached: once a patient qualifies they normally
+stay qualified, so their later bookings skip the EXISTS query. A miss is
+always re-checked against the database, which keeps bulk `.update()` calls
+(that bypass signals) from pinning a patient at the new patient fee.
+
+The flag is written only by Appointment signals, after commit, when a row
+enters COMPLETED_APPOINTMENT_STATUSES, and dropped when one leaves. Reads
+never populate it, so a read can't race a cancellation and re-cache a
+stale True. `manage.py reconcile_returning_patients` rewarms the cache
+(e.g. after a flush) and reports drift.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .constants import COMPLETED_APPOINTMENT_STATUSES
+from .models import Appointment, ArchivedAppointment
+
+CACHE_PREFIX = "returning_patient"
+DEFAULT_CACHE_TTL = None  # kept until a signal drops it
+
+
+def _key(patient_id):
+    return f"{CACHE_PREFIX}:{patient_id}"
+
+
+def cache_ttl():
+    return getattr(settings, 'RETURNING_PATIENT_CACHE_TTL', DEFAULT_CACHE_TTL)
+
+
+def query_prior_appointment(patient_id):
+    return Appointment.objects.filter(
+        patient_id=patient_id,
+        status__in=COMPLETED_APPOINTMENT_STATUSES
+    ).exists() or ArchivedAppointment.objects.filter(
+        patient_id=patient_id,
+        status__in=COMPLETED_APPOINTMENT_STATUSES
+    ).exists()
+
+
+def has_prior_appointment(patient_id):
+    """True if the patient has a booked or completed appointment."""
+    if cache.get(_key(patient_id)):
+        return True
+    return query_prior_appointment(patient_id)
+
+
+def mark_returning_patient(patient_id):
+    # Deferred so a rolled-back booking can't leave the flag behind
+    transaction.on_commit(lambda: cache.set(_key(patient_id), True, timeout=cache_ttl()))
+
+
+def forget_returning_patient(patient_id):
+    # Dropped now and after commit, so no reader re-caches a stale True
+    # from rows this transaction is changing.
+    cache.delete(_key(patient_id))
+    transaction.on_commit(lambda: cache.delete(_key(patient_id)))
+
+
+def cached_returning_patients(patient_ids):
+    """Subset of `patient_ids` currently flagged in the cache."""
+    keys = {_key(patient_id): patient_id for patient_id in patient_ids}
+    return {keys[key] for key, value in cache.get_many(list(keys)).items() if value}
+
+
+def set_returning_patients(patient_ids):
+    cache.set_many({_key(patient_id): True for patient_id in patient_ids}, timeout=cache_ttl())
+
+
+def clear_returning_patients(patient_ids):
+    cache.delete_many([_key(patient_id) for patient_id in patient_ids])
@@ -0,0 +1,145 @@
+"""
+Derive select_related / prefetch_related / only() from a serializer's
+field tree, so list endpoints load nested representations in a fixed
+number of queries instead of one (or more) per row.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField
+
+
+def _get_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _concrete_field_names(model):
+    return [field.name for field in model._meta.concrete_fields]
+
+
+def _is_single_relation(field):
+    # Forward FK / OneToOne, or the reverse side of a OneToOne
+    return field is not None and field.is_relation and (field.many_to_one or field.one_to_one)
+
+
+class _Plan:
+    def __init__(self):
+        self.select = set()
+        self.prefetch = []
+        self.only = set()
+
+
+def _add_model_fields(plan, model, prefix, names):
+    for name in names:
+        plan.only.add(prefix + name)
+    plan.only.add(prefix + model._meta.pk.name)
+
+
+def _collect(serializer, model, prefix, plan):
+    """Walk one serializer level; returns nothing, fills `plan`."""
+    restrict = True
+    fields = set()
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+            # Arbitrary attribute access: keep every column of this model
+            restrict = False
+            continue
+
+        source_attrs = field.source.split('.')
+        model_field = _get_field(model, source_attrs[0])
+
+        if isinstance(field, serializers.ListSerializer) or isinstance(field, ManyRelatedField):
+            if model_field is None or not model_field.is_relation:
+                restrict = False
+                continue
+            lookup = prefix + source_attrs[0]
+            child = getattr(field, 'child', None)
+            if isinstance(child, serializers.ModelSerializer) and len(source_attrs) == 1:
+                related_qs = optimize_for_serializer(model_field.related_model._default_manager.all(), child)
+                plan.prefetch.append(Prefetch(lookup, queryset=related_qs))
+            else:
+                plan.prefetch.append(lookup)
+            continue
+
+        if isinstance(field, serializers.BaseSerializer):
+            if len(source_attrs) != 1 or not _is_single_relation(model_field):
+                restrict = False
+                continue
+            plan.select.add(prefix + source_attrs[0])
+            if model_field.concrete:
+                fields.add(source_attrs[0])
+            _collect(field, model_field.related_model, prefix + source_attrs[0] + '__', plan)
+            continue
+
+        if model_field is None:
+            # Property or method on the model
+            restrict = False
+            continue
+
+        if len(source_attrs) == 1 or not _is_single_relation(model_field):
+            if model_field.concrete:
+                fields.add(source_attrs[0])
+            else:
+                restrict = False
+            continue
+
+        # Dotted source through a relation, e.g. "sender.first_name"
+        _collect_dotted(source_attrs, model, prefix, plan, fields)
+
+    if restrict:
+        _add_model_fields(plan, model, prefix, fields)
+    else:
+        _add_model_fields(plan, model, prefix, _concrete_field_names(model))
+
+
+def _collect_dotted(source_attrs, model, prefix, plan, fields):
+    current_model, current_prefix = model, prefix
+    for index, attr in enumerate(source_attrs[:-1]):
+        relation = _get_field(current_model, attr)
+        if not _is_single_relation(relation):
+            return
+        if relation.concrete:
+            if index == 0:
+                fields.add(attr)
+            else:
+                plan.only.add(current_prefix + attr)
+        plan.select.add(current_prefix + attr)
+        current_model = relation.related_model
+        current_prefix = current_prefix + attr + '__'
+
+    leaf = _get_field(current_model, source_attrs[-1])
+    if leaf is not None and leaf.concrete:
+        _add_model_fields(plan, current_model, current_prefix, [leaf.name])
+    else:
+        _add_model_fields(plan, current_model, current_prefix, _concrete_field_names(current_model))
+
+
+def optimize_for_serializer(queryset, serializer):
+    """
+    Apply select_related / prefetch_related / only() to `queryset` for the
+    fields `serializer` (class or instance) will read.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    plan = _Plan()
+    _collect(serializer, queryset.model, '', plan)
+
+    if plan.select:
+        queryset = queryset.select_related(*sorted(plan.select))
+    if plan.prefetch:
+        queryset = queryset.prefetch_related(*plan.prefetch)
+    return queryset.only(*sorted(plan.only))
+
+
+class SerializerOptimizedQuerysetMixin:
+    """Generic view mixin: optimise the filtered queryset for the view's serializer."""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return optimize_for_serializer(queryset, self.get_serializer_class())
@@ -0,0 +1,152 @@
+"""
+Lazily expanded recurring availability (AvailabilityTemplate).
+
+Template slots are computed on read for the requested window and are only
+written to AppointmentAvailability when a patient holds or books one. A
+virtual slot's id is a deterministic UUIDv8 carrying its template id and
+start time, so clients pass it to the hold/booking endpoints exactly like a
+concrete slot's id, and the row materialised for it keeps that id.
+
+A template slot is hidden wherever the doctor already has a concrete slot
+(including one materialised from it) or an earlier-starting template slot
+overlapping it.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import AppointmentAvailability, AvailabilityTemplate
+from .overlap import load_doctor_intervals
+from .slot_times import SLOT_INTERVALS, build_slot_grid, get_zone
+
+# Widest window (in days) a single read expands templates over
+MAX_EXPANSION_DAYS = 62
+
+_UUID_VERSION = 8
+_SECONDS_MASK = (1 << 62) - 1
+
+
+def virtual_slot_id(template_id, start_time):
+    """UUIDv8: 48-bit template id | version | 12 zero bits | variant | 62-bit epoch seconds."""
+    seconds = int(start_time.timestamp())
+    return uuid.UUID(int=(template_id << 80) | (_UUID_VERSION << 76) | (0b10 << 62) | seconds)
+
+
+def decode_virtual_slot_id(value):
+    """(template_id, start_time in UTC) for a virtual slot id, else None."""
+    try:
+        value = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+    except ValueError:
+        return None
+    if value.version != _UUID_VERSION or (value.int >> 64) & 0xFFF:
+        return None
+    return value.int >> 80, datetime.fromtimestamp(value.int & _SECONDS_MASK, tz=dt_timezone.utc)
+
+
+def active_templates(start_date, end_date, doctor_ids=None):
+    queryset = AvailabilityTemplate.objects.filter(is_active=True, valid_from__lte=end_date).filter(
+        Q(valid_until__isnull=True) | Q(valid_until__gte=start_date)
+    ).select_related('doctor')
+    if doctor_ids is not None:
+        queryset = queryset.filter(doctor_id__in=doctor_ids)
+    return queryset
+
+
+def _template_slots(template, window_start, window_end):
+    tz = get_zone(template.timezone)
+    first_day = max(window_start.astimezone(tz).date(), template.valid_from)
+    last_day = window_end.astimezone(tz).date()
+    if template.valid_until is not None:
+        last_day = min(last_day, template.valid_until)
+    if first_day > last_day:
+        return []
+    grid = build_slot_grid(
+        first_day, last_day, [template.weekday], template.start_time, template.end_time,
+        SLOT_INTERVALS.get(template.slot_type, SLOT_INTERVALS["long"]), template.timezone,
+    )
+    return [
+        (start, end)
+        for slots in grid.values() for start, end in slots
+        if window_start <= start < window_end
+    ]
+
+
+def virtual_slots(window_start, window_end, doctor_ids=None):
+    """
+    Unsaved AppointmentAvailability instances for the open template slots
+    starting in [window_start, window_end), sorted by (doctor, start).
+    One query for the templates plus one per doctor that has any.
+    """
+    start_date = (window_start - timedelta(days=1)).date()
+    end_date = (window_end + timedelta(days=1)).date()
+    by_doctor = defaultdict(list)
+    for template in active_templates(start_date, end_date, doctor_ids=doctor_ids):
+        by_doctor[template.doctor_id].append(template)
+
+    result = []
+    for doctor_id in sorted(by_doctor):
+        candidates = sorted(
+            (start, end, template)
+            for template in by_doctor[doctor_id]
+            for start, end in _template_slots(template, window_start, window_end)
+        )
+        if not candidates:
+            continue
+        existing = load_doctor_intervals(doctor_id, candidates[0][0], max(end for _, end, _ in candidates))
+        latest_end = None
+        for start, end, template in candidates:
+            if existing.overlaps(start, end) or (latest_end is not None and start < latest_end):
+                continue
+            latest_end = end
+            result.append(AppointmentAvailability(
+                id=virtual_slot_id(template.id, start),
+                doctor=template.doctor,
+                start_time=start,
+                end_time=end,
+                slot_type=template.slot_type,
+                timezone=template.timezone,
+                is_booked=False,
+            ))
+    return result
+
+
+def materialise_virtual_slot(availability_id):
+    """
+    Make sure a virtual slot has its AppointmentAvailability row. Returns the
+    row, or None if `availability_id` isn't a virtual slot that is still open.
+    """
+    decoded = decode_virtual_slot_id(availability_id)
+    if decoded is None:
+        return None
+    slot_id = virtual_slot_id(*decoded)
+    existing = AppointmentAvailability.objects.filter(id=slot_id).first()
+    if existing is not None:
+        return existing
+
+    template_id, start = decoded
+    template = AvailabilityTemplate.objects.filter(id=template_id, is_active=True).first()
+    if template is None or start <= now():
+        return None
+    # Recompute the slot's day so overlap rules match what listings showed
+    slot = next(
+        (
+            candidate
+            for candidate in virtual_slots(start - timedelta(days=1), start + timedelta(days=1),
+                                           doctor_ids=[template.doctor_id])
+            if candidate.id == slot_id
+        ),
+        None,
+    )
+    if slot is None:
+        return None
+    try:
+        with transaction.atomic():
+            slot.save(force_insert=True)
+    except IntegrityError:
+        # Materialised concurrently (same id), or a concrete slot took the time
+        return AppointmentAvailability.objects.filter(id=slot_id).first()
+    return slot
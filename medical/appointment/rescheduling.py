@@ -0,0 +1,324 @@
+"""
+Move open appointments to other slots: one at a time (patient, doctor or
+admin rescheduling) or a whole doctor session at once (the doctor called
+in sick) in a single transaction.
+
+Rows are locked in one fixed order everywhere in this module, the same
+order cancel and bulk_transition use: appointments first, then every slot
+involved (old and new) ordered by availability id. Two reschedules that
+touch the same slots then queue instead of deadlocking. A deadlock the
+database still reports (gap locks, a caller with another order) is
+retried RESCHEDULE_DEADLOCK_RETRIES times with jittered exponential
+backoff; a lock wait timeout is not retried. Both surface as
+RescheduleBusy, not as a generic error.
+
+Time spent in the locking reads is recorded per process; see
+lock_wait_metrics().
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from .audit_log import record_actions
+from .availability_calendar import invalidate_availability_calendar
+from .holds import release_holds
+from .models import Appointment, AppointmentAvailability
+from .patient_history import forget_returning_patient
+from .recurring import materialise_virtual_slot
+from .schedule_summary import keys_for_slots, schedule_refresh
+from .status_transitions import OPEN_STATUSES, scoped_appointments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEADLOCK_RETRIES = 3
+DEFAULT_RETRY_BACKOFF_MS = 50
+
+# MySQL error codes / PostgreSQL SQLSTATEs
+_DEADLOCK_CODES = {1213, '40P01'}
+_LOCK_TIMEOUT_CODES = {1205, '55P03'}
+
+
+class RescheduleRejected(Exception):
+    """The move is not allowed or not possible; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class RescheduleBusy(Exception):
+    """The rows stayed locked (timeout, or deadlocks after every retry); the client may try again."""
+
+
+# ──────────────── Lock wait metrics ────────────────
+
+class LockWaitStats:
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self.count = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+            self.deadlocks = 0
+            self.retries = 0
+            self.timeouts = 0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._recent.append(seconds)
+            self.count += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, longest = self.count, self.total_seconds, self.max_seconds
+            deadlocks, retries, timeouts = self.deadlocks, self.retries, self.timeouts
+
+        def pct(value):
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(len(recent) * value / 100))] * 1000, 2)
+
+        return {
+            "lock_acquisitions": count,
+            "lock_wait_total_ms": round(total * 1000, 2),
+            "lock_wait_max_ms": round(longest * 1000, 2),
+            "lock_wait_p50_ms": pct(50),
+            "lock_wait_p95_ms": pct(95),
+            "lock_wait_p99_ms": pct(99),
+            "deadlocks": deadlocks,
+            "retries": retries,
+            "lock_timeouts": timeouts,
+        }
+
+
+_stats = LockWaitStats()
+
+
+def lock_wait_metrics():
+    """Counters and recent lock wait percentiles for this process."""
+    return _stats.snapshot()
+
+
+def reset_lock_wait_metrics():
+    _stats.reset()
+
+
+def _timed_lock(queryset):
+    started = time.perf_counter()
+    rows = list(queryset)
+    _stats.observe(time.perf_counter() - started)
+    return rows
+
+
+# ──────────────── Deadlock retry ────────────────
+
+def _error_code(exc):
+    cause = exc.__cause__
+    code = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+    if code is None and exc.args:
+        code = exc.args[0]
+    return code
+
+
+def _with_retry(function, *args):
+    retries = getattr(settings, 'RESCHEDULE_DEADLOCK_RETRIES', DEFAULT_DEADLOCK_RETRIES)
+    backoff = getattr(settings, 'RESCHEDULE_RETRY_BACKOFF_MS', DEFAULT_RETRY_BACKOFF_MS) / 1000.0
+    attempt = 0
+    while True:
+        try:
+            return function(*args)
+        except OperationalError as exc:
+            code = _error_code(exc)
+            if code in _LOCK_TIMEOUT_CODES:
+                _stats.incr('timeouts')
+                raise RescheduleBusy("Timed out waiting for the appointment or slot to be released.") from exc
+            if code not in _DEADLOCK_CODES:
+                raise
+            _stats.incr('deadlocks')
+            # Inside an outer transaction the retry would run in a rolled-back block
+            if attempt >= retries or connection.in_atomic_block:
+                raise RescheduleBusy("The appointment or slot is being changed by another request.") from exc
+            attempt += 1
+            _stats.incr('retries')
+            delay = backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            logger.info("Deadlock while rescheduling; retry %d in %.0fms", attempt, delay * 1000)
+            time.sleep(delay)
+
+
+# ──────────────── Moves ────────────────
+
+def _lock_slots(slot_ids):
+    return {
+        slot.id: slot
+        for slot in _timed_lock(
+            AppointmentAvailability.objects.select_for_update().filter(id__in=set(slot_ids)).order_by('id')
+        )
+    }
+
+
+def _apply_moves(user, moves, note=None):
+    """
+    moves: [(old appointment, old slot, new slot)], all locked. Marks the
+    old appointments rescheduled, swaps the slots' is_booked flags and
+    creates the new appointments, with the old status, price and (for
+    unpaid ones) payment deadline, with bulk statements. Returns the new
+    appointments in order.
+    """
+    Appointment.objects.filter(id__in=[old.id for old, _, _ in moves]).update(status='rescheduled', updated_by=user)
+    AppointmentAvailability.objects.filter(id__in=[slot.id for _, slot, _ in moves]).update(is_booked=False)
+    AppointmentAvailability.objects.filter(id__in=[slot.id for _, _, slot in moves]).update(is_booked=True)
+    new_appointments = Appointment.objects.bulk_create([
+        Appointment(
+            availability=new_slot,
+            patient_id=old.patient_id,
+            # An unpaid (pending) appointment stays unpaid in its new slot
+            status=old.status,
+            rescheduled_from=old,
+            created_by=user,
+            is_deleted=False,
+            price=old.price,
+            is_initial=old.is_initial,
+        )
+        for old, _, new_slot in moves
+    ])
+    # ...and keeps its payment deadline: the expiry sweep counts from booked_at
+    for (old, _, _), appointment in zip(moves, new_appointments):
+        if old.status == 'pending':
+            Appointment.objects.filter(id=appointment.id).update(booked_at=old.booked_at)
+            appointment.booked_at = old.booked_at
+    record_actions([(appointment, "rescheduled", user, note) for appointment in new_appointments])
+
+    # .update() and bulk_create() skip the model signals; keep the calendar,
+    # daily schedule summary and returning-patient flag in step by hand.
+    slots = [slot for _, old_slot, new_slot in moves for slot in (old_slot, new_slot)]
+    invalidate_availability_calendar(*{slot.doctor_id for slot in slots})
+    schedule_refresh(keys_for_slots(slots))
+    for patient_id in {old.patient_id for old, _, _ in moves}:
+        forget_returning_patient(patient_id)
+    return new_appointments
+
+
+def _reschedule(user, appointment_id, new_availability_id):
+    with transaction.atomic():
+        old = _timed_lock(scoped_appointments(user).select_for_update(of=('self',)).filter(id=appointment_id))
+        if not old:
+            raise RescheduleRejected("Appointment not found.", status=404)
+        old = old[0]
+        if old.status not in OPEN_STATUSES:
+            raise RescheduleRejected(f"Cannot reschedule appointment with status '{old.status}'")
+
+        slots = _lock_slots([old.availability_id, new_availability_id])
+        new_slot = slots.get(new_availability_id)
+        if new_slot is None or new_slot.is_booked or Appointment.objects.filter(availability=new_slot).exists():
+            raise RescheduleRejected("Selected time slot is no longer available or does not exist.")
+        if new_slot.id == old.availability_id:
+            raise RescheduleRejected("The appointment is already in this slot.")
+
+        new_appointment, = _apply_moves(user, [(old, slots[old.availability_id], new_slot)])
+    release_holds([old.availability_id])
+    return old, new_appointment
+
+
+def reschedule_appointment(user, appointment_id, new_availability_id):
+    """
+    Move one open appointment visible to `user` to a free slot. Returns
+    (old appointment, new appointment). Raises RescheduleRejected or
+    RescheduleBusy.
+    """
+    if user.role not in ('patient', 'doctor', 'admin'):
+        raise RescheduleRejected("Unauthorized role.", status=403)
+    # A recurring template's slot gets its row now, under the same id
+    materialise_virtual_slot(new_availability_id)
+    try:
+        new_availability_id = uuid.UUID(str(new_availability_id))
+    except ValueError:
+        raise RescheduleRejected("Selected time slot is no longer available or does not exist.")
+    return _with_retry(_reschedule, user, appointment_id, new_availability_id)
+
+
+def _reschedule_session(user, doctor_id, session_start, session_end, target_doctor_id, offset):
+    with transaction.atomic():
+        appointments = _timed_lock(
+            scoped_appointments(user).select_for_update(of=('self',)).filter(
+                availability__doctor_id=doctor_id,
+                availability__start_time__gte=session_start,
+                availability__start_time__lt=session_end,
+                status__in=OPEN_STATUSES,
+            ).select_related('availability').order_by('id')
+        )
+        if not appointments:
+            return []
+
+        wanted = {appointment.id: appointment.availability.start_time + offset for appointment in appointments}
+        candidates = {
+            slot_id: start_time
+            for slot_id, start_time in AppointmentAvailability.objects.filter(
+                doctor_id=target_doctor_id, start_time__in=set(wanted.values()),
+                is_booked=False, appointment__isnull=True,
+            ).values_list('id', 'start_time')
+        }
+        slots = _lock_slots([appointment.availability_id for appointment in appointments] + list(candidates))
+        free = {
+            slot.start_time: slot
+            for slot_id, slot in slots.items()
+            if slot_id in candidates and not slot.is_booked
+        }
+        missing = [str(appointment.id) for appointment in appointments if wanted[appointment.id] not in free]
+        if missing:
+            raise RescheduleRejected(
+                "No free slot at the matching time for every appointment in the session.",
+                status=409,
+                details={"unmatched_appointment_ids": missing},
+            )
+        if Appointment.objects.filter(availability__in=list(free.values())).exists():
+            raise RescheduleRejected("A target slot was booked meanwhile.", status=409)
+
+        moves = [
+            (appointment, slots[appointment.availability_id], free[wanted[appointment.id]])
+            for appointment in appointments
+        ]
+        new_appointments = _apply_moves(user, moves, note="Session rescheduled")
+    release_holds([appointment.availability_id for appointment in appointments])
+    return list(zip(appointments, new_appointments))
+
+
+def reschedule_session(user, doctor_id, session_start, session_end, target_doctor_id=None, target_start=None):
+    """
+    Move every open appointment of `doctor_id` starting in
+    [session_start, session_end) to `target_doctor_id` (default: the same
+    doctor) at the same times shifted to begin at `target_start` (default:
+    unshifted). All or nothing: each appointment needs a free target slot
+    at exactly its shifted start time, or nothing moves (409, listing the
+    unmatched appointments). Doctors may only move their own sessions.
+
+    Returns [(old appointment, new appointment)].
+    """
+    if user.role == 'doctor':
+        doctor_id = user.id
+    elif user.role != 'admin':
+        raise RescheduleRejected("Only doctors and admins can reschedule a session.", status=403)
+    target_doctor_id = target_doctor_id or doctor_id
+    offset = (target_start - session_start) if target_start else timedelta(0)
+    if target_doctor_id == doctor_id and not offset:
+        raise RescheduleRejected("Give another doctor or another start time to move the session to.")
+    return _with_retry(_reschedule_session, user, doctor_id, session_start, session_end, target_doctor_id, offset)
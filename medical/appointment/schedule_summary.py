@@ -0,0 +1,202 @@
+"""
+Maintain DoctorDailySchedule: one row per doctor per local day with slot
+and appointment-outcome counts, so dashboards read O(days) rows instead of
+scanning availabilities joined to appointments.
+
+Writes mark the (doctor, day) pairs they touch and, after commit, each of
+those days is recounted from source, a few dozen rows per day. Recounting
+a touched day rather than applying +/- deltas stays correct when a slot
+moves to another day or an appointment moves to another slot, and a
+missed update heals on the next write to that day.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from itertools import chain
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.utils.timezone import get_default_timezone, now
+
+from .models import AppointmentAvailability, ArchivedAvailability, DoctorDailySchedule
+
+# Appointment status -> summary column; other statuses aren't counted
+STATUS_COLUMNS = {
+    "booked": "booked",
+    "completed": "completed",
+    "no_show": "no_show",
+    "cancelled_by_patient": "cancelled",
+    "cancelled_by_doctor": "cancelled",
+    "cancelled_by_admin": "cancelled",
+}
+
+COUNT_COLUMNS = ("slots", "booked", "completed", "no_show", "cancelled")
+
+
+@lru_cache(maxsize=64)
+def _zone(timezone_str):
+    try:
+        return ZoneInfo(timezone_str)
+    except (ValueError, KeyError):
+        # Blank or unknown slot timezone: fall back to the project's
+        return get_default_timezone()
+
+
+def local_day(start_time, timezone_str):
+    return start_time.astimezone(_zone(timezone_str)).date()
+
+
+def _count(rows):
+    """rows of (doctor_id, start_time, timezone, status, is_deleted) -> {(doctor_id, day): counts}"""
+    counts = defaultdict(lambda: dict.fromkeys(COUNT_COLUMNS, 0))
+    for doctor_id, start_time, timezone_str, status, is_deleted in rows:
+        day_counts = counts[(doctor_id, local_day(start_time, timezone_str))]
+        day_counts["slots"] += 1
+        column = STATUS_COLUMNS.get(status) if not is_deleted else None
+        if column:
+            day_counts[column] += 1
+    return counts
+
+
+def _source_rows(queryset):
+    return queryset.values_list(
+        "doctor_id", "start_time", "timezone", "appointment__status", "appointment__is_deleted"
+    )
+
+
+def _write(doctor_id, counts_by_day, days):
+    """Upsert `days` of one doctor from counts_by_day (missing day = no slots: delete)."""
+    existing = {
+        row.date: row
+        for row in DoctorDailySchedule.objects.filter(doctor_id=doctor_id, date__in=days)
+    }
+    to_create, to_update, to_delete = [], [], []
+    for day in days:
+        counts = counts_by_day.get(day)
+        row = existing.get(day)
+        if counts is None:
+            if row is not None:
+                to_delete.append(row.pk)
+            continue
+        if row is None:
+            to_create.append(DoctorDailySchedule(doctor_id=doctor_id, date=day, **counts))
+        elif any(getattr(row, column) != value for column, value in counts.items()):
+            for column, value in counts.items():
+                setattr(row, column, value)
+            row.updated_at = now()
+            to_update.append(row)
+
+    if to_delete:
+        DoctorDailySchedule.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        DoctorDailySchedule.objects.bulk_update(to_update, list(COUNT_COLUMNS) + ["updated_at"])
+    if to_create:
+        DoctorDailySchedule.objects.bulk_create(to_create, ignore_conflicts=True)
+    return len(to_create) + len(to_update) + len(to_delete)
+
+
+def refresh_daily_schedules(keys):
+    """Recount the given (doctor_id, date) pairs: one read per doctor and table. Returns rows changed."""
+    days_by_doctor = defaultdict(set)
+    for doctor_id, day in keys:
+        days_by_doctor[doctor_id].add(day)
+
+    changed = 0
+    for doctor_id, days in days_by_doctor.items():
+        # Local dates are within +/-14h of UTC; read a window that covers
+        # them all and keep only the requested days.
+        window_start = datetime.combine(min(days) - timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+        window_end = datetime.combine(max(days) + timedelta(days=2), time.min, tzinfo=dt_timezone.utc)
+        # Archived slots still count towards their day, as in rebuild_doctor_schedule
+        rows = chain.from_iterable(
+            _source_rows(model.objects.filter(
+                doctor_id=doctor_id, start_time__gte=window_start, start_time__lt=window_end
+            ))
+            for model in (AppointmentAvailability, ArchivedAvailability)
+        )
+        counts = {day: value for (_, day), value in _count(rows).items() if day in days}
+        with transaction.atomic():
+            changed += _write(doctor_id, counts, days)
+    return changed
+
+
+def schedule_refresh(keys):
+    """Recount the given (doctor_id, date) pairs once the current transaction commits."""
+    keys = {key for key in keys if key[0] is not None and key[1] is not None}
+    if keys:
+        transaction.on_commit(lambda: refresh_daily_schedules(keys))
+
+
+def keys_for_slots(slots):
+    """(doctor_id, date) pairs for AppointmentAvailability instances."""
+    return {(slot.doctor_id, local_day(slot.start_time, slot.timezone)) for slot in slots}
+
+
+def keys_for_availability_ids(availability_ids):
+    rows = AppointmentAvailability.objects.filter(id__in=availability_ids).values_list(
+        "doctor_id", "start_time", "timezone"
+    )
+    return {(doctor_id, local_day(start_time, timezone_str)) for doctor_id, start_time, timezone_str in rows}
+
+
+def rebuild_doctor_schedule(doctor_id):
+    """
+    Recount every day of one doctor from scratch, archived rows included
+    (same lookups). Returns (rows, rows changed).
+    """
+    rows = chain.from_iterable(
+        _source_rows(model.objects.filter(doctor_id=doctor_id)).iterator(chunk_size=2000)
+        for model in (AppointmentAvailability, ArchivedAvailability)
+    )
+    counts = {day: value for (_, day), value in _count(rows).items()}
+    stored = set(DoctorDailySchedule.objects.filter(doctor_id=doctor_id).values_list("date", flat=True))
+    with transaction.atomic():
+        changed = _write(doctor_id, counts, stored | set(counts))
+    return len(counts), changed
+
+
+def _with_utilisation(totals):
+    # Share of slots taken by an appointment that wasn't cancelled
+    used = totals["booked"] + totals["completed"] + totals["no_show"]
+    totals["utilisation"] = round(used / totals["slots"], 4) if totals["slots"] else None
+    return totals
+
+
+def _grouped(queryset, key):
+    # Annotation names can't shadow model fields, so sum under sum_* and rename
+    rows = queryset.values(key).annotate(
+        **{f"sum_{column}": Coalesce(Sum(column), 0) for column in COUNT_COLUMNS}
+    ).order_by(key)
+    return [{key: row[key], **{column: row[f"sum_{column}"] for column in COUNT_COLUMNS}} for row in rows]
+
+
+def doctor_schedule_summary(doctor_id, start_date, end_date):
+    """Day rows and totals for one doctor over [start_date, end_date]."""
+    rows = DoctorDailySchedule.objects.filter(
+        doctor_id=doctor_id, date__gte=start_date, date__lte=end_date
+    ).order_by("date").values("date", *COUNT_COLUMNS)
+    days = [{**row, "date": row["date"].isoformat()} for row in rows]
+    totals = {column: sum(day[column] for day in days) for column in COUNT_COLUMNS}
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "days": days,
+        "totals": _with_utilisation(totals),
+    }
+
+
+def clinic_schedule_summary(start_date, end_date):
+    """Per-day totals across doctors, plus per-doctor totals, over [start_date, end_date]."""
+    queryset = DoctorDailySchedule.objects.filter(date__gte=start_date, date__lte=end_date).order_by()
+    days = [{**row, "date": row["date"].isoformat()} for row in _grouped(queryset, "date")]
+    doctors = [_with_utilisation(row) for row in _grouped(queryset, "doctor_id")]
+    totals = {column: sum(day[column] for day in days) for column in COUNT_COLUMNS}
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "days": days,
+        "doctors": doctors,
+        "totals": _with_utilisation(totals),
+    }
@@ -1,8 +1,12 @@
 from rest_framework import serializers
-from .models import AppointmentAvailability, Appointment, AppointmentActionLog
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from .models import AppointmentAvailability, Appointment, AppointmentActionLog, AvailabilityTemplate
 from django.utils.timezone import now
 from users.serializers import DoctorProfileSerializer, PatientProfileSerializer, UserSerializer
-from .constants import NEW_PATIENT_FEE, RETURNING_PATIENT_FEE, COMPLETED_APPOINTMENT_STATUSES
+from .constants import NEW_PATIENT_FEE, RETURNING_PATIENT_FEE
+from .patient_history import has_prior_appointment
+from .audit_log import record_action
 
 class AppointmentAvailabilitySerializer(serializers.ModelSerializer):
     doctor = UserSerializer(read_only=True)
@@ -64,10 +68,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
 
         # New billing logic: Check if patient has any previous appointments
         # Automatically determine pricing based on patient history
-        has_prior_appointments = Appointment.objects.filter(
-            patient=user,
-            status__in=COMPLETED_APPOINTMENT_STATUSES
-        ).exists()
+        has_prior_appointments = has_prior_appointment(user.id)
 
         # Set pricing based on patient history (not appointment type)
         if has_prior_appointments:
@@ -109,12 +110,8 @@ class AppointmentSerializer(serializers.ModelSerializer):
             instance.updated_by = user
             instance.save()
 
-            AppointmentActionLog.objects.create(
-                appointment=instance,
-                action_type="updated",
-                performed_by=user,
-                note=f"Fields updated: {', '.join(updated_fields)}"
-            )
+            record_action(instance, "updated", performed_by=user,
+                          note=f"Fields updated: {', '.join(updated_fields)}")
 
         return instance
 
@@ -159,3 +156,55 @@ class AppointmentPartyInfoSerializer(serializers.Serializer):
     patient_profile = PatientProfileSerializer()
     doctor_user = UserSerializer()
     doctor_profile = DoctorProfileSerializer()
+
+class BulkStatusTransitionSerializer(serializers.Serializer):
+    MAX_APPOINTMENTS = 200
+
+    appointment_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=MAX_APPOINTMENTS
+    )
+    status = serializers.ChoiceField(choices=['completed', 'no_show', 'cancelled'])
+
+    def validate_appointment_ids(self, value):
+        # Drop duplicates, keep request order
+        return list(dict.fromkeys(value))
+
+class SessionRescheduleSerializer(serializers.Serializer):
+    doctor_id = serializers.IntegerField(required=False)
+    session_start = serializers.DateTimeField()
+    session_end = serializers.DateTimeField()
+    target_doctor_id = serializers.IntegerField(required=False)
+    target_start = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if data['session_end'] <= data['session_start']:
+            raise serializers.ValidationError("session_end must be after session_start.")
+        if 'target_doctor_id' not in data and 'target_start' not in data:
+            raise serializers.ValidationError("Give target_doctor_id, target_start or both.")
+        return data
+
+class AvailabilityTemplateSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityTemplate
+        fields = '__all__'
+        read_only_fields = ['id', 'doctor', 'created_at']
+
+    def validate_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError("Unknown timezone.")
+        return value
+
+    def validate(self, data):
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time >= end_time:
+            raise serializers.ValidationError("End time must be after start time.")
+        valid_from = data.get('valid_from', getattr(self.instance, 'valid_from', None))
+        valid_until = data.get('valid_until', getattr(self.instance, 'valid_until', None))
+        if valid_until is not None and valid_until < valid_from:
+            raise serializers.ValidationError("valid_until must not be before valid_from.")
+        return data
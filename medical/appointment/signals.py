@@ -0,0 +1,97 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .availability_calendar import invalidate_availability_calendar
+from .constants import COMPLETED_APPOINTMENT_STATUSES
+from .models import Appointment, AppointmentAvailability, AvailabilityTemplate
+from .patient_history import forget_returning_patient, mark_returning_patient
+from .schedule_summary import keys_for_availability_ids, keys_for_slots, local_day, schedule_refresh
+
+# Saves limited to these fields don't change any schedule summary count
+_AVAILABILITY_FIELDS_NOT_SUMMARISED = {'is_booked'}
+_APPOINTMENT_FIELDS_SUMMARISED = {'status', 'availability', 'is_deleted'}
+
+
+@receiver(post_save, sender=AppointmentAvailability)
+@receiver(post_delete, sender=AppointmentAvailability)
+def availability_changed(sender, instance, **kwargs):
+    # Booking, cancel, reschedule and expiry all save the availability row
+    invalidate_availability_calendar(instance.doctor_id)
+
+
+@receiver(post_save, sender=AvailabilityTemplate)
+@receiver(post_delete, sender=AvailabilityTemplate)
+def availability_template_changed(sender, instance, **kwargs):
+    # Calendars include the template's virtual slots
+    invalidate_availability_calendar(instance.doctor_id)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance, created, **kwargs):
+    if instance.status in COMPLETED_APPOINTMENT_STATUSES:
+        mark_returning_patient(instance.patient_id)
+    elif not created:
+        # May have just left a counted status (cancelled, rescheduled, ...)
+        forget_returning_patient(instance.patient_id)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted(sender, instance, **kwargs):
+    forget_returning_patient(instance.patient_id)
+
+
+# ──────────────── Doctor daily schedule summary ────────────────
+
+@receiver(post_init, sender=AppointmentAvailability)
+def remember_availability_origin(sender, instance, **kwargs):
+    # Read __dict__ directly so deferred fields are never loaded
+    values = instance.__dict__
+    instance._schedule_origin = (values.get('doctor_id'), values.get('start_time'), values.get('timezone'))
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_origin(sender, instance, **kwargs):
+    instance._schedule_origin = instance.__dict__.get('availability_id')
+
+
+@receiver(post_save, sender=AppointmentAvailability)
+def availability_saved_for_schedule(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= _AVAILABILITY_FIELDS_NOT_SUMMARISED:
+        return
+    keys = keys_for_slots([instance])
+    doctor_id, start_time, timezone_str = instance._schedule_origin
+    if None not in (doctor_id, start_time, timezone_str):
+        # The slot may have moved to another day or doctor
+        keys.add((doctor_id, local_day(start_time, timezone_str)))
+    instance._schedule_origin = (instance.doctor_id, instance.start_time, instance.timezone)
+    schedule_refresh(keys)
+
+
+@receiver(post_delete, sender=AppointmentAvailability)
+def availability_deleted_for_schedule(sender, instance, **kwargs):
+    schedule_refresh(keys_for_slots([instance]))
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved_for_schedule(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & _APPOINTMENT_FIELDS_SUMMARISED:
+        return
+    keys, lookup = set(), set()
+    if Appointment.availability.is_cached(instance):
+        keys |= keys_for_slots([instance.availability])
+    else:
+        lookup.add(instance.availability_id)
+    if instance._schedule_origin not in (None, instance.availability_id):
+        lookup.add(instance._schedule_origin)
+    if lookup:
+        keys |= keys_for_availability_ids(lookup)
+    instance._schedule_origin = instance.availability_id
+    schedule_refresh(keys)
+
+
+@receiver(post_delete, sender=Appointment)
+def appointment_deleted_for_schedule(sender, instance, **kwargs):
+    if Appointment.availability.is_cached(instance):
+        schedule_refresh(keys_for_slots([instance.availability]))
+    else:
+        schedule_refresh(keys_for_availability_ids([instance.availability_id]))
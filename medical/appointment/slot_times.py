@@ -0,0 +1,92 @@
+"""
+Shared slot-time arithmetic for the availability generators (bulk, custom
+and recurring templates).
+
+Time strings are parsed once, tz objects and each day's local -> UTC
+conversion are cached, and a day's slots are laid out by adding
+precomputed offsets to its UTC window start. A year-long grid costs one
+tz conversion per day instead of one per slot.
+
+DST: a day's window runs from the first instant its start wall time
+occurs to the last instant its end wall time occurs, and slots step
+through it in real time. On the Australian spring-forward day a
+01:00-04:00 window holds two hours of slots (01:00-01:45, 03:00-03:45);
+on the fall-back day it holds four, including both 02:xx hours. A wall
+time inside the skipped hour is moved forward by the gap.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+SLOT_INTERVALS = {
+    "short": timedelta(minutes=15),
+    "long": timedelta(minutes=30),
+}
+
+# date.weekday() order; matches the English names clients send
+WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Longest local day (25h on fall-back days) plus slack, in slot offsets
+_MAX_DAY = timedelta(hours=26)
+
+
+@lru_cache(maxsize=64)
+def get_zone(timezone_str):
+    return ZoneInfo(timezone_str)
+
+
+@lru_cache(maxsize=256)
+def parse_clock(value):
+    """'HH:MM' -> time; raises ValueError."""
+    return datetime.strptime(value, '%H:%M').time()
+
+
+@lru_cache(maxsize=8192)
+def local_to_utc(day, clock, timezone_str, latest=False):
+    """
+    UTC datetime of wall time `clock` on `day` in timezone_str. An ambiguous
+    wall time resolves to its first occurrence (its last with latest=True);
+    a nonexistent one is moved forward by the gap.
+    """
+    zone = get_zone(timezone_str)
+    naive = datetime.combine(day, clock)
+    first = naive.replace(tzinfo=zone).astimezone(dt_timezone.utc)
+    if latest:
+        last = naive.replace(tzinfo=zone, fold=1).astimezone(dt_timezone.utc)
+        # fold=1 lands earlier only inside a gap; keep the forward shift there
+        if last > first:
+            return last
+    return first
+
+
+@lru_cache(maxsize=8)
+def _offsets(interval):
+    return tuple(interval * i for i in range(_MAX_DAY // interval + 2))
+
+
+def build_slot_grid(start_date, end_date, weekdays, start_clock, end_clock, interval, timezone_str):
+    """
+    Every (start, end) slot of `interval` between the wall times start_clock
+    and end_clock on each date in [start_date, end_date] whose weekday()
+    is in `weekdays`. Returns an OrderedDict of local date -> list of UTC
+    (start, end) pairs.
+    """
+    weekdays = frozenset(weekdays)
+    offsets = _offsets(interval)
+    grid = OrderedDict()
+    for day_number in range((end_date - start_date).days + 1):
+        day = start_date + timedelta(days=day_number)
+        if day.weekday() not in weekdays:
+            continue
+        window_start = local_to_utc(day, start_clock, timezone_str)
+        window_end = local_to_utc(day, end_clock, timezone_str, latest=True)
+        count = max((window_end - window_start) // interval, 0)
+        grid[day] = [(window_start + offsets[i], window_start + offsets[i + 1]) for i in range(count)]
+    return grid
+
+
+def slot_bounds(day, clock_str, interval, timezone_str):
+    """(start, end) in UTC of one slot starting at wall time clock_str on `day`; raises ValueError."""
+    start = local_to_utc(day, parse_clock(clock_str), timezone_str)
+    return start, start + interval
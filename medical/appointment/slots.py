@@ -0,0 +1,70 @@
+from collections import OrderedDict
+
+from .models import AppointmentAvailability
+from .overlap import load_doctor_intervals
+from .schedule_summary import keys_for_slots, schedule_refresh
+from .slot_times import SLOT_INTERVALS, WEEKDAY_NAMES, build_slot_grid, parse_clock
+
+# Rows per INSERT statement when writing generated slots
+BULK_CREATE_BATCH_SIZE = 1000
+
+
+def generate_slot_grid(start_date, end_date, days_of_week, start_time_str, end_time_str, slot_type, timezone_str):
+    """
+    Work out every candidate (start, end) pair for the date range in memory.
+    Returns an OrderedDict of local date -> list of (slot_start, slot_end) in UTC.
+    """
+    days_of_week = set(days_of_week)
+    return build_slot_grid(
+        start_date, end_date,
+        [number for number, name in enumerate(WEEKDAY_NAMES) if name in days_of_week],
+        parse_clock(start_time_str), parse_clock(end_time_str),
+        SLOT_INTERVALS.get(slot_type, SLOT_INTERVALS["long"]),
+        timezone_str,
+    )
+
+
+def create_slots_from_grid(doctor, grid, slot_type, timezone_str):
+    """
+    Diff the candidate grid against the doctor's existing availabilities (one
+    range query) and write the slots that don't overlap any of them with a
+    single bulk_create.
+    Returns (created_slots, per_day) where per_day maps the local date's ISO
+    string to {"created": n, "skipped": n}.
+    """
+    candidates = [slot for slots in grid.values() for slot in slots]
+    if not candidates:
+        return [], OrderedDict()
+
+    window_start = min(start for start, _ in candidates)
+    window_end = max(end for _, end in candidates)
+    existing = load_doctor_intervals(doctor, window_start, window_end)
+
+    created_slots = []
+    per_day = OrderedDict()
+    for day, slots in grid.items():
+        created = skipped = 0
+        for slot_start, slot_end in slots:
+            if existing.overlaps(slot_start, slot_end):
+                skipped += 1
+                continue
+            created_slots.append(AppointmentAvailability(
+                doctor=doctor,
+                start_time=slot_start,
+                end_time=slot_end,
+                slot_type=slot_type,
+                timezone=timezone_str
+            ))
+            created += 1
+        per_day[day.isoformat()] = {"created": created, "skipped": skipped}
+
+    # ignore_conflicts covers a concurrent request inserting the same slot
+    # between our range read and the insert (unique doctor/start_time).
+    AppointmentAvailability.objects.bulk_create(
+        created_slots,
+        batch_size=BULK_CREATE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    # bulk_create skips the model signals that keep the dashboards' summary rows current
+    schedule_refresh(keys_for_slots(created_slots))
+    return created_slots, per_day
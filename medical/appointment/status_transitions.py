@@ -0,0 +1,123 @@
+"""
+Apply one status transition to many appointments at once (end-of-session
+"mark all complete", mass cancellations) with a fixed number of queries:
+one locked read for permissions, one UPDATE per table, one bulk INSERT of
+action logs (or one buffered batch, see audit_log).
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils.timezone import now
+
+from .audit_log import record_actions
+from .availability_calendar import invalidate_availability_calendar
+from .constants import COMPLETED_APPOINTMENT_STATUSES
+from .holds import release_holds
+from .models import Appointment, AppointmentAvailability
+from .patient_history import forget_returning_patient, mark_returning_patient
+from .schedule_summary import local_day, schedule_refresh
+
+# Only open appointments can move; everything else is final
+OPEN_STATUSES = ('pending', 'booked')
+
+# target -> roles allowed to request it
+TARGET_ROLES = {
+    'completed': ('doctor', 'admin'),
+    'no_show': ('doctor', 'admin'),
+    'cancelled': ('patient', 'doctor', 'admin'),
+}
+
+PATIENT_CANCEL_CUTOFF = timedelta(hours=1)
+
+
+class TransitionNotAllowed(Exception):
+    pass
+
+
+def _new_status(target, role):
+    if target == 'cancelled':
+        return f'cancelled_by_{role}'
+    return target
+
+
+def scoped_appointments(user):
+    queryset = Appointment.objects.filter(is_deleted=False)
+    if user.role == 'doctor':
+        return queryset.filter(availability__doctor=user)
+    if user.role == 'patient':
+        return queryset.filter(patient=user)
+    return queryset
+
+
+def bulk_transition(user, appointment_ids, target):
+    """
+    Move the given appointments to `target` ('completed', 'no_show' or
+    'cancelled'). Cancelling frees the slots.
+
+    Returns a list of {"id", "result", ...} in request order, where result is
+    "updated", "not_found" (missing or not visible to `user`) or "rejected"
+    (with the current "status" and an "error").
+    Raises TransitionNotAllowed if the user's role can't request `target`.
+    """
+    if user.role not in TARGET_ROLES.get(target, ()):
+        raise TransitionNotAllowed(f"{user.role} cannot set appointments to '{target}'.")
+    new_status = _new_status(target, user.role)
+    cutoff = now() + PATIENT_CANCEL_CUTOFF
+
+    with transaction.atomic():
+        rows = {
+            row['id']: row
+            for row in scoped_appointments(user)
+            .select_for_update()
+            .filter(id__in=appointment_ids)
+            .values('id', 'status', 'patient_id', 'availability_id',
+                    'availability__doctor_id', 'availability__start_time', 'availability__timezone')
+        }
+
+        results = []
+        accepted = []
+        for appointment_id in appointment_ids:
+            row = rows.get(appointment_id)
+            if row is None:
+                results.append({"id": appointment_id, "result": "not_found"})
+                continue
+            if row['status'] not in OPEN_STATUSES:
+                error = f"Cannot change appointment with status '{row['status']}'"
+            elif user.role == 'patient' and row['availability__start_time'] < cutoff:
+                error = "Cannot cancel less than 1 hour before appointment."
+            else:
+                accepted.append(row)
+                results.append({"id": appointment_id, "result": "updated", "status": new_status})
+                continue
+            results.append({"id": appointment_id, "result": "rejected", "status": row['status'], "error": error})
+
+        if not accepted:
+            return results
+
+        Appointment.objects.filter(id__in=[row['id'] for row in accepted]).update(
+            status=new_status,
+            updated_by=user,
+        )
+        freed = []
+        if target == 'cancelled':
+            freed = [row['availability_id'] for row in accepted]
+            AppointmentAvailability.objects.filter(id__in=freed).update(is_booked=False)
+            invalidate_availability_calendar(*{row['availability__doctor_id'] for row in accepted})
+
+        record_actions([(row['id'], target, user, "Bulk status change") for row in accepted])
+
+        # .update() skips the Appointment signals; keep the daily schedule
+        # summary and the returning-patient flag in step by hand.
+        schedule_refresh({
+            (row['availability__doctor_id'], local_day(row['availability__start_time'], row['availability__timezone']))
+            for row in accepted
+        })
+        for patient_id in {row['patient_id'] for row in accepted}:
+            if new_status in COMPLETED_APPOINTMENT_STATUSES:
+                mark_returning_patient(patient_id)
+            else:
+                forget_returning_patient(patient_id)
+
+    if freed:
+        release_holds(freed)
+    return results
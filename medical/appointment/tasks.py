@@ -1,5 +1,18 @@
+import logging
+from datetime import timedelta
+
 from celery import shared_task
-from .models import Appointment
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit_log
+from .archive import run_archive
+from .availability_calendar import invalidate_availability_calendar
+from .constants import PAYMENT_WINDOW_MINUTES
+from .holds import release_hold, release_holds
+from .models import Appointment, AppointmentAvailability
+
+logger = logging.getLogger(__name__)
 
 def _expire_appointment_logic(appointment):
     if appointment.status == "pending" and appointment.availability.is_booked:
@@ -7,6 +20,7 @@ def _expire_appointment_logic(appointment):
         appointment.availability.is_booked = False
         appointment.availability.save()
         appointment.save()
+        release_hold(appointment.availability_id)
 
 @shared_task
 def expire_pending_appointment(appointment_id):
@@ -15,3 +29,63 @@ def expire_pending_appointment(appointment_id):
         _expire_appointment_logic(appointment)
     except Appointment.DoesNotExist:
         pass
+
+
+def sweep_expired_pending_appointments(now=None):
+    """
+    Move every `pending` appointment older than the payment window to
+    `payment_expired` and free its slot, using bulk UPDATEs in one
+    transaction. Rows locked by another sweeper are skipped (SKIP LOCKED),
+    and the UPDATEs re-check status, so concurrent runs never double-touch.
+    Returns {"expired": n, "slots_freed": n}.
+    """
+    cutoff = (now or timezone.now()) - timedelta(minutes=PAYMENT_WINDOW_MINUTES)
+
+    with transaction.atomic():
+        rows = list(
+            Appointment.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', booked_at__lte=cutoff)
+            .values_list('id', 'availability_id', 'availability__doctor_id')
+        )
+        if not rows:
+            return {"expired": 0, "slots_freed": 0}
+
+        appointment_ids = [appointment_id for appointment_id, _, _ in rows]
+        availability_ids = [availability_id for _, availability_id, _ in rows]
+
+        expired = Appointment.objects.filter(
+            id__in=appointment_ids, status='pending'
+        ).update(status='payment_expired')
+        slots_freed = AppointmentAvailability.objects.filter(
+            id__in=availability_ids, is_booked=True
+        ).update(is_booked=False)
+
+        invalidate_availability_calendar(*{doctor_id for _, _, doctor_id in rows})
+
+    release_holds(availability_ids)
+
+    logger.info("Expired %s pending appointments, freed %s slots", expired, slots_freed)
+    return {"expired": expired, "slots_freed": slots_freed}
+
+
+@shared_task
+def expire_pending_appointments():
+    """Periodic sweeper (see CELERY_BEAT_SCHEDULE)."""
+    return sweep_expired_pending_appointments()
+
+
+@shared_task
+def flush_action_logs():
+    """Drain buffered appointment action logs (see CELERY_BEAT_SCHEDULE and audit_log)."""
+    return audit_log.flush_action_logs()
+
+
+@shared_task
+def archive_historical_rows():
+    """Nightly archival of past slots and old final appointments (see appointment.archive)."""
+    report = run_archive()
+    logger.info(
+        "Archived %s appointments and %s availabilities (%s kept hot)",
+        report["appointments"], report["availabilities"], report["kept_hot"],
+    )
+    return {key: report[key] for key in ("appointments", "availabilities", "kept_hot")}
@@ -1,4 +1,11 @@
 from django.urls import reverse
+from io import StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIClient
 from django.utils.timezone import now, timedelta, make_aware
 from django.utils import timezone
@@ -105,6 +112,68 @@ class AvailabilityFullTestSuite(APITestCase):
         self.assertEqual(response.status_code, 201)
         self.assertIn("slots created", response.data["message"])
 
+    def test_bulk_creation_reports_per_day_counts(self):
+        self.client.force_authenticate(user=self.doctor)
+        day = (now() + timedelta(days=3)).astimezone(self.tz).date()
+        existing = self.tz.localize(datetime.combine(day, datetime.strptime("09:15", "%H:%M").time()))
+        self.create_availability(self.doctor, existing, existing + timedelta(minutes=15))
+        response = self.client.post(reverse('bulk-availability'), {
+            "start_date": day.isoformat(),
+            "end_date": (day + timedelta(days=1)).isoformat(),
+            "days_of_week": [day.strftime("%A"), (day + timedelta(days=1)).strftime("%A")],
+            "start_time": "09:00",
+            "end_time": "10:00",
+            "slot_type": "short",
+            "timezone": "Australia/Brisbane"
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 7)
+        self.assertEqual(response.data["skipped"], 1)
+        self.assertEqual(response.data["days"][day.isoformat()], {"created": 3, "skipped": 1})
+        self.assertEqual(response.data["days"][(day + timedelta(days=1)).isoformat()], {"created": 4, "skipped": 0})
+        self.assertEqual(AppointmentAvailability.objects.filter(doctor=self.doctor).count(), 8)
+
+    def test_bulk_creation_skips_slots_overlapping_longer_slot(self):
+        self.client.force_authenticate(user=self.doctor)
+        day = (now() + timedelta(days=3)).astimezone(self.tz).date()
+        existing = self.tz.localize(datetime.combine(day, datetime.strptime("09:00", "%H:%M").time()))
+        self.create_availability(self.doctor, existing, existing + timedelta(minutes=30))
+        response = self.client.post(reverse('bulk-availability'), {
+            "start_date": day.isoformat(),
+            "end_date": day.isoformat(),
+            "days_of_week": [day.strftime("%A")],
+            "start_time": "09:00",
+            "end_time": "10:00",
+            "slot_type": "short",
+            "timezone": "Australia/Brisbane"
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["days"][day.isoformat()], {"created": 2, "skipped": 2})
+
+    def test_bulk_creation_query_count_is_constant_in_date_range(self):
+        self.client.force_authenticate(user=self.doctor)
+        all_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+        first_day = (now() + timedelta(days=1)).date()
+
+        def run(start, days):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(reverse('bulk-availability'), {
+                    "start_date": start.isoformat(),
+                    "end_date": (start + timedelta(days=days - 1)).isoformat(),
+                    "days_of_week": all_days,
+                    "start_time": "09:00",
+                    "end_time": "09:15",
+                    "slot_type": "short",
+                    "timezone": "Australia/Brisbane"
+                }, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data["created"], days)
+            return len(ctx.captured_queries)
+
+        one_week = run(first_day, 7)
+        six_weeks = run(first_day + timedelta(days=7), 42)
+        self.assertEqual(one_week, six_weeks)
+
     def test_patient_cannot_access_bulk_creation(self):
         self.client.force_authenticate(user=self.patient)
         response = self.client.post(reverse('bulk-availability'), {}, format='json')
@@ -205,6 +274,45 @@ class AvailabilityFullTestSuite(APITestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn("overlap with each other", response.data["error"])
 
+    def test_custom_slots_report_every_conflict(self):
+        self.client.force_authenticate(user=self.doctor)
+        day = (now() + timedelta(days=2)).astimezone(self.tz).date()
+        for hhmm in ("09:00", "11:00"):
+            start = self.tz.localize(datetime.combine(day, datetime.strptime(hhmm, "%H:%M").time()))
+            self.create_availability(self.doctor, start, start + timedelta(minutes=30))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('custom-availability'), {
+                "date": day.isoformat(),
+                "start_times": ["09:15", "10:00", "10:10", "11:00", "13:00"],
+                "slot_type": "short"
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["conflicts"]["existing"], ["09:15", "11:00"])
+        self.assertEqual(response.data["conflicts"]["within_batch"], ["10:00", "10:10"])
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(AppointmentAvailability.objects.filter(doctor=self.doctor).count(), 2)
+
+    def test_interval_index_overlap_checks(self):
+        from appointment.overlap import IntervalIndex, find_conflicts
+        base = now()
+        index = IntervalIndex([
+            (base, base + timedelta(hours=3)),
+            (base + timedelta(minutes=30), base + timedelta(minutes=45)),
+        ])
+        self.assertTrue(index.overlaps(base + timedelta(hours=2), base + timedelta(hours=4)))
+        self.assertFalse(index.overlaps(base + timedelta(hours=3), base + timedelta(hours=4)))
+        self.assertFalse(index.overlaps(base - timedelta(hours=1), base))
+        self.assertFalse(IntervalIndex([]).overlaps(base, base + timedelta(hours=1)))
+
+        result = find_conflicts([
+            ("a", base + timedelta(hours=5), base + timedelta(hours=7)),
+            ("b", base + timedelta(hours=5, minutes=15), base + timedelta(hours=5, minutes=30)),
+            ("c", base + timedelta(hours=6), base + timedelta(hours=6, minutes=15)),
+            ("d", base + timedelta(hours=7), base + timedelta(hours=8)),
+        ], index)
+        self.assertEqual(result, {"existing": [], "within_batch": ["a", "b", "c"]})
+
     def test_patient_cannot_create_custom_slots(self):
         self.client.force_authenticate(user=self.patient)
         
@@ -356,6 +464,20 @@ class AvailabilityFullTestSuite(APITestCase):
         }, format='json')
         self.assertEqual(response.status_code, 400)
 
+    def test_update_fails_when_overlapping_another_slot(self):
+        availability = self.create_availability(self.doctor)
+        other = self.create_availability(
+            self.doctor, availability.start_time + timedelta(hours=1), availability.end_time + timedelta(hours=1)
+        )
+        self.client.force_authenticate(user=self.doctor)
+        response = self.client.put(reverse('edit-availability', args=[availability.id]), {
+            "start_time": (other.start_time + timedelta(minutes=5)).isoformat(),
+            "end_time": (other.end_time + timedelta(minutes=5)).isoformat(),
+            "slot_type": "short",
+            "timezone": "Australia/Brisbane"
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
     # ───── DELETE /availabilities/<pk>/ ─────
 
     def test_delete_unbooked_availability(self):
@@ -1966,3 +2088,1616 @@ class RaceConditionBugFixTests(APITestCase):
         self.assertNotIn("1062", error_message)
 
 
+
+
+class AvailabilityCalendarTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.tz = pytz.timezone('Australia/Brisbane')
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.doctor2 = User.objects.create_user(email='doc2@example.com', password='testpass', role='doctor', first_name='Doc2')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.day = (now() + timedelta(days=2)).astimezone(self.tz).date()
+
+        self.slots = [
+            self.create_availability(self.doctor, "09:00"),
+            self.create_availability(self.doctor, "09:15"),
+            self.create_availability(self.doctor, "09:00", day=self.day + timedelta(days=1)),
+            self.create_availability(self.doctor2, "10:00"),
+        ]
+        self.url = reverse('availability-calendar') + f'?start_date={self.day.isoformat()}&end_date={(self.day + timedelta(days=1)).isoformat()}'
+        self.client.force_authenticate(user=self.patient)
+
+    def create_availability(self, doctor, hhmm, day=None):
+        start = self.tz.localize(datetime.combine(day or self.day, datetime.strptime(hhmm, "%H:%M").time()))
+        return AppointmentAvailability.objects.create(
+            doctor=doctor,
+            start_time=start,
+            end_time=start + timedelta(minutes=15),
+            slot_type='short',
+            timezone='Australia/Brisbane'
+        )
+
+    def doctor_entry(self, data, doctor):
+        return next(entry for entry in data["doctors"] if entry["doctor_id"] == doctor.id)
+
+    def test_calendar_columnar_shape(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        entry = self.doctor_entry(response.data, self.doctor)
+        self.assertEqual(entry["days"], [self.day.isoformat(), (self.day + timedelta(days=1)).isoformat()])
+        self.assertEqual(entry["free_counts"], [2, 1])
+        self.assertEqual(entry["start_times"], [["09:00", "09:15"], ["09:00"]])
+        self.assertEqual(self.doctor_entry(response.data, self.doctor2)["free_counts"], [1])
+
+    def test_calendar_filters_by_doctor(self):
+        response = self.client.get(self.url + f'&doctor={self.doctor2.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([entry["doctor_id"] for entry in response.data["doctors"]], [self.doctor2.id])
+
+    def test_calendar_served_from_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(self.doctor_entry(response.data, self.doctor)["free_counts"], [2, 1])
+
+    def test_booking_invalidates_calendar(self):
+        self.client.get(self.url)
+        response = self.client.post(reverse('book-appointment'), {
+            "availability_id": str(self.slots[0].id)
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get(self.url)
+        entry = self.doctor_entry(response.data, self.doctor)
+        self.assertEqual(entry["free_counts"], [1, 1])
+        self.assertEqual(entry["start_times"][0], ["09:15"])
+
+    def test_cancel_invalidates_calendar(self):
+        self.client.post(reverse('book-appointment'), {"availability_id": str(self.slots[2].id)}, format='json')
+        appointment = Appointment.objects.get(availability=self.slots[2])
+        self.assertEqual(self.doctor_entry(self.client.get(self.url).data, self.doctor)["free_counts"], [2])
+
+        self.client.force_authenticate(user=self.doctor)
+        response = self.client.post(reverse('cancel-appointment', args=[appointment.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.doctor_entry(self.client.get(self.url).data, self.doctor)["free_counts"], [2, 1])
+
+    def test_reschedule_invalidates_calendar(self):
+        self.client.post(reverse('book-appointment'), {"availability_id": str(self.slots[0].id)}, format='json')
+        appointment = Appointment.objects.get(availability=self.slots[0])
+        self.client.get(self.url)
+
+        response = self.client.post(reverse('reschedule-appointment', args=[appointment.id]), {
+            "new_availability_id": str(self.slots[3].id)
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        data = self.client.get(self.url).data
+        self.assertEqual(self.doctor_entry(data, self.doctor)["free_counts"], [2, 1])
+        self.assertFalse(any(entry["doctor_id"] == self.doctor2.id for entry in data["doctors"]))
+
+    def test_expiry_invalidates_calendar(self):
+        from appointment.tasks import expire_pending_appointment
+        self.client.post(reverse('book-appointment'), {"availability_id": str(self.slots[1].id)}, format='json')
+        appointment = Appointment.objects.get(availability=self.slots[1])
+        self.assertEqual(self.doctor_entry(self.client.get(self.url).data, self.doctor)["free_counts"], [1, 1])
+
+        expire_pending_appointment(appointment.id)
+        self.assertEqual(self.doctor_entry(self.client.get(self.url).data, self.doctor)["free_counts"], [2, 1])
+
+    def test_invalid_dates_rejected(self):
+        response = self.client.get(reverse('availability-calendar') + '?start_date=2025-13-01')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('availability-calendar') + '?start_date=2025-01-01&end_date=2025-03-01')
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryPlanTests(APITestCase):
+    def test_list_view_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_list_queries', fail_on_scan=True, stdout=out)
+        self.assertNotIn("FULL SCAN", out.getvalue())
+
+    def test_full_scan_detection(self):
+        from appointment.management.commands.explain_list_queries import find_full_scans
+        self.assertEqual(
+            find_full_scans("2 0 0 SCAN appointment_appointment\n5 0 0 SEARCH orders USING INDEX x (user_id=?)", 'sqlite'),
+            ["2 0 0 SCAN appointment_appointment"]
+        )
+        self.assertEqual(find_full_scans("3 0 0 SCAN chat_message USING COVERING INDEX idx", 'sqlite'), [])
+        self.assertEqual(
+            len(find_full_scans("1 SIMPLE orders None ALL None None None None 120 10.0 Using where", 'mysql')), 1
+        )
+        self.assertEqual(
+            find_full_scans("1 SIMPLE orders None ref orders_user_id orders_user_id 8 const 3 100.0 None", 'mysql'), []
+        )
+        self.assertEqual(len(find_full_scans("Seq Scan on orders  (cost=0.00..1.01 rows=1)", 'postgresql')), 1)
+
+
+class ListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass', role='admin', is_superuser=True)
+        self.patients = [
+            User.objects.create_user(email=f'pat{i}@example.com', password='testpass', role='patient')
+            for i in range(10)
+        ]
+        start = now() + timedelta(days=1)
+        self.appointments = []
+        for i, patient in enumerate(self.patients):
+            slot = AppointmentAvailability.objects.create(
+                doctor=self.doctor,
+                start_time=start + timedelta(minutes=15 * i),
+                end_time=start + timedelta(minutes=15 * (i + 1)),
+                slot_type='short',
+                timezone='Australia/Brisbane',
+                is_booked=True
+            )
+            self.appointments.append(Appointment.objects.create(
+                availability=slot, patient=patient, status='booked', created_by=patient, updated_by=patient
+            ))
+
+    def test_doctor_appointment_list_query_count(self):
+        self.client.force_authenticate(user=self.doctor)
+        # count + page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('list-my-appointments'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+        first = response.data['results'][0]
+        self.assertEqual(first['availability']['doctor']['email'], 'doc@example.com')
+        self.assertIn(first['patient']['email'], {p.email for p in self.patients})
+
+    def test_admin_appointment_list_query_count(self):
+        self.client.force_authenticate(user=self.admin)
+        # count + page, for the hot and the archive table (read-through)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('list-available-appointments'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_availability_list_query_count(self):
+        self.client.force_authenticate(user=self.doctor)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('list-my-availabilities'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['doctor']['id'], self.doctor.id)
+
+    def test_order_list_query_count(self):
+        from order.models import Order
+        for appointment in self.appointments:
+            Order.objects.create(user=appointment.patient, appointment=appointment, amount=appointment.price)
+        self.client.force_authenticate(user=self.doctor)
+        # exists() + list
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('order-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0]['appointment']['availability']['doctor']['id'], self.doctor.id)
+
+    def test_optimizer_restricts_columns(self):
+        from appointment.queryset_optimizer import optimize_for_serializer
+        from appointment.serializers import AppointmentSerializer
+        queryset = optimize_for_serializer(Appointment.objects.all(), AppointmentSerializer)
+        sql = str(queryset.query)
+        self.assertNotIn('password', sql)
+        self.assertIn('email', sql)
+
+
+class ExpirePendingSweeperTests(APITestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.start = now() + timedelta(days=1)
+
+    def make_appointment(self, index, status='pending', age_minutes=30):
+        slot = AppointmentAvailability.objects.create(
+            doctor=self.doctor,
+            start_time=self.start + timedelta(minutes=15 * index),
+            end_time=self.start + timedelta(minutes=15 * (index + 1)),
+            slot_type='short',
+            timezone='Australia/Brisbane',
+            is_booked=True
+        )
+        appointment = Appointment.objects.create(availability=slot, patient=self.patient, status=status)
+        Appointment.objects.filter(id=appointment.id).update(booked_at=now() - timedelta(minutes=age_minutes))
+        return appointment
+
+    def test_sweeper_expires_stale_pending_and_frees_slots(self):
+        from appointment.tasks import sweep_expired_pending_appointments
+        stale = [self.make_appointment(i) for i in range(5)]
+        fresh = self.make_appointment(5, age_minutes=5)
+        paid = self.make_appointment(6, status='booked')
+
+        result = sweep_expired_pending_appointments()
+
+        self.assertEqual(result, {"expired": 5, "slots_freed": 5})
+        for appointment in stale:
+            appointment.refresh_from_db()
+            self.assertEqual(appointment.status, 'payment_expired')
+            self.assertFalse(appointment.availability.is_booked)
+        fresh.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual(fresh.status, 'pending')
+        self.assertTrue(fresh.availability.is_booked)
+        self.assertEqual(paid.status, 'booked')
+
+        # A second (or concurrent) run finds nothing left to touch
+        self.assertEqual(sweep_expired_pending_appointments(), {"expired": 0, "slots_freed": 0})
+
+    def test_sweeper_query_count_is_constant(self):
+        from appointment.tasks import sweep_expired_pending_appointments
+        for i in range(3):
+            self.make_appointment(i)
+        with CaptureQueriesContext(connection) as small:
+            sweep_expired_pending_appointments()
+        for i in range(3, 30):
+            self.make_appointment(i)
+        with CaptureQueriesContext(connection) as large:
+            result = sweep_expired_pending_appointments()
+        self.assertEqual(result["expired"], 27)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_booking_does_not_schedule_per_appointment_task(self):
+        slot = AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=self.start, end_time=self.start + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane'
+        )
+        self.client.force_authenticate(user=self.patient)
+        with mock.patch('appointment.tasks.expire_pending_appointment.apply_async') as apply_async:
+            response = self.client.post(reverse('book-appointment'), {"availability_id": str(slot.id)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        apply_async.assert_not_called()
+
+
+@override_settings(APPOINTMENT_BOOKING_STRATEGY='optimistic')
+class OptimisticBookingTests(APITestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.patient2 = User.objects.create_user(email='pat2@example.com', password='testpass', role='patient')
+        start = now() + timedelta(days=1)
+        self.availability = AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=start, end_time=start + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane'
+        )
+
+    def test_optimistic_booking_claims_slot(self):
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.post(reverse('book-appointment'), {"availability_id": str(self.availability.id)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'pending')
+        self.availability.refresh_from_db()
+        self.assertTrue(self.availability.is_booked)
+        self.assertTrue(AppointmentActionLog.objects.filter(action_type='created').exists())
+
+    def test_optimistic_booking_rejects_claimed_slot(self):
+        self.client.force_authenticate(user=self.patient)
+        self.client.post(reverse('book-appointment'), {"availability_id": str(self.availability.id)}, format='json')
+        self.client.force_authenticate(user=self.patient2)
+        response = self.client.post(reverse('book-appointment'), {"availability_id": str(self.availability.id)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Appointment.objects.filter(availability=self.availability).count(), 1)
+
+    def test_lost_race_on_update_returns_400(self):
+        # The serializer saw the slot free, but another request claimed it before our UPDATE
+        from appointment.serializers import AppointmentSerializer
+        self.client.force_authenticate(user=self.patient)
+        with mock.patch.object(AppointmentSerializer, 'validate', lambda serializer, data: data):
+            AppointmentAvailability.objects.filter(id=self.availability.id).update(is_booked=True)
+            response = self.client.post(reverse('book-appointment'), {"availability_id": str(self.availability.id)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("booked by another user", str(response.data))
+        self.assertFalse(Appointment.objects.filter(availability=self.availability).exists())
+
+    def test_existing_appointment_rolls_back_claim(self):
+        from appointment.serializers import AppointmentSerializer
+        Appointment.objects.create(availability=self.availability, patient=self.patient2, status='payment_expired')
+        self.client.force_authenticate(user=self.patient)
+        with mock.patch.object(AppointmentSerializer, 'validate', lambda serializer, data: data):
+            response = self.client.post(reverse('book-appointment'), {"availability_id": str(self.availability.id)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already taken", str(response.data))
+        self.availability.refresh_from_db()
+        self.assertFalse(self.availability.is_booked)
+
+
+class SlotHoldTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.patient2 = User.objects.create_user(email='pat2@example.com', password='testpass', role='patient')
+        start = now() + timedelta(days=1)
+        self.availability = AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=start, end_time=start + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane'
+        )
+        self.hold_url = reverse('hold-availability', args=[self.availability.id])
+
+    def book(self, patient):
+        self.client.force_authenticate(user=patient)
+        return self.client.post(reverse('book-appointment'), {"availability_id": str(self.availability.id)}, format='json')
+
+    def test_hold_then_book(self):
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.post(self.hold_url)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('expires_at', response.data)
+        self.assertEqual(self.book(self.patient).status_code, 201)
+
+    def test_competing_hold_and_booking_rejected_without_queries(self):
+        self.client.force_authenticate(user=self.patient)
+        self.client.post(self.hold_url)
+
+        self.client.force_authenticate(user=self.patient2)
+        with self.assertNumQueries(0):
+            response = self.client.post(self.hold_url)
+        self.assertEqual(response.status_code, 409)
+        with self.assertNumQueries(0):
+            response = self.book(self.patient2)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already taken", str(response.data))
+
+    def test_release_hold(self):
+        self.client.force_authenticate(user=self.patient)
+        self.client.post(self.hold_url)
+        # Another patient can't release someone else's hold
+        self.client.force_authenticate(user=self.patient2)
+        self.client.delete(self.hold_url)
+        self.assertEqual(self.book(self.patient2).status_code, 400)
+
+        self.client.force_authenticate(user=self.patient)
+        self.assertEqual(self.client.delete(self.hold_url).status_code, 204)
+        self.assertEqual(self.book(self.patient2).status_code, 201)
+
+    def test_new_hold_replaces_patients_previous_hold(self):
+        from appointment.holds import get_hold
+        start = self.availability.end_time
+        other = AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=start, end_time=start + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane'
+        )
+        self.client.force_authenticate(user=self.patient)
+        self.assertEqual(self.client.post(self.hold_url).status_code, 201)
+        self.assertEqual(self.client.post(reverse('hold-availability', args=[other.id])).status_code, 201)
+
+        self.assertIsNone(get_hold(self.availability.id))
+        self.assertEqual(get_hold(other.id)["patient_id"], self.patient.id)
+        self.assertEqual(self.book(self.patient2).status_code, 201)
+
+    def test_any_spelling_of_the_slot_id_is_the_same_hold(self):
+        self.client.force_authenticate(user=self.patient)
+        self.client.post(self.hold_url)
+        self.client.force_authenticate(user=self.patient2)
+        response = self.client.post(reverse('book-appointment'), {
+            "availability_id": self.availability.id.hex.upper()
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already taken", str(response.data))
+
+    def test_concurrent_hold_request_gets_its_own_error(self):
+        from appointment.holds import LOCK_PREFIX
+        cache.add(f"{LOCK_PREFIX}:{self.patient.id}", 1)
+        self.client.force_authenticate(user=self.patient)
+        with mock.patch('appointment.holds.time.sleep'):
+            response = self.client.post(self.hold_url)
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("You already hold a slot", response.data["error"])
+
+    def test_hold_on_booked_slot_rejected(self):
+        self.availability.is_booked = True
+        self.availability.save()
+        self.client.force_authenticate(user=self.patient)
+        self.assertEqual(self.client.post(self.hold_url).status_code, 400)
+        from appointment.holds import get_hold
+        self.assertIsNone(get_hold(self.availability.id))
+
+    def test_cancel_releases_hold(self):
+        self.book(self.patient)
+        appointment = Appointment.objects.get(availability=self.availability)
+        self.client.force_authenticate(user=self.doctor)
+        self.client.post(reverse('cancel-appointment', args=[appointment.id]))
+        from appointment.holds import get_hold
+        self.assertIsNone(get_hold(self.availability.id))
+
+    def test_payment_expiry_releases_hold(self):
+        from appointment.holds import get_hold
+        from appointment.tasks import sweep_expired_pending_appointments
+        self.book(self.patient)
+        self.assertEqual(get_hold(self.availability.id)["patient_id"], self.patient.id)
+        Appointment.objects.filter(availability=self.availability).update(booked_at=now() - timedelta(hours=1))
+
+        sweep_expired_pending_appointments()
+        self.assertIsNone(get_hold(self.availability.id))
+
+
+class ReturningPatientFlagTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        start = now() + timedelta(days=2)
+        self.slots = [
+            AppointmentAvailability.objects.create(
+                doctor=self.doctor, start_time=start + timedelta(minutes=15 * i),
+                end_time=start + timedelta(minutes=15 * (i + 1)),
+                slot_type='short', timezone='Australia/Brisbane'
+            )
+            for i in range(2)
+        ]
+
+    def book(self, slot):
+        self.client.force_authenticate(user=self.patient)
+        return self.client.post(reverse('book-appointment'), {"availability_id": str(slot.id)}, format='json')
+
+    def confirm_payment(self):
+        appointment = Appointment.objects.get(patient=self.patient)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'booked'
+            appointment.save()
+        return appointment
+
+    def test_paid_patient_priced_without_history_query(self):
+        from appointment.patient_history import has_prior_appointment
+        self.assertEqual(self.book(self.slots[0]).data["price"], "80.00")
+        self.confirm_payment()
+
+        with mock.patch('appointment.patient_history.query_prior_appointment') as query:
+            self.assertTrue(has_prior_appointment(self.patient.id))
+            response = self.book(self.slots[1])
+        query.assert_not_called()
+        self.assertEqual(response.data["price"], "50.00")
+        self.assertFalse(response.data["is_initial"])
+
+    def test_leaving_counted_status_drops_flag(self):
+        from appointment.patient_history import cached_returning_patients
+        self.book(self.slots[0])
+        appointment = self.confirm_payment()
+        self.assertEqual(cached_returning_patients([self.patient.id]), {self.patient.id})
+
+        self.client.force_authenticate(user=self.doctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel-appointment', args=[appointment.id]))
+        self.assertEqual(cached_returning_patients([self.patient.id]), set())
+        self.assertEqual(self.book(self.slots[1]).data["price"], "80.00")
+
+    def test_bulk_update_still_detected_on_miss(self):
+        self.book(self.slots[0])
+        Appointment.objects.filter(patient=self.patient).update(status='completed')
+        self.assertEqual(self.book(self.slots[1]).data["price"], "50.00")
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        from appointment.patient_history import cached_returning_patients, set_returning_patients
+        other = User.objects.create_user(email='other@example.com', password='testpass', role='patient')
+        self.book(self.slots[0])
+        Appointment.objects.filter(patient=self.patient).update(status='booked')  # cold: no signal
+        set_returning_patients([other.id])  # stale: no qualifying appointment
+
+        out = StringIO()
+        call_command('reconcile_returning_patients', '--dry-run', stdout=out)
+        self.assertIn("Checked 2 patients: 1 stale, 1 cold.", out.getvalue())
+        self.assertEqual(cached_returning_patients([self.patient.id, other.id]), {other.id})
+
+        call_command('reconcile_returning_patients', stdout=StringIO())
+        self.assertEqual(cached_returning_patients([self.patient.id, other.id]), {self.patient.id})
+
+
+class BulkAppointmentStatusTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('bulk-appointment-status')
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.other_doctor = User.objects.create_user(email='doc2@example.com', password='testpass', role='doctor', first_name='Other')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        start = now() + timedelta(days=1)
+        self.appointments = []
+        for i in range(30):
+            slot = AppointmentAvailability.objects.create(
+                doctor=self.doctor, start_time=start + timedelta(minutes=15 * i),
+                end_time=start + timedelta(minutes=15 * (i + 1)),
+                slot_type='short', timezone='Australia/Brisbane', is_booked=True
+            )
+            self.appointments.append(Appointment.objects.create(availability=slot, patient=self.patient, status='booked'))
+        foreign_slot = AppointmentAvailability.objects.create(
+            doctor=self.other_doctor, start_time=start, end_time=start + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane', is_booked=True
+        )
+        self.foreign = Appointment.objects.create(availability=foreign_slot, patient=self.patient, status='booked')
+
+    def post(self, user, ids, target):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url, {"appointment_ids": [str(i) for i in ids], "status": target}, format='json')
+
+    def test_complete_session_with_constant_queries(self):
+        ids = [appointment.id for appointment in self.appointments]
+        self.client.force_authenticate(user=self.doctor)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post(self.doctor, ids, 'completed')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 30)
+        self.assertLessEqual(len(ctx.captured_queries), 6)
+        self.assertEqual(Appointment.objects.filter(status='completed').count(), 30)
+        self.assertEqual(AppointmentActionLog.objects.filter(action_type='completed').count(), 30)
+        # Completing doesn't free slots
+        self.assertEqual(AppointmentAvailability.objects.filter(is_booked=False).count(), 0)
+
+    def test_per_id_results(self):
+        finished = self.appointments[1]
+        finished.status = 'completed'
+        finished.save()
+        ids = [self.appointments[0].id, finished.id, self.foreign.id, uuid.uuid4()]
+
+        response = self.post(self.doctor, ids, 'no_show')
+        results = {str(result["id"]): result for result in response.data["results"]}
+        self.assertEqual([str(result["id"]) for result in response.data["results"]], [str(i) for i in ids])
+        self.assertEqual(results[str(ids[0])]["result"], "updated")
+        self.assertEqual(results[str(ids[1])]["result"], "rejected")
+        self.assertEqual(results[str(ids[1])]["status"], "completed")
+        # Another doctor's appointment is indistinguishable from a missing one
+        self.assertEqual(results[str(ids[2])]["result"], "not_found")
+        self.assertEqual(results[str(ids[3])]["result"], "not_found")
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.status, 'booked')
+
+    def test_cancel_frees_slots_and_logs(self):
+        ids = [appointment.id for appointment in self.appointments[:5]]
+        response = self.post(self.doctor, ids, 'cancelled')
+        self.assertEqual(response.data["updated"], 5)
+        self.assertEqual(Appointment.objects.filter(status='cancelled_by_doctor').count(), 5)
+        self.assertEqual(AppointmentAvailability.objects.filter(is_booked=False).count(), 5)
+        self.assertEqual(AppointmentActionLog.objects.filter(action_type='cancelled').count(), 5)
+
+    def test_patient_cancel_respects_window(self):
+        soon_slot = AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=now() + timedelta(minutes=30),
+            end_time=now() + timedelta(minutes=45), slot_type='short',
+            timezone='Australia/Brisbane', is_booked=True
+        )
+        soon = Appointment.objects.create(availability=soon_slot, patient=self.patient, status='booked')
+        response = self.post(self.patient, [self.appointments[0].id, soon.id], 'cancelled')
+        self.assertEqual([result["result"] for result in response.data["results"]], ["updated", "rejected"])
+        self.appointments[0].refresh_from_db()
+        self.assertEqual(self.appointments[0].status, 'cancelled_by_patient')
+
+    def test_patient_cannot_complete(self):
+        response = self.post(self.patient, [self.appointments[0].id], 'completed')
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.post(self.doctor, [], 'completed').status_code, 400)
+        self.assertEqual(self.post(self.doctor, [self.appointments[0].id], 'booked').status_code, 400)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        start = now() + timedelta(days=1)
+        # Created out of time order so id order != start_time order
+        self.slots = [
+            AppointmentAvailability.objects.create(
+                doctor=self.doctor, start_time=start + timedelta(minutes=15 * i),
+                end_time=start + timedelta(minutes=15 * (i + 1)),
+                slot_type='short', timezone='Australia/Brisbane'
+            )
+            for i in reversed(range(25))
+        ]
+        self.expected = [str(slot.id) for slot in sorted(self.slots, key=lambda slot: slot.start_time)]
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            pages.append(response.data)
+            url = response.data['next']
+        return ids, pages
+
+    def test_walk_availability_in_start_time_order(self):
+        self.client.force_authenticate(user=self.doctor)
+        ids, pages = self.walk(reverse('list-my-availabilities') + '?cursor=&page_size=10')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+        # Step back from the last page
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual([item['id'] for item in response.data['results']], self.expected[10:20])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([item['id'] for item in response.data['results']], self.expected[:10])
+        self.assertIsNone(response.data['previous'])
+
+    def test_deep_page_is_single_query(self):
+        from appointment.pagination import encode_cursor
+        self.client.force_authenticate(user=self.doctor)
+        ordered = sorted(self.slots, key=lambda slot: slot.start_time)
+        cursor = encode_cursor([ordered[19].start_time, ordered[19].id])
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('list-my-availabilities'), {'cursor': cursor, 'page_size': 10})
+        self.assertEqual([item['id'] for item in response.data['results']], self.expected[20:])
+        self.assertIsNone(response.data['next'])
+
+    def test_walk_appointments_in_start_time_order(self):
+        for slot in self.slots:
+            Appointment.objects.create(availability=slot, patient=self.patient, status='booked')
+        self.client.force_authenticate(user=self.patient)
+        _, pages = self.walk(reverse('list-my-appointments') + '?cursor=&page_size=7')
+        ids = [item['availability']['id'] for page in pages for item in page['results']]
+        self.assertEqual([str(i) for i in ids], self.expected)
+
+    def test_invalid_cursor(self):
+        from appointment.pagination import encode_cursor
+        self.client.force_authenticate(user=self.doctor)
+        url = reverse('list-my-availabilities')
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'cursor': encode_cursor(['yesterday', 'x'])}).status_code, 404)
+
+    def test_page_number_still_default(self):
+        self.client.force_authenticate(user=self.doctor)
+        response = self.client.get(reverse('list-my-availabilities'), {'page': 2})
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+
+
+class AppointmentExportTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass', role='admin')
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor',
+                                               first_name='Greg', last_name='House')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient',
+                                                first_name='Pat', last_name='Smith')
+        brisbane = ZoneInfo('Australia/Brisbane')
+        self.appointments = []
+        for day in range(1, 8):
+            start = datetime(2030, 3, day, 9, 0, tzinfo=brisbane)
+            slot = AppointmentAvailability.objects.create(
+                doctor=self.doctor, start_time=start, end_time=start + timedelta(minutes=15),
+                slot_type='short', timezone='Australia/Brisbane', is_booked=True
+            )
+            self.appointments.append(Appointment.objects.create(
+                availability=slot, patient=self.patient, status='completed' if day % 2 else 'booked'
+            ))
+
+    def export(self, export_format, **params):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('export-appointments', args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        import csv
+        rows = list(csv.DictReader(StringIO(self.export('csv'))))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['id'], str(self.appointments[0].id))
+        self.assertEqual(rows[0]['doctor_name'], 'Greg House')
+        self.assertEqual(rows[0]['patient_name'], 'Pat Smith')
+        self.assertEqual(rows[0]['status'], 'completed')
+
+    def test_ndjson_export_with_filters(self):
+        import json
+        body = self.export('ndjson', start_date='2030-03-02', end_date='2030-03-05', status='completed')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [str(self.appointments[i].id) for i in (2, 4)])
+
+    def test_batches_cover_every_row_once(self):
+        from appointment.export import export_queryset, iter_export_rows
+        with CaptureQueriesContext(connection) as ctx:
+            ids = [row['id'] for row in iter_export_rows(export_queryset(), batch_size=3)]
+        self.assertEqual(ids, [str(appointment.id) for appointment in self.appointments])
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+    def test_validation_and_permissions(self):
+        self.client.force_authenticate(user=self.admin)
+        url = reverse('export-appointments', args=['csv'])
+        self.assertEqual(self.client.get(url, {'status': 'bogus'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start_date': '03/02/2030'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export-appointments', args=['xml'])).status_code, 404)
+        self.client.force_authenticate(user=self.doctor)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        start = now() + timedelta(days=1)
+        self.slots = [
+            AppointmentAvailability.objects.create(
+                doctor=self.doctor, start_time=start + timedelta(minutes=15 * i),
+                end_time=start + timedelta(minutes=15 * (i + 1)),
+                slot_type='short', timezone='Australia/Brisbane', is_booked=i < 5
+            )
+            for i in range(12)
+        ]
+        self.appointments = [
+            Appointment.objects.create(availability=slot, patient=self.patient, status='booked')
+            for slot in self.slots[:5]
+        ]
+        self.doctor_token = str(AccessToken.for_user(self.doctor))
+
+    def both(self, sync_name, async_name, args=(), params=None, token=None):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token or self.doctor_token}'}
+        sync_response = self.client.get(reverse(sync_name, args=args), params or {}, **headers)
+        async_response = self.client.get(reverse(async_name, args=args), params or {}, **headers)
+        return sync_response, async_response
+
+    def assertSamePage(self, async_response, sync_response):
+        # Bodies match apart from the path in the next/previous links
+        async_data, sync_data = async_response.json(), sync_response.json()
+        for link in ('next', 'previous'):
+            self.assertEqual(bool(async_data.pop(link)), bool(sync_data.pop(link)))
+        self.assertEqual(async_data, sync_data)
+
+    def test_availability_list_matches_sync(self):
+        for params in ({}, {'page': 2}, {'is_booked': 'true'}, {'cursor': '', 'page_size': 5}):
+            sync_response, async_response = self.both(
+                'list-my-availabilities', 'async-list-my-availabilities', params=params
+            )
+            self.assertEqual(async_response.status_code, 200)
+            self.assertSamePage(async_response, sync_response)
+
+    def test_appointment_list_and_detail_match_sync(self):
+        sync_response, async_response = self.both('list-my-appointments', 'async-list-my-appointments')
+        self.assertSamePage(async_response, sync_response)
+        self.assertEqual(async_response.json()['count'], 5)
+
+        args = [self.appointments[0].id]
+        sync_response, async_response = self.both('appointment-detail', 'async-appointment-detail', args=args)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+    def test_errors(self):
+        url = reverse('async-list-my-appointments')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer nonsense').status_code, 401)
+        response = self.client.get(reverse('async-appointment-detail', args=[uuid.uuid4()]),
+                                   HTTP_AUTHORIZATION=f'Bearer {self.doctor_token}')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('async-list-my-availabilities'), {'cursor': 'garbage'},
+                                   HTTP_AUTHORIZATION=f'Bearer {self.doctor_token}')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(url, HTTP_AUTHORIZATION=f'Bearer {self.doctor_token}')
+        self.assertEqual(response.status_code, 405)
+
+
+class DoctorDailyScheduleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.tz = ZoneInfo('Australia/Brisbane')
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.day = (now() + timedelta(days=3)).astimezone(self.tz).date()
+
+    def summary(self, day=None):
+        from appointment.models import DoctorDailySchedule
+        row = DoctorDailySchedule.objects.filter(doctor=self.doctor, date=day or self.day).first()
+        if row is None:
+            return None
+        return {column: getattr(row, column) for column in ('slots', 'booked', 'completed', 'no_show', 'cancelled')}
+
+    def create_slots(self, count, day=None):
+        self.client.force_authenticate(user=self.doctor)
+        day = day or self.day
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bulk-availability'), {
+                "start_date": day.isoformat(),
+                "end_date": day.isoformat(),
+                "days_of_week": [day.strftime("%A")],
+                "start_time": "09:00",
+                "end_time": (datetime(2000, 1, 1, 9) + timedelta(minutes=15 * count)).strftime("%H:%M"),
+                "slot_type": "short",
+                "timezone": "Australia/Brisbane"
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return list(AppointmentAvailability.objects.filter(doctor=self.doctor).order_by('start_time'))
+
+    def test_bulk_created_slots_counted(self):
+        self.create_slots(4)
+        self.assertEqual(self.summary(), {'slots': 4, 'booked': 0, 'completed': 0, 'no_show': 0, 'cancelled': 0})
+
+    def test_booking_payment_and_cancel(self):
+        slots = self.create_slots(3)
+        self.client.force_authenticate(user=self.patient)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('book-appointment'), {"availability_id": str(slots[0].id)}, format='json')
+        # Pending (unpaid) appointments aren't counted
+        self.assertEqual(self.summary()['booked'], 0)
+
+        appointment = Appointment.objects.get(availability=slots[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.status = 'booked'
+            appointment.save()
+        self.assertEqual(self.summary()['booked'], 1)
+
+        self.client.force_authenticate(user=self.doctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel-appointment', args=[appointment.id]))
+        self.assertEqual(self.summary(), {'slots': 3, 'booked': 0, 'completed': 0, 'no_show': 0, 'cancelled': 1})
+
+    def test_bulk_status_transition_counted(self):
+        slots = self.create_slots(3)
+        appointments = [
+            Appointment.objects.create(availability=slot, patient=self.patient, status='booked') for slot in slots
+        ]
+        self.client.force_authenticate(user=self.doctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('bulk-appointment-status'), {
+                "appointment_ids": [str(a.id) for a in appointments[:2]], "status": "completed"
+            }, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('bulk-appointment-status'), {
+                "appointment_ids": [str(appointments[2].id)], "status": "no_show"
+            }, format='json')
+        self.assertEqual(self.summary(), {'slots': 3, 'booked': 0, 'completed': 2, 'no_show': 1, 'cancelled': 0})
+
+    def test_moving_slot_updates_both_days(self):
+        slots = self.create_slots(2)
+        next_day = self.day + timedelta(days=1)
+        moved_start = datetime.combine(next_day, datetime.strptime("11:00", "%H:%M").time(), tzinfo=self.tz)
+        self.client.force_authenticate(user=self.doctor)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('edit-availability', args=[slots[1].id]), {
+                "start_time": moved_start.isoformat(),
+                "end_time": (moved_start + timedelta(minutes=15)).isoformat(),
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.summary()['slots'], 1)
+        self.assertEqual(self.summary(next_day)['slots'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('delete-availability', args=[slots[1].id]))
+        self.assertIsNone(self.summary(next_day))
+
+    def test_backfill_repairs_drift(self):
+        from appointment.models import DoctorDailySchedule
+        slots = self.create_slots(2)
+        # Written without signals or on_commit: the summary misses it
+        Appointment.objects.create(availability=slots[0], patient=self.patient, status='completed')
+        DoctorDailySchedule.objects.create(doctor=self.doctor, date=self.day - timedelta(days=30), slots=9)
+
+        out = StringIO()
+        call_command('backfill_doctor_schedules', stdout=out)
+        self.assertIn("Rebuilt 1 day rows for 1 doctors (2 created, updated or removed)", out.getvalue())
+        self.assertEqual(self.summary()['completed'], 1)
+        self.assertIsNone(self.summary(self.day - timedelta(days=30)))
+
+
+class AvailabilityTemplateTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.tz = ZoneInfo('Australia/Brisbane')
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.day = (now() + timedelta(days=3)).astimezone(self.tz).date()
+        self.window_start = datetime.combine(self.day, datetime.min.time(), tzinfo=self.tz)
+        self.window_end = self.window_start + timedelta(days=1)
+
+    def create_template(self, **overrides):
+        from appointment.models import AvailabilityTemplate
+        fields = {
+            "doctor": self.doctor,
+            "weekday": self.day.weekday(),
+            "start_time": "09:00",
+            "end_time": "10:00",
+            "slot_type": "short",
+            "timezone": "Australia/Brisbane",
+            "valid_from": self.day - timedelta(days=7),
+        }
+        fields.update(overrides)
+        return AvailabilityTemplate.objects.create(**fields)
+
+    def list_window(self, user, extra=''):
+        self.client.force_authenticate(user=user)
+        query = (f'?start_time={self.window_start.isoformat()}&end_time={self.window_end.isoformat()}'
+                 f'&page_size=100{extra}').replace('+', '%2B')
+        response = self.client.get(reverse('list-my-availabilities') + query)
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def slot_start(self, hour, minute):
+        return datetime.combine(self.day, datetime.min.time(), tzinfo=self.tz).replace(hour=hour, minute=minute)
+
+    def test_doctor_manages_own_templates(self):
+        self.client.force_authenticate(user=self.doctor)
+        response = self.client.post(reverse('availability-templates'), {
+            "weekday": 0, "start_time": "09:00", "end_time": "12:00", "slot_type": "long",
+            "timezone": "Australia/Brisbane", "valid_from": self.day.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['doctor'], self.doctor.id)
+        template_id = response.data['id']
+
+        response = self.client.patch(reverse('availability-template-detail', args=[template_id]),
+                                     {"end_time": "08:00"}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('availability-templates'), {
+            "weekday": 0, "start_time": "09:00", "end_time": "12:00", "slot_type": "long",
+            "timezone": "Mars/Olympus", "valid_from": self.day.isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        other = User.objects.create_user(email='doc2@example.com', password='testpass', role='doctor')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(reverse('availability-templates')).data['count'], 0)
+        response = self.client.delete(reverse('availability-template-detail', args=[template_id]))
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_authenticate(user=self.patient)
+        self.assertEqual(self.client.get(reverse('availability-templates')).status_code, 403)
+
+    def test_virtual_slot_ids_round_trip(self):
+        from appointment.recurring import decode_virtual_slot_id, virtual_slot_id
+        start = self.slot_start(9, 15).astimezone(ZoneInfo('UTC'))
+        slot_id = virtual_slot_id(42, start)
+        self.assertEqual(slot_id.version, 8)
+        self.assertEqual(decode_virtual_slot_id(str(slot_id)), (42, start))
+        self.assertIsNone(decode_virtual_slot_id(uuid.uuid4()))
+        self.assertIsNone(decode_virtual_slot_id('not-a-uuid'))
+
+    def test_window_listing_includes_template_slots(self):
+        self.create_template()
+        results = self.list_window(self.patient, f'&doctor={self.doctor.id}')
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0]['start_time'], self.slot_start(9, 0).astimezone(ZoneInfo('UTC')).isoformat().replace('+00:00', 'Z'))
+        self.assertFalse(any(slot['is_booked'] for slot in results))
+        self.assertEqual(results[0]['doctor']['id'], self.doctor.id)
+        # Nothing was written
+        self.assertFalse(AppointmentAvailability.objects.exists())
+
+        # Unbounded listings and booked-only listings stay concrete-only
+        self.client.force_authenticate(user=self.patient)
+        self.assertEqual(self.client.get(reverse('list-my-availabilities')).data['count'], 0)
+        self.assertEqual(self.list_window(self.patient, '&is_booked=true'), [])
+
+    def test_template_validity_and_weekday(self):
+        self.create_template(weekday=(self.day.weekday() + 1) % 7)
+        self.create_template(valid_from=self.day + timedelta(days=1))
+        self.create_template(valid_until=self.day - timedelta(days=1))
+        self.create_template(is_active=False)
+        self.assertEqual(self.list_window(self.doctor), [])
+
+    def test_concrete_and_overlapping_slots_hide_template_slots(self):
+        self.create_template()
+        self.create_template(start_time="09:00", end_time="10:00", slot_type="long")
+        AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=self.slot_start(9, 15), end_time=self.slot_start(9, 30),
+            slot_type='short', timezone='Australia/Brisbane', is_booked=True,
+        )
+        results = self.list_window(self.doctor)
+        starts = [(slot['start_time'], slot['is_booked']) for slot in results]
+        self.assertEqual(len(starts), 4)
+        self.assertEqual(sum(is_booked for _, is_booked in starts), 1)
+        # 9:15 is taken by the concrete slot, and the long template's slots all overlap the short ones
+        self.assertEqual(len({start for start, _ in starts}), 4)
+
+    def test_booking_virtual_slot_materialises_it(self):
+        from appointment.recurring import virtual_slot_id
+        template = self.create_template()
+        slot_id = virtual_slot_id(template.id, self.slot_start(9, 30))
+
+        self.client.force_authenticate(user=self.patient)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('book-appointment'), {"availability_id": str(slot_id)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        slot = AppointmentAvailability.objects.get()
+        self.assertEqual(slot.id, slot_id)
+        self.assertTrue(slot.is_booked)
+        self.assertEqual(slot.start_time, self.slot_start(9, 30))
+
+        # The booked slot is now listed once, as the concrete row
+        results = self.list_window(self.doctor)
+        self.assertEqual([slot['id'] for slot in results].count(str(slot_id)), 1)
+        self.assertEqual(len(results), 4)
+
+        # Booking it again is refused without creating anything
+        other = User.objects.create_user(email='pat2@example.com', password='testpass', role='patient')
+        self.client.force_authenticate(user=other)
+        response = self.client.post(reverse('book-appointment'), {"availability_id": str(slot_id)}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AppointmentAvailability.objects.count(), 1)
+
+    def test_unknown_or_past_virtual_slot_not_materialised(self):
+        from appointment.recurring import materialise_virtual_slot, virtual_slot_id
+        template = self.create_template()
+        self.assertIsNone(materialise_virtual_slot(virtual_slot_id(template.id, self.slot_start(9, 5))))
+        self.assertIsNone(materialise_virtual_slot(virtual_slot_id(template.id + 1, self.slot_start(9, 0))))
+        past = datetime.combine(self.day - timedelta(days=7), datetime.min.time(), tzinfo=self.tz).replace(hour=9)
+        self.assertIsNone(materialise_virtual_slot(virtual_slot_id(template.id, past)))
+        self.assertFalse(AppointmentAvailability.objects.exists())
+
+    def test_hold_materialises_virtual_slot(self):
+        from appointment.recurring import virtual_slot_id
+        template = self.create_template()
+        slot_id = virtual_slot_id(template.id, self.slot_start(9, 45))
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.post(reverse('hold-availability', args=[slot_id]))
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(AppointmentAvailability.objects.filter(id=slot_id, is_booked=False).exists())
+
+    def test_calendar_includes_template_slots(self):
+        template = self.create_template()
+        AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=self.slot_start(14, 0), end_time=self.slot_start(14, 15),
+            slot_type='short', timezone='Australia/Brisbane',
+        )
+        self.client.force_authenticate(user=self.patient)
+        url = reverse('availability-calendar') + f'?start_date={self.day.isoformat()}&end_date={self.day.isoformat()}'
+        response = self.client.get(url)
+        self.assertEqual(response.data['doctors'][0]['start_times'], [['09:00', '09:15', '09:30', '09:45', '14:00']])
+
+        # Editing the template invalidates the cached calendar
+        template.end_time = "09:30"
+        template.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['doctors'][0]['start_times'], [['09:00', '09:15', '14:00']])
+
+    def test_cursor_pages_through_virtual_slots(self):
+        self.create_template(end_time="11:00")
+        AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=self.slot_start(12, 0), end_time=self.slot_start(12, 15),
+            slot_type='short', timezone='Australia/Brisbane',
+        )
+        expected = [slot['id'] for slot in self.list_window(self.doctor)]
+        self.assertEqual(len(expected), 9)
+
+        query = (f'?start_time={self.window_start.isoformat()}&end_time={self.window_end.isoformat()}'
+                 f'&page_size=4&cursor=').replace('+', '%2B')
+        url = reverse('list-my-availabilities') + query
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [slot['id'] for slot in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+
+class SlotTimesTests(APITestCase):
+    def local_starts(self, grid, timezone_str):
+        tz = ZoneInfo(timezone_str)
+        return [start.astimezone(tz).strftime('%H:%M') for slots in grid.values() for start, _ in slots]
+
+    def grid(self, day, start, end, timezone_str, slot_type='short'):
+        from appointment.slots import generate_slot_grid
+        return generate_slot_grid(day, day, [day.strftime('%A')], start, end, slot_type, timezone_str)
+
+    def test_ordinary_day(self):
+        day = datetime(2025, 6, 2).date()
+        grid = self.grid(day, '09:00', '10:00', 'Australia/Brisbane')
+        self.assertEqual(self.local_starts(grid, 'Australia/Brisbane'), ['09:00', '09:15', '09:30', '09:45'])
+        start, end = grid[day][0]
+        self.assertEqual(start, datetime(2025, 6, 1, 23, 0, tzinfo=ZoneInfo('UTC')))
+        self.assertEqual(end - start, timedelta(minutes=15))
+
+    def test_spring_forward_skips_missing_hour(self):
+        day = datetime(2025, 10, 5).date()
+        grid = self.grid(day, '01:00', '04:00', 'Australia/Sydney', slot_type='long')
+        self.assertEqual(self.local_starts(grid, 'Australia/Sydney'), ['01:00', '01:30', '03:00', '03:30'])
+        # Back to back in real time
+        slots = grid[day]
+        self.assertTrue(all(slots[i][1] == slots[i + 1][0] for i in range(len(slots) - 1)))
+
+        # A start inside the gap moves forward by it
+        grid = self.grid(day, '02:30', '04:00', 'Australia/Sydney', slot_type='long')
+        self.assertEqual(self.local_starts(grid, 'Australia/Sydney'), ['03:30'])
+
+    def test_fall_back_covers_repeated_hour(self):
+        day = datetime(2025, 4, 6).date()
+        grid = self.grid(day, '01:00', '04:00', 'Australia/Melbourne', slot_type='long')
+        self.assertEqual(
+            self.local_starts(grid, 'Australia/Melbourne'),
+            ['01:00', '01:30', '02:00', '02:30', '02:00', '02:30', '03:00', '03:30'],
+        )
+
+    def test_half_hour_dst_shift(self):
+        # Lord Howe Island moves its clocks by 30 minutes
+        day = datetime(2025, 10, 5).date()
+        grid = self.grid(day, '01:00', '04:00', 'Australia/Lord_Howe')
+        self.assertEqual(len(grid[day]), 10)
+
+    def test_custom_availability_slot_bounds(self):
+        doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor')
+        self.client.force_authenticate(user=doctor)
+        day = (now() + timedelta(days=30)).date()
+        response = self.client.post(reverse('custom-availability'), {
+            "date": day.isoformat(), "start_times": ["09:00", "9:xx"], "slot_type": "long",
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('custom-availability'), {
+            "date": day.isoformat(), "start_times": ["09:00", "09:30"], "slot_type": "long",
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        starts = sorted(AppointmentAvailability.objects.values_list('start_time', flat=True))
+        expected = datetime.combine(day, datetime.min.time(), tzinfo=ZoneInfo('Australia/Brisbane')).replace(hour=9)
+        self.assertEqual(starts, [expected, expected + timedelta(minutes=30)])
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.lists = {}
+        self.zsets = {}
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def lmove(self, source, destination, src, dest):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        item = items.pop(0 if src == 'LEFT' else -1)
+        target = self.lists.setdefault(destination, [])
+        target.insert(0 if dest == 'LEFT' else len(target), item)
+        return item
+
+    def delete(self, key):
+        self.lists.pop(key, None)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        self.zsets.get(key, {}).pop(member, None)
+
+    def zrangebyscore(self, key, low, high):
+        return [member for member, score in self.zsets.get(key, {}).items() if low <= score <= high]
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((getattr(self.client, name), args))
+
+    def execute(self):
+        return [method(*args) for method, args in self.calls]
+
+
+@override_settings(APPOINTMENT_AUDIT_BUFFER='memory', APPOINTMENT_AUDIT_DURABILITY={'cancelled': 'sync'})
+class ActionLogBufferTests(APITestCase):
+    def setUp(self):
+        from appointment import audit_log
+        self.audit_log = audit_log
+        audit_log._buffers['memory']._entries.clear()
+        flusher = mock.patch.object(audit_log.MemoryBuffer, '_ensure_flusher')
+        flusher.start()
+        self.addCleanup(flusher.stop)
+
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        start = now() + timedelta(days=1)
+        self.appointments = []
+        for i in range(5):
+            slot = AppointmentAvailability.objects.create(
+                doctor=self.doctor, start_time=start + timedelta(minutes=15 * i),
+                end_time=start + timedelta(minutes=15 * (i + 1)),
+                slot_type='short', timezone='Australia/Brisbane', is_booked=True
+            )
+            self.appointments.append(Appointment.objects.create(availability=slot, patient=self.patient, status='booked'))
+        self.client.force_authenticate(user=self.doctor)
+
+    def test_buffered_action_written_on_flush(self):
+        appointment = self.appointments[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('complete-appointment', args=[appointment.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AppointmentActionLog.objects.exists())
+        acted_at = now()
+
+        self.assertEqual(self.audit_log.flush_action_logs(), 1)
+        log = AppointmentActionLog.objects.get()
+        self.assertEqual((log.appointment_id, log.action_type, log.performed_by_id),
+                         (appointment.id, 'completed', self.doctor.id))
+        # Timestamped when the action happened, not when flushed
+        self.assertLessEqual(log.performed_at, acted_at)
+        self.assertEqual(self.audit_log.flush_action_logs(), 0)
+
+    def test_sync_durability_writes_in_request(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancel-appointment', args=[self.appointments[0].id]))
+        self.assertTrue(AppointmentActionLog.objects.filter(action_type='cancelled').exists())
+        self.assertEqual(len(self.audit_log.get_buffer()), 0)
+
+    def test_rolled_back_actions_are_not_logged(self):
+        from django.db import transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    self.audit_log.record_action(self.appointments[0], 'completed', self.doctor)
+                    raise RuntimeError
+        self.assertEqual(len(self.audit_log.get_buffer()), 0)
+
+    def test_bulk_flush_uses_constant_queries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('bulk-appointment-status'), {
+                "appointment_ids": [str(a.id) for a in self.appointments], "status": "no_show"
+            }, format='json')
+        self.assertFalse(AppointmentActionLog.objects.exists())
+        # Appointment and user existence checks, then one INSERT
+        with self.assertNumQueries(3):
+            self.assertEqual(self.audit_log.flush_action_logs(), 5)
+        self.assertEqual(AppointmentActionLog.objects.filter(action_type='no_show').count(), 5)
+
+    def test_flush_skips_deleted_appointments(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for appointment in self.appointments[:2]:
+                self.audit_log.record_action(appointment, 'completed', self.doctor)
+        self.appointments[0].delete()
+        with self.assertLogs('appointment.audit_log', 'WARNING'):
+            self.assertEqual(self.audit_log.flush_action_logs(), 1)
+        self.assertEqual(AppointmentActionLog.objects.get().appointment_id, self.appointments[1].id)
+
+    @override_settings(APPOINTMENT_AUDIT_BUFFER='redis', APPOINTMENT_AUDIT_BATCH_SIZE=2)
+    def test_redis_buffer_flushes_in_batches(self):
+        fake = _FakeRedis()
+        with mock.patch.object(self.audit_log.RedisBuffer, 'client', fake):
+            with self.captureOnCommitCallbacks(execute=True):
+                for appointment in self.appointments:
+                    self.audit_log.record_action(appointment, 'completed', self.doctor)
+            self.assertEqual(len(self.audit_log.get_buffer()), 5)
+            from appointment.tasks import flush_action_logs
+            self.assertEqual(flush_action_logs(), 5)
+            self.assertEqual(len(self.audit_log.get_buffer()), 0)
+        self.assertEqual(AppointmentActionLog.objects.count(), 5)
+
+    @override_settings(APPOINTMENT_AUDIT_BUFFER='redis', APPOINTMENT_AUDIT_BATCH_SIZE=2)
+    def test_overlapping_redis_flushes_write_each_entry_once(self):
+        fake = _FakeRedis()
+        first, second = self.audit_log.RedisBuffer(), self.audit_log.RedisBuffer()
+        first._client = second._client = fake
+        with mock.patch.object(self.audit_log.RedisBuffer, 'client', fake):
+            with self.captureOnCommitCallbacks(execute=True):
+                for appointment in self.appointments:
+                    self.audit_log.record_action(appointment, 'completed', self.doctor)
+
+        write_entries = self.audit_log.write_entries
+        written_ids = []
+
+        def slow_write(entries):
+            written_ids.extend(entry["id"] for entry in entries)
+            if len(written_ids) == len(entries):
+                # The second flusher runs while the first is still writing its batch
+                second.flush()
+            return write_entries(entries)
+
+        with mock.patch.object(self.audit_log, 'write_entries', side_effect=slow_write):
+            first.flush()
+        self.assertEqual(len(written_ids), 5)
+        self.assertEqual(len(set(written_ids)), 5)
+        self.assertEqual(AppointmentActionLog.objects.count(), 5)
+        self.assertEqual(fake.llen(self.audit_log.REDIS_KEY), 0)
+        self.assertFalse(fake.zsets[self.audit_log.REDIS_CLAIMS_KEY])
+
+    @override_settings(APPOINTMENT_AUDIT_BUFFER='redis', APPOINTMENT_AUDIT_CLAIM_TIMEOUT=0)
+    def test_failed_redis_flush_keeps_entries(self):
+        fake = _FakeRedis()
+        with mock.patch.object(self.audit_log.RedisBuffer, 'client', fake):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.audit_log.record_action(self.appointments[0], 'completed', self.doctor)
+            with mock.patch.object(self.audit_log, 'write_entries', side_effect=RuntimeError):
+                with self.assertRaises(RuntimeError):
+                    self.audit_log.flush_action_logs()
+            self.assertEqual(len(self.audit_log.get_buffer()), 1)
+            # A claim abandoned by a flusher that died is put back
+            fake.zadd(self.audit_log.REDIS_CLAIMS_KEY, {'dead-claim': 0})
+            fake.rpush('dead-claim', fake.lists[self.audit_log.REDIS_KEY].pop())
+            with self.assertLogs('appointment.audit_log', 'WARNING'):
+                self.assertEqual(self.audit_log.flush_action_logs(), 1)
+        self.assertEqual(AppointmentActionLog.objects.count(), 1)
+
+    @override_settings(APPOINTMENT_AUDIT_BUFFER='sync')
+    def test_sync_buffer_writes_everything_in_request(self):
+        self.client.post(reverse('no-show-appointment', args=[self.appointments[0].id]))
+        self.assertTrue(AppointmentActionLog.objects.filter(action_type='no_show').exists())
+
+
+class ArchiveTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass', role='admin')
+
+        self.old_free = self.slot(days_ago=60)
+        self.recent_free = self.slot(days_ago=5)
+        self.old_completed = self.appointment(days_ago=400, status='completed')
+        AppointmentActionLog.objects.create(appointment=self.old_completed, action_type='completed', performed_by=self.doctor)
+        self.old_paid = self.appointment(days_ago=410, status='completed')
+        from order.models import Order
+        Order.objects.create(user=self.patient, appointment=self.old_paid, amount=50)
+        self.old_open = self.appointment(days_ago=420, status='booked')
+        self.recent_completed = self.appointment(days_ago=10, status='completed')
+
+    def slot(self, days_ago, **fields):
+        start = now() - timedelta(days=days_ago)
+        return AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=start, end_time=start + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane', **fields
+        )
+
+    def appointment(self, days_ago, status):
+        return Appointment.objects.create(
+            availability=self.slot(days_ago, is_booked=True), patient=self.patient, status=status
+        )
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_appointments', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_only_rows_past_horizon(self):
+        from appointment.models import ArchivedAppointment, ArchivedAvailability
+        output = self.archive()
+        self.assertIn('Archived 1 appointments', output)
+        self.assertIn('1 unbooked availabilities', output)
+        self.assertIn('1 old appointments kept hot', output)
+        self.assertIn('appointment_appointment=4 rows', output)
+        self.assertIn('appointment_appointment=3 rows', output)
+
+        self.assertFalse(Appointment.objects.filter(id=self.old_completed.id).exists())
+        self.assertFalse(AppointmentAvailability.objects.filter(id__in=[self.old_free.id, self.old_completed.availability_id]).exists())
+        archived = ArchivedAppointment.objects.get()
+        self.assertEqual((archived.id, archived.availability_id), (self.old_completed.id, self.old_completed.availability_id))
+        self.assertEqual([log['action_type'] for log in archived.logs], ['completed'])
+        self.assertEqual(ArchivedAvailability.objects.count(), 2)
+        self.assertFalse(AppointmentActionLog.objects.exists())
+
+        # The paid appointment keeps its order; open and recent ones stay too
+        self.assertEqual(Appointment.objects.filter(id__in=[self.old_paid.id, self.old_open.id, self.recent_completed.id]).count(), 3)
+        self.assertTrue(self.old_paid.order)
+        self.assertTrue(AppointmentAvailability.objects.filter(id=self.recent_free.id).exists())
+
+        # Re-running is a no-op
+        self.assertIn('Archived 0 appointments', self.archive())
+
+    def test_dry_run_and_chunks(self):
+        output = self.archive('--dry-run')
+        self.assertIn('Would archive 1 appointments', output)
+        self.assertEqual(Appointment.objects.count(), 4)
+
+        for i in range(3):
+            self.slot(days_ago=100 + i)
+        output = self.archive('--chunk-size', '2', '--max-chunks', '1')
+        self.assertIn('2 unbooked availabilities', output)
+        output = self.archive('--chunk-size', '2')
+        self.assertIn('2 unbooked availabilities', output)
+
+    def test_patient_history_survives_archival(self):
+        from appointment.patient_history import has_prior_appointment
+        Appointment.objects.filter(patient=self.patient).exclude(id=self.old_completed.id).update(status='cancelled_by_patient')
+        self.archive('--appointment-days', '300')
+        self.assertFalse(Appointment.objects.filter(patient=self.patient, status='completed').exists())
+        self.assertTrue(has_prior_appointment(self.patient.id))
+
+    def test_incremental_recount_includes_archived_slots(self):
+        from appointment.models import DoctorDailySchedule
+        from appointment.schedule_summary import keys_for_slots, rebuild_doctor_schedule, refresh_daily_schedules
+        # A booked slot on the same day stays in the hot table; the free one is archived
+        AppointmentAvailability.objects.create(
+            doctor=self.doctor, start_time=self.old_free.end_time, end_time=self.old_free.end_time + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane', is_booked=True
+        )
+        (doctor_id, day), = keys_for_slots([self.old_free])
+        self.archive()
+        self.assertFalse(AppointmentAvailability.objects.filter(id=self.old_free.id).exists())
+
+        rebuild_doctor_schedule(self.doctor.id)
+        self.assertEqual(DoctorDailySchedule.objects.get(doctor_id=doctor_id, date=day).slots, 2)
+        # A later write to that day recounts it the same way
+        refresh_daily_schedules({(doctor_id, day)})
+        self.assertEqual(DoctorDailySchedule.objects.get(doctor_id=doctor_id, date=day).slots, 2)
+
+    def test_async_detail_reads_through_archive_for_admin(self):
+        from rest_framework_simplejwt.tokens import AccessToken
+        self.archive()
+        url_args = [self.old_completed.id]
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.admin)}'}
+        sync_response = self.client.get(reverse('appointment-detail', args=url_args), **headers)
+        async_response = self.client.get(reverse('async-appointment-detail', args=url_args), **headers)
+        self.assertEqual(async_response.status_code, 200)
+        self.assertEqual(async_response.json(), sync_response.json())
+
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.patient)}'}
+        self.assertEqual(self.client.get(reverse('async-appointment-detail', args=url_args), **headers).status_code, 404)
+
+    def test_admin_reads_through_archive(self):
+        self.archive()
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('list-available-appointments') + '?page_size=100')
+        self.assertEqual(response.status_code, 200)
+        ids = [row['id'] for row in response.data['results']]
+        self.assertEqual(response.data['count'], 4)
+        expected = [self.old_open, self.old_paid, self.old_completed, self.recent_completed]
+        self.assertEqual(ids, [str(a.id) for a in expected])
+        archived = response.data['results'][2]
+        self.assertEqual(archived['availability']['doctor']['id'], self.doctor.id)
+
+        response = self.client.get(reverse('appointment-detail', args=[self.old_completed.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'completed')
+
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.get(reverse('appointment-detail', args=[self.old_completed.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_schedule_backfill_counts_archived_rows(self):
+        from appointment.models import DoctorDailySchedule
+        call_command('backfill_doctor_schedules', stdout=StringIO())
+        before = list(DoctorDailySchedule.objects.order_by('date').values('date', 'slots', 'completed'))
+        self.archive()
+        call_command('backfill_doctor_schedules', stdout=StringIO())
+        after = list(DoctorDailySchedule.objects.order_by('date').values('date', 'slots', 'completed'))
+        self.assertEqual(before, after)
+
+
+class ReschedulingServiceTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        from appointment.rescheduling import reset_lock_wait_metrics
+        reset_lock_wait_metrics()
+        self.doctor = User.objects.create_user(email='doc@example.com', password='testpass', role='doctor', first_name='Doc')
+        self.doctor2 = User.objects.create_user(email='doc2@example.com', password='testpass', role='doctor', first_name='Cover')
+        self.patient = User.objects.create_user(email='pat@example.com', password='testpass', role='patient')
+        self.admin = User.objects.create_user(email='admin@example.com', password='testpass', role='admin')
+        self.start = (now() + timedelta(days=2)).replace(second=0, microsecond=0)
+        self.session = [self.slot(self.doctor, i) for i in range(3)]
+        self.appointments = [
+            Appointment.objects.create(availability=slot, patient=self.patient, status='booked', price=80)
+            for slot in self.session
+        ]
+        AppointmentAvailability.objects.filter(id__in=[slot.id for slot in self.session]).update(is_booked=True)
+        self.free = self.slot(self.doctor, 10)
+
+    def slot(self, doctor, index, hours=0):
+        start = self.start + timedelta(hours=hours, minutes=15 * index)
+        return AppointmentAvailability.objects.create(
+            doctor=doctor, start_time=start, end_time=start + timedelta(minutes=15),
+            slot_type='short', timezone='Australia/Brisbane'
+        )
+
+    def reschedule(self, appointment, slot, user=None):
+        self.client.force_authenticate(user=user or self.patient)
+        return self.client.post(reverse('reschedule-appointment', args=[appointment.id]), {
+            "new_availability_id": str(slot.id)
+        }, format='json')
+
+    def test_reschedule_keeps_price_and_swaps_slots(self):
+        response = self.reschedule(self.appointments[0], self.free)
+        self.assertEqual(response.status_code, 200)
+        new = Appointment.objects.get(id=response.data["new_appointment_id"])
+        self.assertEqual((new.availability_id, new.status, new.price), (self.free.id, 'booked', 80))
+        self.assertEqual(new.rescheduled_from_id, self.appointments[0].id)
+        self.assertEqual(Appointment.objects.get(id=self.appointments[0].id).status, 'rescheduled')
+        self.assertFalse(AppointmentAvailability.objects.get(id=self.session[0].id).is_booked)
+        self.assertTrue(AppointmentAvailability.objects.get(id=self.free.id).is_booked)
+        self.assertEqual(
+            AppointmentActionLog.objects.filter(appointment=new, action_type='rescheduled').count(), 1
+        )
+
+    def test_pending_appointment_stays_pending_with_its_deadline(self):
+        booked_at = now() - timedelta(minutes=5)
+        Appointment.objects.filter(id=self.appointments[0].id).update(status='pending', booked_at=booked_at)
+        response = self.reschedule(self.appointments[0], self.free)
+        self.assertEqual(response.status_code, 200)
+        new = Appointment.objects.get(id=response.data["new_appointment_id"])
+        self.assertEqual((new.status, new.booked_at), ('pending', booked_at))
+
+    def test_slot_with_cancelled_appointment_is_rejected_not_500(self):
+        Appointment.objects.create(availability=self.free, patient=self.patient, status='cancelled_by_patient')
+        response = self.reschedule(self.appointments[0], self.free)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('no longer available', response.data['error'])
+
+    def test_cancelled_appointment_cannot_be_rescheduled(self):
+        Appointment.objects.filter(id=self.appointments[0].id).update(status='cancelled_by_patient')
+        response = self.reschedule(self.appointments[0], self.free)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AppointmentAvailability.objects.get(id=self.free.id).is_booked)
+
+    def test_other_patients_appointment_is_not_found(self):
+        other = User.objects.create_user(email='other@example.com', password='testpass', role='patient')
+        self.assertEqual(self.reschedule(self.appointments[0], self.free, user=other).status_code, 404)
+
+    @override_settings(RESCHEDULE_RETRY_BACKOFF_MS=0)
+    def test_deadlock_is_retried(self):
+        from django.db import OperationalError
+        from appointment import rescheduling
+
+        real = rescheduling._reschedule
+        calls = []
+
+        def deadlock_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError(1213, "Deadlock found when trying to get lock")
+            return real(*args)
+
+        # The test case's transaction would otherwise disable retries
+        with mock.patch.object(rescheduling, '_reschedule', deadlock_once), \
+                mock.patch.object(rescheduling, 'connection', mock.Mock(in_atomic_block=False)):
+            response = self.reschedule(self.appointments[0], self.free)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        metrics = rescheduling.lock_wait_metrics()
+        self.assertEqual((metrics["deadlocks"], metrics["retries"]), (1, 1))
+
+    def test_lock_timeout_is_503_and_counted(self):
+        from django.db import OperationalError
+        from appointment import rescheduling
+
+        with mock.patch.object(rescheduling, '_reschedule', side_effect=OperationalError(1205, "Lock wait timeout")):
+            response = self.reschedule(self.appointments[0], self.free)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(rescheduling.lock_wait_metrics()["lock_timeouts"], 1)
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.reschedule(self.appointments[0], self.free)
+        self.client.force_authenticate(user=self.doctor)
+        self.assertEqual(self.client.get(reverse('reschedule-metrics')).status_code, 403)
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('reschedule-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["lock_acquisitions"], 2)
+
+    def session_payload(self, **fields):
+        return {
+            "session_start": self.start.isoformat(),
+            "session_end": (self.start + timedelta(hours=1)).isoformat(),
+            **fields,
+        }
+
+    def test_doctor_moves_session_to_another_doctor(self):
+        cover = [self.slot(self.doctor2, i) for i in range(3)]
+        self.client.force_authenticate(user=self.doctor)
+        response = self.client.post(
+            reverse('reschedule-session'), self.session_payload(target_doctor_id=self.doctor2.id), format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["moved"], 3)
+        moved = Appointment.objects.filter(status='booked').order_by('availability__start_time')
+        self.assertEqual([appointment.availability_id for appointment in moved], [slot.id for slot in cover])
+        self.assertEqual(Appointment.objects.filter(status='rescheduled').count(), 3)
+        self.assertEqual(AppointmentAvailability.objects.filter(doctor=self.doctor, is_booked=True).count(), 0)
+        self.assertEqual(AppointmentAvailability.objects.filter(doctor=self.doctor2, is_booked=True).count(), 3)
+
+    def test_admin_moves_session_to_later_block(self):
+        later = [self.slot(self.doctor, i, hours=4) for i in range(3)]
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.post(reverse('reschedule-session'), self.session_payload(
+            doctor_id=self.doctor.id, target_start=(self.start + timedelta(hours=4)).isoformat()
+        ), format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {result["new_availability_id"] for result in response.data["results"]}, {str(slot.id) for slot in later}
+        )
+
+    def test_session_is_all_or_nothing(self):
+        self.slot(self.doctor2, 0)
+        self.slot(self.doctor2, 1)
+        self.client.force_authenticate(user=self.doctor)
+        response = self.client.post(
+            reverse('reschedule-session'), self.session_payload(target_doctor_id=self.doctor2.id), format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["unmatched_appointment_ids"], [str(self.appointments[2].id)])
+        self.assertEqual(Appointment.objects.filter(status='booked').count(), 3)
+        self.assertEqual(AppointmentAvailability.objects.filter(doctor=self.doctor2, is_booked=True).count(), 0)
+
+    def test_patients_cannot_move_sessions(self):
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.post(
+            reverse('reschedule-session'),
+            self.session_payload(doctor_id=self.doctor.id, target_doctor_id=self.doctor2.id), format='json'
+        )
+        self.assertEqual(response.status_code, 403)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # ──────────────── Doctor Availability ────────────────
@@ -7,11 +7,16 @@ urlpatterns = [
     path('availabilities/bulk/', views.BulkAvailabilityView.as_view(), name='bulk-availability'),
     path("availabilities/custom/", views.CustomAvailabilityView.as_view(), name="custom-availability"),
     path('availabilities/list/', views.ListMyAvailabilityView.as_view(), name='list-my-availabilities'),
+    path('availabilities/templates/', views.AvailabilityTemplateListCreateView.as_view(), name='availability-templates'),
+    path('availabilities/templates/<int:pk>/', views.AvailabilityTemplateDetailView.as_view(), name='availability-template-detail'),
+    path('availabilities/calendar/', views.AvailabilityCalendarView.as_view(), name='availability-calendar'),
     path('availabilities/<uuid:pk>/', views.EditAvailabilityView.as_view(), name='edit-availability'),
     path('availabilities/<uuid:pk>/delete/', views.DeleteAvailabilityView.as_view(), name='delete-availability'),
+    path('availabilities/<uuid:pk>/hold/', views.SlotHoldView.as_view(), name='hold-availability'),
 
     # ──────────────── Patient: Available Slots & Booking ────────────────
     path('all/', views.ListAvailableAppointmentsView.as_view(), name='list-available-appointments'),
+    path('export/<str:export_format>/', views.AppointmentExportView.as_view(), name='export-appointments'),
     path('', views.BookAppointmentView.as_view(), name='book-appointment'),
 
     # ──────────────── Appointment Management ────────────────
@@ -23,10 +28,18 @@ urlpatterns = [
     # ──────────────── Doctor: Update Appointment Status ────────────────
     path('<uuid:appointment_id>/complete/', views.MarkAppointmentCompleteView.as_view(), name='complete-appointment'),
     path('<uuid:appointment_id>/no-show/', views.MarkAppointmentNoShowView.as_view(), name='no-show-appointment'),
+    path('bulk-status/', views.BulkAppointmentStatusView.as_view(), name='bulk-appointment-status'),
+    path('sessions/reschedule/', views.RescheduleSessionView.as_view(), name='reschedule-session'),
+    path('reschedule/metrics/', views.RescheduleMetricsView.as_view(), name='reschedule-metrics'),
 
     # ──────────────── Doctor: View Appointment ────────────────
     path('<uuid:appointment_id>/participants/', views.AppointmentPartyInfoView.as_view(), name='appointment-participants'),
 
+    # ──────────────── Async (ASGI-native) read endpoints ────────────────
+    path('async/availabilities/list/', async_views.AsyncListMyAvailabilityView.as_view(), name='async-list-my-availabilities'),
+    path('async/my/', async_views.AsyncListMyAppointmentsView.as_view(), name='async-list-my-appointments'),
+    path('async/<uuid:pk>/', async_views.AsyncAppointmentDetailView.as_view(), name='async-appointment-detail'),
+
     # ──────────────── Logs / Audit ────────────────
     path('<uuid:appointment_id>/logs/', views.AppointmentLogView.as_view(), name='appointment-logs'),
     path('<uuid:pk>/', views.AppointmentDetailView.as_view(), name='appointment-detail'),
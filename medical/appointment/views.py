@@ -6,19 +6,44 @@ from django.utils.timezone import now
 from django.shortcuts import get_object_or_404
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from django.utils.timezone import make_aware
-import pytz
 from rest_framework.pagination import PageNumberPagination
-from django.db import transaction
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.db import IntegrityError, transaction
 
 from users.serializers import DoctorProfileSerializer, PatientProfileSerializer, UserSerializer
-from .models import AppointmentAvailability, Appointment, AppointmentActionLog
+from .models import (
+    AppointmentAvailability, Appointment, AppointmentActionLog, ArchivedAppointment, AvailabilityTemplate
+)
+from .archive import ReadThrough
+from .audit_log import record_action
+from .slots import generate_slot_grid, create_slots_from_grid
+from .slot_times import SLOT_INTERVALS, slot_bounds
+from .overlap import check_doctor_conflicts
+from .holds import HoldInProgress, acquire_hold, get_hold, hold_ttl, release_hold
+from .queryset_optimizer import SerializerOptimizedQuerysetMixin, optimize_for_serializer
+from .pagination import AppointmentKeysetPagination, AvailabilityKeysetPagination
+from .availability_calendar import get_availability_calendar, invalidate_availability_calendar
+from .status_transitions import TransitionNotAllowed, bulk_transition
+from .rescheduling import (
+    RescheduleBusy,
+    RescheduleRejected,
+    lock_wait_metrics,
+    reschedule_appointment,
+    reschedule_session,
+)
+from .schedule_summary import keys_for_slots, schedule_refresh
+from .recurring import MAX_EXPANSION_DAYS, materialise_virtual_slot, virtual_slots
+from .export import EXPORT_FORMATS, export_queryset, iter_export_rows, stream_csv, stream_ndjson
 from .serializers import (
     AppointmentAvailabilitySerializer,
     AppointmentSerializer,
-    AppointmentActionLogSerializer
+    AppointmentActionLogSerializer,
+    AvailabilityTemplateSerializer,
+    BulkStatusTransitionSerializer,
+    SessionRescheduleSerializer
 )
-from users.permissions import IsDoctor,IsPatient
+from users.permissions import IsAdmin, IsDoctor, IsPatient
 from notifications.utils import send_appointment_confirmation
 
 class MyAvailabilityPagination(PageNumberPagination):
@@ -49,44 +74,57 @@ class BulkAvailabilityView(APIView):
         slot_type = data['slot_type']
         timezone_str = data['timezone']
 
-        tz = pytz.timezone(timezone_str)
-        created_slots = []
-        interval = timedelta(minutes=15 if slot_type == 'short' else 30)
-
-        current_date = start_date
-        while current_date <= end_date:
-            if current_date.strftime('%A') in days_of_week:
-                start_dt = tz.localize(datetime.combine(current_date, datetime.strptime(start_time_str, '%H:%M').time()))
-                end_dt = tz.localize(datetime.combine(current_date, datetime.strptime(end_time_str, '%H:%M').time()))
-
-                slot_start = start_dt
-                while slot_start + interval <= end_dt:
-                    slot_end = slot_start + interval
-                    if not AppointmentAvailability.objects.filter(
-                        doctor=user,
-                        start_time=slot_start
-                    ).exists():
-                        created_slots.append(AppointmentAvailability(
-                            doctor=user,
-                            start_time=slot_start,
-                            end_time=slot_end,
-                            slot_type=slot_type,
-                            timezone=timezone_str
-                        ))
-                    slot_start = slot_end
-            current_date += timedelta(days=1)
-
-        AppointmentAvailability.objects.bulk_create(created_slots)
-        return Response({"message": f"{len(created_slots)} slots created."}, status=201)
+        grid = generate_slot_grid(
+            start_date, end_date, days_of_week,
+            start_time_str, end_time_str, slot_type, timezone_str
+        )
+        created_slots, per_day = create_slots_from_grid(user, grid, slot_type, timezone_str)
+        invalidate_availability_calendar(user.id)
+        skipped = sum(day["skipped"] for day in per_day.values())
+
+        return Response({
+            "message": f"{len(created_slots)} slots created.",
+            "created": len(created_slots),
+            "skipped": skipped,
+            "days": per_day,
+        }, status=201)
     
+class SlotHoldView(APIView):
+    """Hold a slot while paying (POST) or give the hold up (DELETE)."""
+    permission_classes = [permissions.IsAuthenticated, IsPatient]
+
+    def post(self, request, pk):
+        try:
+            held = acquire_hold(pk, request.user.id)
+        except HoldInProgress:
+            return Response({"error": "You already hold a slot and another request is changing it; try again in a moment."},
+                            status=status.HTTP_409_CONFLICT)
+        if not held:
+            return Response({"error": "This slot is currently held by another patient."},
+                            status=status.HTTP_409_CONFLICT)
+
+        # Only the patient who won the hold reaches the database
+        materialise_virtual_slot(pk)
+        if not AppointmentAvailability.objects.filter(id=pk, is_booked=False).exists():
+            release_hold(pk, request.user.id)
+            return Response({"error": "Selected time slot is no longer available or does not exist."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        hold = get_hold(pk)
+        return Response({
+            "availability_id": str(pk),
+            "expires_at": datetime.fromtimestamp(hold["expires_at"], tz=ZoneInfo("UTC")).isoformat() if hold else None,
+            "ttl_seconds": hold_ttl(),
+        }, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, pk):
+        release_hold(pk, request.user.id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class CustomAvailabilityView(APIView):
     permission_classes = [IsAuthenticated, IsDoctor]
 
-    SLOT_DURATIONS = {
-        "short": 15,
-        "long": 30,
-    }
-
     def post(self, request):
         user = request.user
         date = request.data.get("date")
@@ -98,32 +136,21 @@ class CustomAvailabilityView(APIView):
             return Response({"error": "Both 'date' and 'start_times' are required."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        if slot_type not in self.SLOT_DURATIONS:
+        if slot_type not in SLOT_INTERVALS:
             return Response({"error": "Invalid slot_type. Choose 'short' or 'long'."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        duration_minutes = self.SLOT_DURATIONS[slot_type]
-        tz = ZoneInfo(timezone_str)
+        interval = SLOT_INTERVALS[slot_type]
 
         new_slots = []
         for time_str in start_times:
             try:
-                start_dt = datetime.strptime(f"{date} {time_str}", "%Y-%m-%d %H:%M")
-                start_dt = make_aware(start_dt.replace(tzinfo=None), timezone=tz)
-                end_dt = start_dt + timedelta(minutes=duration_minutes)
-            except ValueError:
+                day = datetime.strptime(date, "%Y-%m-%d").date()
+                start_dt, end_dt = slot_bounds(day, time_str, interval, timezone_str)
+            except (TypeError, ValueError):
                 return Response({"error": f"Invalid time format: {time_str}"},
                                 status=status.HTTP_400_BAD_REQUEST)
 
-            # Check for overlap with existing availabilities
-            if AppointmentAvailability.objects.filter(
-                doctor=user,
-                start_time__lt=end_dt,
-                end_time__gt=start_dt
-            ).exists():
-                return Response({"error": f"Time slot {time_str} on {date} overlaps with existing availability."},
-                                status=status.HTTP_400_BAD_REQUEST)
-
             new_slots.append(AppointmentAvailability(
                 doctor=user,
                 start_time=start_dt,
@@ -132,14 +159,23 @@ class CustomAvailabilityView(APIView):
                 timezone=timezone_str,
             ))
 
-        # Check for overlap among the submitted times themselves
-        sorted_slots = sorted(new_slots, key=lambda x: x.start_time)
-        for i in range(len(sorted_slots) - 1):
-            if sorted_slots[i].end_time > sorted_slots[i + 1].start_time:
-                return Response({"error": "Some start_times in the list overlap with each other."},
-                                status=status.HTTP_400_BAD_REQUEST)
+        # Check the whole batch against existing availabilities and itself
+        conflicts = check_doctor_conflicts(
+            user,
+            [(time_str, slot.start_time, slot.end_time) for time_str, slot in zip(start_times, new_slots)]
+        )
+        if conflicts["existing"] or conflicts["within_batch"]:
+            errors = []
+            if conflicts["existing"]:
+                errors.append(f"Time slot {', '.join(conflicts['existing'])} on {date} overlaps with existing availability.")
+            if conflicts["within_batch"]:
+                errors.append("Some start_times in the list overlap with each other.")
+            return Response({"error": " ".join(errors), "conflicts": conflicts},
+                            status=status.HTTP_400_BAD_REQUEST)
 
         AppointmentAvailability.objects.bulk_create(new_slots)
+        invalidate_availability_calendar(user.id)
+        schedule_refresh(keys_for_slots(new_slots))
 
         serialized_slots = AppointmentAvailabilitySerializer(new_slots, many=True)
         return Response({"message": "Custom availability slots created successfully.", "slots": serialized_slots.data},
@@ -154,6 +190,14 @@ class EditAvailabilityView(generics.UpdateAPIView):
         instance = serializer.instance
         if instance.is_booked:
             raise serializers.ValidationError("Cannot edit a booked slot.")
+
+        start_time = serializer.validated_data.get('start_time', instance.start_time)
+        end_time = serializer.validated_data.get('end_time', instance.end_time)
+        conflicts = check_doctor_conflicts(
+            instance.doctor, [(str(instance.id), start_time, end_time)], exclude_ids=[instance.id]
+        )
+        if conflicts["existing"]:
+            raise serializers.ValidationError("Updated slot overlaps with existing availability.")
         serializer.save()
 
 
@@ -183,11 +227,7 @@ class MarkAppointmentCompleteView(APIView):
         appointment.status = 'completed'
         appointment.save()
 
-        AppointmentActionLog.objects.create(
-            appointment=appointment,
-            action_type="completed",
-            performed_by=user
-        )
+        record_action(appointment, "completed", performed_by=user)
         return Response({"message": f"Appointment marked as completed by {user.role}."})
 
 
@@ -208,64 +248,225 @@ class MarkAppointmentNoShowView(APIView):
         appointment.status = 'no_show'
         appointment.save()
 
-        AppointmentActionLog.objects.create(
-            appointment=appointment,
-            action_type="no_show",
-            performed_by=user
-        )
+        record_action(appointment, "no_show", performed_by=user)
         return Response({"message": f"Appointment marked as no-show by {user.role}."})
 
 
-class ListMyAvailabilityView(generics.ListAPIView):
+class BulkAppointmentStatusView(APIView):
+    """
+    Apply one status ('completed', 'no_show' or 'cancelled') to a list of
+    appointments, e.g. closing a whole clinic session. Returns a result per ID.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkStatusTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data['status']
+
+        try:
+            results = bulk_transition(request.user, serializer.validated_data['appointment_ids'], target)
+        except TransitionNotAllowed as e:
+            return Response({"error": str(e)}, status=403)
+
+        return Response({
+            "status": target,
+            "updated": sum(1 for result in results if result["result"] == "updated"),
+            "results": results,
+        }, status=200)
+
+
+def _parse_list_datetime(value):
+    """Parse a list filter datetime, making it timezone-aware if it's not already."""
+    from django.utils.dateparse import parse_datetime
+    from django.utils import timezone
+
+    parsed = parse_datetime(value) if value else None
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def my_availability_queryset(user, query_params):
+    """Availabilities visible to `user` on the list endpoints, with the list filters applied."""
+    queryset = AppointmentAvailability.objects.all().order_by("id")
+    if user.role == 'doctor':
+        queryset = queryset.filter(doctor=user)
+    elif user.role == 'patient':
+        doctor_id = query_params.get('doctor')
+        if doctor_id:
+            queryset = queryset.filter(doctor__id=doctor_id)
+    else:
+        return AppointmentAvailability.objects.none()
+
+    # New query params
+    start_time = query_params.get('start_time')
+    end_time = query_params.get('end_time')
+    is_booked = query_params.get('is_booked')
+
+    if start_time:
+        queryset = queryset.filter(start_time__gte=_parse_list_datetime(start_time) or start_time)
+
+    if end_time:
+        queryset = queryset.filter(end_time__lte=_parse_list_datetime(end_time) or end_time)
+    if is_booked is not None:
+        if is_booked.lower() == 'true':
+            queryset = queryset.filter(is_booked=True)
+        elif is_booked.lower() == 'false':
+            queryset = queryset.filter(is_booked=False)
+
+    return queryset
+
+
+class ListMyAvailabilityView(SerializerOptimizedQuerysetMixin, generics.ListAPIView):
     serializer_class = AppointmentAvailabilitySerializer
     permission_classes = [permissions.IsAuthenticated]
-    # pagination_class = MyAvailabilityPagination  # Enable page & page_size query params
+    pagination_class = AvailabilityKeysetPagination  # page/page_size, or ?cursor= for keyset paging
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = AppointmentAvailability.objects.all().order_by("id")
-        if user.role == 'doctor':
-            queryset = queryset.filter(doctor=user)
-        elif user.role == 'patient':
-            doctor_id = self.request.query_params.get('doctor')
-            if doctor_id:
-                queryset = queryset.filter(doctor__id=doctor_id)
-        else:
-            return AppointmentAvailability.objects.none()
+        return my_availability_queryset(self.request.user, self.request.query_params)
 
-        # New query params
-        start_time = self.request.query_params.get('start_time')
-        end_time = self.request.query_params.get('end_time')
-        is_booked = self.request.query_params.get('is_booked')
+    def filter_queryset(self, queryset):
+        return with_virtual_slots(super().filter_queryset(queryset), self.request.user, self.request.query_params)
 
-        if start_time:
-            from django.utils.dateparse import parse_datetime
-            from django.utils import timezone
-            
-            # Parse the datetime string and make it timezone-aware if it's not already
-            parsed_start = parse_datetime(start_time)
-            if parsed_start and timezone.is_naive(parsed_start):
-                parsed_start = timezone.make_aware(parsed_start)
-            queryset = queryset.filter(start_time__gte=parsed_start or start_time)
-            
-        if end_time:
-            from django.utils.dateparse import parse_datetime
-            from django.utils import timezone
-            
-            # Parse the datetime string and make it timezone-aware if it's not already
-            parsed_end = parse_datetime(end_time)
-            if parsed_end and timezone.is_naive(parsed_end):
-                parsed_end = timezone.make_aware(parsed_end)
-            queryset = queryset.filter(end_time__lte=parsed_end or end_time)
-        if is_booked is not None:
-            if is_booked.lower() == 'true':
-                queryset = queryset.filter(is_booked=True)
-            elif is_booked.lower() == 'false':
-                queryset = queryset.filter(is_booked=False)
 
+def with_virtual_slots(queryset, user, query_params):
+    """
+    Merge recurring templates' open slots into an availability listing that
+    asks for a bounded window (both start_time and end_time, at most
+    MAX_EXPANSION_DAYS apart). Returns a list sorted by (start_time, id)
+    when there are any, else `queryset` unchanged.
+    """
+    if user.role not in ('doctor', 'patient') or (query_params.get('is_booked') or '').lower() == 'true':
+        return queryset
+    window_start = _parse_list_datetime(query_params.get('start_time'))
+    window_end = _parse_list_datetime(query_params.get('end_time'))
+    if not (window_start and window_end and window_start < window_end <= window_start + timedelta(days=MAX_EXPANSION_DAYS)):
+        return queryset
+
+    if user.role == 'doctor':
+        doctor_ids = [user.id]
+    else:
+        doctor_id = query_params.get('doctor')
+        doctor_ids = [doctor_id] if doctor_id else None
+    virtual = [slot for slot in virtual_slots(window_start, window_end, doctor_ids=doctor_ids) if slot.end_time <= window_end]
+    if not virtual:
         return queryset
+    return sorted([*queryset, *virtual], key=lambda slot: (slot.start_time, slot.id))
+
+
+class AvailabilityTemplateListCreateView(generics.ListCreateAPIView):
+    """A doctor's recurring weekly availability templates."""
+    serializer_class = AvailabilityTemplateSerializer
+    permission_classes = [permissions.IsAuthenticated, IsDoctor]
+
+    def get_queryset(self):
+        return AvailabilityTemplate.objects.filter(doctor=self.request.user).order_by('weekday', 'start_time', 'id')
+
+    def perform_create(self, serializer):
+        serializer.save(doctor=self.request.user)
+
+
+class AvailabilityTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    Edit or remove a template. Slots already booked from it stay; its other
+    slots change or disappear with it.
+    """
+    serializer_class = AvailabilityTemplateSerializer
+    permission_classes = [permissions.IsAuthenticated, IsDoctor]
+
+    def get_queryset(self):
+        return AvailabilityTemplate.objects.filter(doctor=self.request.user)
+
+class AvailabilityCalendarView(APIView):
+    """Free-slot counts and start times per doctor per day, served from cache."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    MAX_DAYS = 31
+    DEFAULT_DAYS = 7
+
+    def get(self, request):
+        params = request.query_params
+        timezone_str = params.get('timezone', 'Australia/Brisbane')
+        doctor_id = params.get('doctor')
+
+        try:
+            tz = ZoneInfo(timezone_str)
+        except (ValueError, KeyError):
+            return Response({"error": f"Unknown timezone: {timezone_str}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            start_date = (
+                datetime.strptime(params['start_date'], '%Y-%m-%d').date()
+                if params.get('start_date') else now().astimezone(tz).date()
+            )
+            end_date = (
+                datetime.strptime(params['end_date'], '%Y-%m-%d').date()
+                if params.get('end_date') else start_date + timedelta(days=self.DEFAULT_DAYS - 1)
+            )
+        except ValueError:
+            return Response({"error": "Dates must be in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if end_date < start_date:
+            return Response({"error": "end_date must not be before start_date."}, status=status.HTTP_400_BAD_REQUEST)
+        if (end_date - start_date).days >= self.MAX_DAYS:
+            return Response({"error": f"Date range cannot exceed {self.MAX_DAYS} days."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if doctor_id is not None:
+            try:
+                doctor_id = int(doctor_id)
+            except ValueError:
+                return Response({"error": "doctor must be an integer id."}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = get_availability_calendar(start_date, end_date, timezone_str, doctor_id=doctor_id)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class AppointmentExportView(APIView):
+    """
+    Admin export of appointments as a streamed CSV or NDJSON file.
+    Optional filters: start_date / end_date (YYYY-MM-DD, inclusive, local to
+    `timezone`) and status (comma-separated).
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": f"Unsupported export format: {export_format}"}, status=status.HTTP_404_NOT_FOUND)
+
+        params = request.query_params
+        timezone_str = params.get('timezone', 'Australia/Brisbane')
+        try:
+            tz = ZoneInfo(timezone_str)
+        except (ValueError, KeyError):
+            return Response({"error": f"Unknown timezone: {timezone_str}"}, status=status.HTTP_400_BAD_REQUEST)
 
-class ListAvailableAppointmentsView(generics.ListAPIView):
+        try:
+            start_date = datetime.strptime(params['start_date'], '%Y-%m-%d').date() if params.get('start_date') else None
+            end_date = datetime.strptime(params['end_date'], '%Y-%m-%d').date() if params.get('end_date') else None
+        except ValueError:
+            return Response({"error": "Dates must be in YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+        if start_date and end_date and end_date < start_date:
+            return Response({"error": "end_date must not be before start_date."}, status=status.HTTP_400_BAD_REQUEST)
+
+        statuses = [value for value in params.get('status', '').split(',') if value]
+        valid_statuses = {choice for choice, _ in Appointment.STATUS_CHOICES}
+        unknown = [value for value in statuses if value not in valid_statuses]
+        if unknown:
+            return Response({"error": f"Unknown status: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = datetime.combine(start_date, datetime.min.time(), tzinfo=tz) if start_date else None
+        end = datetime.combine(end_date + timedelta(days=1), datetime.min.time(), tzinfo=tz) if end_date else None
+        rows = iter_export_rows(export_queryset(start, end, statuses))
+        stream = stream_csv(rows) if export_format == 'csv' else stream_ndjson(rows)
+
+        response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = f'attachment; filename="appointments.{export_format}"'
+        return response
+
+
+class ListAvailableAppointmentsView(SerializerOptimizedQuerysetMixin, generics.ListAPIView):
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -273,7 +474,17 @@ class ListAvailableAppointmentsView(generics.ListAPIView):
         user = self.request.user
         if user.role != 'admin':
             return Appointment.objects.none()
-        return Appointment.objects.all().order_by("availability__start_time")
+        return Appointment.objects.all().order_by("availability__start_time", "id")
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.user.role != 'admin':
+            return queryset
+        # Admins read archived appointments through the same listing
+        archived = optimize_for_serializer(
+            ArchivedAppointment.objects.order_by("availability__start_time", "id"), self.get_serializer_class()
+        )
+        return ReadThrough(queryset, archived)
 
 
 class BookAppointmentView(generics.CreateAPIView):
@@ -281,16 +492,65 @@ class BookAppointmentView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsPatient]
 
     def create(self, request, *args, **kwargs):
+        # Turn away slots held by another patient before touching the database
+        availability_id = request.data.get('availability_id')
+        try:
+            held = not availability_id or acquire_hold(availability_id, request.user.id)
+        except HoldInProgress:
+            return Response({"error": "You already hold a slot and another request is changing it; try again in a moment."},
+                            status=status.HTTP_409_CONFLICT)
+        if not held:
+            return Response({"error": "This appointment slot is already taken (held by another patient)."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         # Run the serializer and perform_create logic
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
+        try:
+            if availability_id:
+                # A recurring template's slot gets its row now, under the same id
+                materialise_virtual_slot(availability_id)
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            self.perform_create(serializer)
+        except Exception:
+            if availability_id:
+                release_hold(availability_id, request.user.id)
+            raise
 
         # Return full serialized appointment including `id`
         return Response(self.get_serializer(self.appointment).data, status=status.HTTP_201_CREATED)
 
     def perform_create(self, serializer):
-        # Use atomic transaction to prevent race conditions in booking
+        # APPOINTMENT_BOOKING_STRATEGY: 'pessimistic' (row lock) or 'optimistic' (conditional UPDATE)
+        strategy = getattr(settings, 'APPOINTMENT_BOOKING_STRATEGY', 'pessimistic')
+        if strategy == 'optimistic':
+            self._book_optimistic(serializer)
+        else:
+            self._book_pessimistic(serializer)
+
+        # Log appointment creation
+        record_action(self.appointment, "created", performed_by=self.request.user)
+
+        # Auto-send appointment confirmation
+        patient = self.appointment.patient
+        start_time = self.appointment.availability.start_time.strftime('%A, %d %B %Y at %I:%M %p')
+        subject = "Appointment Confirmation"
+        body = (
+            f"Dear {patient.get_full_name()},\n\n"
+            f"Your appointment has been successfully booked for {start_time}.\n\n"
+            "Regards,\nProMedicine Team"
+        )
+
+        send_appointment_confirmation(
+            to_email=patient.email,
+            subject=subject,
+            body=body,
+            related_id=self.appointment.id
+        )
+
+        # Unpaid bookings are expired by the periodic expire_pending_appointments sweeper
+
+    def _book_pessimistic(self, serializer):
+        # Lock the slot row for the whole booking transaction
         with transaction.atomic():
             availability = serializer.validated_data['availability']
             
@@ -334,33 +594,32 @@ class BookAppointmentView(generics.CreateAPIView):
                 from rest_framework.exceptions import ValidationError
                 raise ValidationError(f"Failed to create appointment: {str(e)}")
 
-        # Log appointment creation
-        AppointmentActionLog.objects.create(
-            appointment=self.appointment,
-            action_type="created",
-            performed_by=self.request.user
-        )
-
-        # Auto-send appointment confirmation
-        patient = self.appointment.patient
-        start_time = self.appointment.availability.start_time.strftime('%A, %d %B %Y at %I:%M %p')
-        subject = "Appointment Confirmation"
-        body = (
-            f"Dear {patient.get_full_name()},\n\n"
-            f"Your appointment has been successfully booked for {start_time}.\n\n"
-            "Regards,\nProMedicine Team"
-        )
+    def _book_optimistic(self, serializer):
+        # Claim the slot with UPDATE ... SET is_booked=1 WHERE id=? AND is_booked=0
+        # and check the affected-row count instead of taking a lock up front
+        from rest_framework.exceptions import ValidationError
+        availability = serializer.validated_data['availability']
+        try:
+            with transaction.atomic():
+                claimed = AppointmentAvailability.objects.filter(
+                    id=availability.id, is_booked=False
+                ).update(is_booked=True)
+                if not claimed:
+                    raise ValidationError("This time slot has been booked by another user.")
 
-        send_appointment_confirmation(
-            to_email=patient.email,
-            subject=subject,
-            body=body,
-            related_id=self.appointment.id
-        )
+                availability.is_booked = True
+                self.appointment = serializer.save(
+                    created_by=self.request.user,
+                    updated_by=self.request.user,
+                    is_deleted=False,
+                    status='pending',  # Set status to 'pending' when booking
+                )
+        except IntegrityError:
+            # An appointment row already exists for this slot; the claim was rolled back
+            raise ValidationError("This appointment slot is already taken.")
 
-        # Schedule Celery task to expire appointment in 15 minutes
-        from .tasks import expire_pending_appointment
-        expire_pending_appointment.apply_async(args=[self.appointment.id], countdown=15*60)
+        # update() bypasses post_save, so invalidate the calendar here
+        invalidate_availability_calendar(availability.doctor_id)
 
 class UpdateAppointmentView(generics.UpdateAPIView):
     queryset = Appointment.objects.all()
@@ -428,12 +687,9 @@ class CancelAppointmentView(APIView):
             availability.save(update_fields=['is_booked'])
 
             # Log the cancellation
-            AppointmentActionLog.objects.create(
-                appointment=appointment,
-                action_type="cancelled",
-                performed_by=user
-            )
+            record_action(appointment, "cancelled", performed_by=user)
 
+        release_hold(availability.id)
         return Response({"message": f"Appointment cancelled by {user.role}."}, status=200)
 
 class RescheduleAppointmentView(APIView):
@@ -447,113 +703,79 @@ class RescheduleAppointmentView(APIView):
             return Response({"error": "New availability ID is required."}, status=400)
 
         try:
-            # Use atomic transaction to prevent race conditions
-            with transaction.atomic():
-                # Identify and authorize the old appointment with select_for_update
-                if user.role == 'patient':
-                    old_appointment = get_object_or_404(
-                        Appointment.objects.select_for_update(), 
-                        id=appointment_id, 
-                        patient=user
-                    )
-                elif user.role == 'doctor':
-                    old_appointment = get_object_or_404(
-                        Appointment.objects.select_for_update(), 
-                        id=appointment_id, 
-                        availability__doctor=user
-                    )
-                elif user.role == 'admin':
-                    old_appointment = get_object_or_404(
-                        Appointment.objects.select_for_update(), 
-                        id=appointment_id
-                    )
-                else:
-                    return Response({"error": "Unauthorized role."}, status=403)
-
-                # Check if appointment can be rescheduled
-                if old_appointment.status in ['cancelled', 'completed', 'rescheduled']:
-                    return Response({
-                        "error": f"Cannot reschedule appointment with status '{old_appointment.status}'"
-                    }, status=400)
-
-                # Fetch and lock the new availability to prevent race conditions
-                try:
-                    new_availability = AppointmentAvailability.objects.select_for_update().get(
-                        id=new_availability_id, 
-                        is_booked=False
-                    )
-                except AppointmentAvailability.DoesNotExist:
-                    return Response({
-                        "error": "Selected time slot is no longer available or does not exist."
-                    }, status=400)
-
-                # Double-check availability is still free (race condition protection)
-                if new_availability.is_booked:
-                    return Response({
-                        "error": "Selected time slot has been booked by another user."
-                    }, status=400)
-
-                # Get old availability with lock
-                old_availability = AppointmentAvailability.objects.select_for_update().get(
-                    id=old_appointment.availability.id
-                )
+            old_appointment, new_appointment = reschedule_appointment(user, appointment_id, new_availability_id)
+        except RescheduleRejected as e:
+            return Response({"error": str(e)}, status=e.status)
+        except RescheduleBusy as e:
+            return Response({"error": str(e)}, status=503, headers={"Retry-After": "1"})
+
+        return Response({
+            "message": f"Appointment rescheduled successfully by {user.role}.",
+            "new_appointment_id": str(new_appointment.id),
+            "old_appointment_id": str(old_appointment.id)
+        }, status=200)
+
+
+class RescheduleSessionView(APIView):
+    """
+    Move every open appointment in one doctor session to another doctor
+    and/or another time block, all or nothing, e.g. when a doctor calls in
+    sick. Doctors can only move their own sessions.
+    """
+    permission_classes = [permissions.IsAuthenticated]
 
-                # Perform the reschedule operations atomically
-                # 1. Mark old appointment as rescheduled
-                old_appointment.status = 'rescheduled'
-                old_appointment.updated_by = user
-                old_appointment.save(update_fields=['status', 'updated_by'])
-
-                # 2. Free the old availability slot
-                old_availability.is_booked = False
-                old_availability.save(update_fields=['is_booked'])
-
-                # 3. Create the new appointment
-                new_appointment = Appointment.objects.create(
-                    availability=new_availability,
-                    patient=old_appointment.patient,
-                    status='booked',
-                    rescheduled_from=old_appointment,
-                    created_by=user,
-                    is_deleted=False
-                )
+    def post(self, request):
+        serializer = SessionRescheduleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if request.user.role == 'admin' and 'doctor_id' not in data:
+            return Response({"error": "doctor_id is required."}, status=400)
 
-                # 4. Book the new availability slot
-                new_availability.is_booked = True
-                new_availability.save(update_fields=['is_booked'])
+        try:
+            moved = reschedule_session(
+                request.user,
+                data.get('doctor_id'),
+                data['session_start'],
+                data['session_end'],
+                target_doctor_id=data.get('target_doctor_id'),
+                target_start=data.get('target_start'),
+            )
+        except RescheduleRejected as e:
+            return Response({"error": str(e), **(e.details or {})}, status=e.status)
+        except RescheduleBusy as e:
+            return Response({"error": str(e)}, status=503, headers={"Retry-After": "1"})
 
-                # 5. Log the action
-                AppointmentActionLog.objects.create(
-                    appointment=new_appointment,
-                    action_type="rescheduled",
-                    performed_by=user
-                )
+        return Response({
+            "moved": len(moved),
+            "results": [
+                {"old_appointment_id": str(old.id), "new_appointment_id": str(new.id),
+                 "new_availability_id": str(new.availability_id)}
+                for old, new in moved
+            ],
+        }, status=200)
 
-                return Response({
-                    "message": f"Appointment rescheduled successfully by {user.role}.",
-                    "new_appointment_id": str(new_appointment.id),
-                    "old_appointment_id": str(old_appointment.id)
-                }, status=200)
-
-        except Exception as e:
-            # Log the error for debugging
-            import logging
-            logger = logging.getLogger(__name__)
-            # logger.error(f"Reschedule error for appointment {appointment_id}: {str(e)}")
-            
-            return Response({
-                "error": "An error occurred while rescheduling the appointment. Please try again."
-            }, status=500)
 
-class ListMyAppointmentsView(generics.ListAPIView):
+class RescheduleMetricsView(APIView):
+    """Row lock wait times and deadlock retries of rescheduling in this process."""
+    permission_classes = [permissions.IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(lock_wait_metrics())
+
+
+def my_appointments_queryset(user):
+    if user.role == 'doctor':
+        return Appointment.objects.filter(availability__doctor=user, is_deleted=False).order_by("id")
+    return Appointment.objects.filter(patient=user).order_by("id")
+
+
+class ListMyAppointmentsView(SerializerOptimizedQuerysetMixin, generics.ListAPIView):
     serializer_class = AppointmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AppointmentKeysetPagination
 
     def get_queryset(self):
-        user = self.request.user
-        if user.role == 'doctor':
-            return Appointment.objects.filter(availability__doctor=user, is_deleted=False).order_by("id")
-        return Appointment.objects.filter(patient=user).order_by("id")
+        return my_appointments_queryset(self.request.user)
 
 
 class AppointmentLogView(generics.ListAPIView):
@@ -564,11 +786,20 @@ class AppointmentLogView(generics.ListAPIView):
         get_object_or_404(Appointment, id=self.kwargs['appointment_id'])
         return AppointmentActionLog.objects.filter(appointment_id=self.kwargs['appointment_id']).order_by("id")
 
-class AppointmentDetailView(generics.RetrieveAPIView):
+class AppointmentDetailView(SerializerOptimizedQuerysetMixin, generics.RetrieveAPIView):
     queryset = Appointment.objects.select_related('patient', 'availability')
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if self.request.user.role != 'admin':
+                raise
+            archived = optimize_for_serializer(ArchivedAppointment.objects.all(), self.get_serializer_class())
+            return get_object_or_404(archived, pk=self.kwargs['pk'])
+
 class AppointmentPartyInfoView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsDoctor]
 
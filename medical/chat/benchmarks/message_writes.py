@@ -0,0 +1,76 @@
+"""
+Messages per second one worker can persist: the previous per-message
+transaction (lock the room, load the sender, INSERT) against the
+micro-batched pipeline in chat.persistence at a few batch sizes. Every
+message is submitted at once, as if from that many open connections.
+"""
+import asyncio
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import override_settings
+from django.utils.timezone import now
+
+from appointment.benchmarks.booking_strategies import BENCH_EMAIL_DOMAIN, cleanup
+from appointment.models import Appointment, AppointmentAvailability
+from chat import persistence
+from chat.models import ChatRoom, Message
+from users.models import User
+
+
+def seed_room(tag="chat"):
+    doctor = User.objects.create_user(
+        email=f"{tag}-doctor@{BENCH_EMAIL_DOMAIN}", password=None, role="doctor", first_name="Bench"
+    )
+    patient = User.objects.create_user(email=f"{tag}-patient@{BENCH_EMAIL_DOMAIN}", password=None, role="patient")
+    start = now() + timedelta(days=30)
+    slot = AppointmentAvailability.objects.create(
+        doctor=doctor, start_time=start, end_time=start + timedelta(minutes=15),
+        slot_type="short", timezone="Australia/Brisbane", is_booked=True,
+    )
+    appointment = Appointment.objects.create(availability=slot, patient=patient, status="booked")
+    room = ChatRoom.objects.create(patient=patient, doctor=doctor, appointment=appointment)
+    return room, (patient.id, doctor.id)
+
+
+def per_message_save(room_id, sender_id, text):
+    """ChatConsumer.save_message as it was: one locking transaction per message."""
+    with transaction.atomic():
+        room = ChatRoom.objects.select_for_update().get(id=room_id)
+        sender = User.objects.get(id=sender_id)
+        if sender.id != room.patient.id and sender.id != room.doctor.id:
+            return None
+        return Message.objects.create(room=room, sender=sender, message=text)
+
+
+async def _submit_all(room_id, senders, count):
+    return await asyncio.gather(*[
+        persistence.submit(room_id, senders[i % 2], f"message {i}") for i in range(count)
+    ])
+
+
+def run_message_write_benchmark(messages=2000, batch_sizes=(10, 100, 500), window_ms=20):
+    """Returns one row per variant with its messages/sec."""
+    cleanup()
+    room, senders = seed_room()
+    rows = []
+
+    started = time.perf_counter()
+    for i in range(messages):
+        per_message_save(room.id, senders[i % 2], f"message {i}")
+    elapsed = time.perf_counter() - started
+    rows.append({"variant": "per_message", "messages": messages, "elapsed_s": round(elapsed, 3),
+                 "messages_per_s": round(messages / elapsed, 1)})
+
+    for batch_size in batch_sizes:
+        Message.objects.filter(room=room).delete()
+        with override_settings(CHAT_MESSAGE_BATCH_SIZE=batch_size, CHAT_MESSAGE_BATCH_WINDOW_MS=window_ms):
+            started = time.perf_counter()
+            saved = asyncio.run(_submit_all(room.id, senders, messages))
+            elapsed = time.perf_counter() - started
+        rows.append({"variant": f"batched_{batch_size}", "messages": len(saved), "elapsed_s": round(elapsed, 3),
+                     "messages_per_s": round(len(saved) / elapsed, 1)})
+
+    cleanup()
+    return {"results": rows}
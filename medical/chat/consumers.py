@@ -1,41 +1,48 @@
 import json
-import urllib.parse
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth.models import AnonymousUser
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import UntypedToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from jwt import decode as jwt_decode
-from django.conf import settings
-from users.models import User
-from .models import ChatRoom, Message
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import averify_token
+from .middleware import query_token
+from .persistence import MessageRejected, submit as submit_message
+from .room_state import can_send_messages, load_room_state, room_group_name
 
 User = get_user_model()
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         # Step 1: Validate JWT token
-        user = await self.simple_jwt_auth()
+        user = await self.authenticate()
         if not user:
             await self.close(code=4001)  # Authentication failed
             return
             
         self.room_id = self.scope['url_route']['kwargs']['room_id']
-        self.room_group_name = f'chat_{self.room_id}'
         self.user = user
 
-        # Step 2: Accept connection immediately
+        # Step 2: Authorize once; the room state is kept for the connection's lifetime
+        # and updated by room_state events, so messages are checked without a query
+        self.room_state = await database_sync_to_async(load_room_state)(self.room_id)
+        if self.room_state is None:
+            await self.close(code=4004)  # Room not found
+            return
+        if user.id not in self.room_state['member_ids']:
+            await self.close(code=4003)  # Not a member of this room
+            return
+        self.room_group_name = room_group_name(self.room_id)
+
+        # Step 3: Accept connection
         await self.accept()
         
-        # Step 3: Send welcome message
+        # Step 4: Send welcome message
         await self.send(text_data=json.dumps({
             'type': 'welcome',
             'message': f'Welcome to chat room {self.room_id}!',
             'user': user.email
         }))
         
-        # Step 4: Add to group
+        # Step 5: Add to group
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
@@ -86,16 +93,42 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 await self.send_error('User not authenticated')
                 return
             sender_id = sender_id.id
+            if not can_send_messages(self.room_state):
+                await self.send_error('This chat room is not accepting messages.', client_id=data.get('client_id'))
+                return
+            # Echoed back in the ack so the client can match it to its pending message
+            client_id = data.get('client_id')
+
+            # Persist with the next micro-batch; resolves once it has committed
+            try:
+                saved = await submit_message(int(self.room_id), sender_id, message)
+            except MessageRejected as e:
+                await self.send_error(str(e), client_id=client_id)
+                return
+            except Exception as e:
+                print(f"[Error] Failed to save message: {str(e)}")
+                await self.send_error('Message could not be saved', client_id=client_id)
+                return
+            timestamp = saved.timestamp.isoformat()
 
-            # Broadcast message to all room members immediately
+            await self.send(text_data=json.dumps({
+                'type': 'ack',
+                'client_id': client_id,
+                'id': saved.id,
+                'timestamp': timestamp
+            }))
+
+            # Broadcast the stored message to the other room members
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
                     'type': 'chat_message',
+                    'message_id': saved.id,
                     'message': message,
                     'sender': sender_id,
                     'sender_name': getattr(self.user, 'first_name', 'User'),
-                    'timestamp': 'now'
+                    'timestamp': timestamp,
+                    'sender_channel': self.channel_name
                 }
             )
 
@@ -103,99 +136,21 @@ class ChatConsumer(AsyncWebsocketConsumer):
             print(f"[WebSocket Error] Unexpected error in receive: {str(e)}")
             await self.send_error('An unexpected error occurred')
 
-    async def send_error(self, error_message):
+    async def send_error(self, error_message, client_id=None):
         """Send error message to client"""
-        await self.send(text_data=json.dumps({
+        payload = {
             'type': 'error',
             'error': error_message
-        }))
-
-    @database_sync_to_async
-    def validate_room_access_and_status(self, user, room_id):
-        """
-        Validate if user has access to the chat room and if room allows messaging.
-        """
-        try:
-            room = ChatRoom.objects.get(id=room_id)
-            
-            # Check access
-            has_access = user.id == room.patient.id or user.id == room.doctor.id
-            
-            # Check if room allows messaging
-            can_message = room.can_send_messages()
-            
-            return {
-                'has_access': has_access,
-                'can_message': can_message,
-                'room_status': room.status,
-                'is_deleted': room.is_deleted
-            }
-            
-        except ChatRoom.DoesNotExist:
-            return {
-                'has_access': False,
-                'can_message': False,
-                'room_status': None,
-                'is_deleted': None
-            }
-        except Exception as e:
-            print(f"[Error validating room access]: {str(e)}")
-            return {
-                'has_access': False,
-                'can_message': False,
-                'room_status': None,
-                'is_deleted': None
-            }
-
-    @database_sync_to_async
-    def save_message(self, room_id, sender_id, message):
-        """
-        Save message to database with atomic transaction and comprehensive error handling
-        Returns dict with message data on success, None on failure
-        """
-        from django.db import transaction
-        
-        try:
-            # Use atomic transaction to ensure consistency
-            with transaction.atomic():
-                room = ChatRoom.objects.select_for_update().get(id=room_id)
-                sender = User.objects.get(id=sender_id)
-                
-                # Double-check room access at database level
-                if sender.id != room.patient.id and sender.id != room.doctor.id:
-                    print(f"[Security] User {sender_id} attempted to send message to unauthorized room {room_id}")
-                    return None
-                
-                # Create message within transaction
-                msg = Message.objects.create(room=room, sender=sender, message=message)
-                
-                # Force commit by accessing the ID (ensures data is persisted)
-                message_id = msg.id
-                message_timestamp = msg.timestamp
-                
-                print(f"[Chat] Message committed: ID={message_id}, Room={room_id}, Sender={sender.email}")
-                
-                return {
-                    'id': message_id,
-                    'message': msg.message,
-                    'sender_id': msg.sender.id,
-                    'sender_name': msg.sender.first_name,
-                    'timestamp': message_timestamp.isoformat(),
-                    'room_id': msg.room.id
-                }
-            
-        except ChatRoom.DoesNotExist:
-            print(f"[Error] Chat room {room_id} does not exist")
-            return None
-        except User.DoesNotExist:
-            print(f"[Error] User {sender_id} does not exist")
-            return None
-        except Exception as e:
-            print(f"[Error] Failed to save message in transaction: {str(e)}")
-            return None
+        }
+        if client_id is not None:
+            payload['client_id'] = client_id
+        await self.send(text_data=json.dumps(payload))
 
     async def chat_message(self, event):
         """Send chat message to WebSocket client"""
+        # The sender already has it from the ack
+        if event.get('sender_channel') == self.channel_name:
+            return
         try:
             await self.send(text_data=json.dumps({
                 'type': 'message',
@@ -208,79 +163,31 @@ class ChatConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             print(f"[WebSocket Error] Failed to send message: {str(e)}")
     
-    async def simple_jwt_auth(self):
-        """
-        Simple JWT authentication - no complex database async operations
-        """
-        try:
-            # Get token from query string
-            query_string = self.scope.get('query_string', b'').decode()
-            query_params = urllib.parse.parse_qs(query_string)
-            token = query_params.get('token', [None])[0]
-            
-            if not token:
-                return None
-            
-            # Validate and decode token
-            UntypedToken(token)
-            decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = decoded_data.get('user_id')
-            
-            if not user_id:
-                return None
-            
-            # Get user synchronously (avoiding async issues)
-            user = await self.get_user_simple(user_id)
-            return user
-            
-        except Exception:
-            return None
-    
-    @database_sync_to_async
-    def get_user_simple(self, user_id):
-        """Simple synchronous user lookup"""
-        try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return None
-    
-    async def authenticate_jwt(self):
+    async def room_state_changed(self, event):
+        """Room status changed (RoomManagementView); update the cached state and tell the client"""
+        self.room_state = {**self.room_state, 'status': event['status'], 'is_deleted': event['is_deleted']}
+        await self.send(text_data=json.dumps({
+            'type': 'room_state',
+            'status': event['status'],
+            'is_deleted': event['is_deleted'],
+            'can_send_messages': can_send_messages(self.room_state)
+        }))
+        if event['is_deleted']:
+            await self.close(code=4004)
+
+    async def authenticate(self):
         """
-        Simple JWT authentication from query string
-        Returns User object if valid, None if invalid
+        The user JWTAuthMiddleware put in the scope, or the one the ?token=
+        query parameter names (consumer mounted without the middleware).
+        Returns None if neither authenticates.
         """
-        try:
-            # Get token from query string
-            query_string = self.scope.get('query_string', b'').decode()
-            query_params = urllib.parse.parse_qs(query_string)
-            token = query_params.get('token', [None])[0]
-            
-            if not token:
-                return None
-            
-            # Validate token structure
-            UntypedToken(token)
-            
-            # Decode token
-            decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = decoded_data.get('user_id')
-            
-            if not user_id:
-                return None
-            
-            # Get user from database
-            user = await self.get_user_by_id(user_id)
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated:
             return user
-            
-        except (InvalidToken, TokenError):
-            return None
-        except Exception:
+        token = query_token(self.scope)
+        if not token:
             return None
-    
-    @database_sync_to_async
-    def get_user_by_id(self, user_id):
-        """Get user from database synchronously"""
         try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
+            return await averify_token(token)
+        except AuthenticationFailed:
             return None
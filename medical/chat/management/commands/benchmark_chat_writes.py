@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from chat.benchmarks.message_writes import run_message_write_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare chat messages/sec persisted by one worker with a transaction per message and '
+        'with the micro-batched WebSocket pipeline. Use a disposable database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Messages written per variant')
+        parser.add_argument('--batch-sizes', default='10,100,500', help='Comma-separated batch sizes')
+        parser.add_argument('--window-ms', type=int, default=20, help='Batch time window')
+
+    def handle(self, *args, **options):
+        report = run_message_write_benchmark(
+            messages=options['messages'],
+            batch_sizes=[int(size) for size in options['batch_sizes'].split(',')],
+            window_ms=options['window_ms'],
+        )
+        for row in report['results']:
+            self.stdout.write(
+                f"{row['variant']:<13} messages={row['messages']} elapsed={row['elapsed_s']}s "
+                f"throughput={row['messages_per_s']} msg/s"
+            )
@@ -0,0 +1,102 @@
+"""
+Incremental reads of a room's messages for polling clients.
+
+GET messages/<room_id>/ returns at most `limit` messages (default
+CHAT_MESSAGE_PAGE_SIZE, never more than CHAT_MESSAGE_MAX_PAGE_SIZE), oldest
+first, chosen by id on the (room, id) index:
+
+- no parameters: the latest messages;
+- ?since_id=N: the messages after N (a client catching up repeats with the
+  last id it got until a page comes back shorter than `limit`);
+- ?before_id=N: the messages just before N (scrolling back).
+
+Each response carries an ETag built from the room's last message id, the
+room's updated_at (bumped when messages are marked read, so is_read and
+read_by_count stay truthful), the user and the parameters. A client that
+sends it back in If-None-Match gets a 304 before any message is read.
+"""
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+
+from .models import ChatRoom, Message, MessageReadStatus
+
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_MAX_PAGE_SIZE = 200
+
+
+class InvalidSyncParams(ValueError):
+    pass
+
+
+def _positive_int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise InvalidSyncParams(f"'{name}' must be a positive integer.")
+    if value < 1:
+        raise InvalidSyncParams(f"'{name}' must be a positive integer.")
+    return value
+
+
+def parse_sync_params(params):
+    """(since_id, before_id, limit) from the query string; raises InvalidSyncParams."""
+    since_id = _positive_int(params, 'since_id')
+    before_id = _positive_int(params, 'before_id')
+    if since_id is not None and before_id is not None:
+        raise InvalidSyncParams("Use either 'since_id' or 'before_id', not both.")
+    limit = _positive_int(params, 'limit') or getattr(settings, 'CHAT_MESSAGE_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    return since_id, before_id, min(limit, getattr(settings, 'CHAT_MESSAGE_MAX_PAGE_SIZE', DEFAULT_MAX_PAGE_SIZE))
+
+
+def last_message_id(room_id):
+    return Message.objects.filter(room_id=room_id).order_by('-id').values_list('id', flat=True).first()
+
+
+def messages_etag(room, user, last_id, since_id, before_id, limit):
+    return quote_etag(
+        f"{last_id or 0}-{room.updated_at.timestamp()}-{user.id}-{since_id or ''}-{before_id or ''}-{limit}"
+    )
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or etag in tags
+
+
+def page_ids(room_id, since_id, before_id, limit):
+    """Unevaluated query for the ids of the selected page, read on the (room, id) index."""
+    messages = Message.objects.filter(room_id=room_id)
+    if since_id is not None:
+        messages = messages.filter(id__gt=since_id).order_by('id')
+    elif before_id is not None:
+        messages = messages.filter(id__lt=before_id).order_by('-id')
+    else:
+        messages = messages.order_by('-id')
+    return messages.values_list('id', flat=True)[:limit]
+
+
+def message_window(room_id, user, since_id, before_id, limit):
+    """The selected messages, oldest first, annotated for MessageSerializer."""
+    ids = list(page_ids(room_id, since_id, before_id, limit))
+    return list(
+        Message.objects.filter(id__in=ids)
+        .select_related('sender')
+        .annotate(
+            read_by_total=Count('read_by'),
+            read_by_user=Exists(MessageReadStatus.objects.filter(message=OuterRef('pk'), user=user)),
+        )
+        .order_by('id')
+    )
+
+
+def touch_room(room_id):
+    """Change the room's ETag (read flags changed); skips ChatRoom.save's full_clean."""
+    ChatRoom.objects.filter(id=room_id).update(updated_at=timezone.now())
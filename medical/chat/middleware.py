@@ -1,60 +1,33 @@
-from django.contrib.auth.models import AnonymousUser
-from django.contrib.auth import get_user_model
-from django.db import close_old_connections
-from rest_framework_simplejwt.tokens import UntypedToken
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from jwt import decode as jwt_decode
-from django.conf import settings
-from channels.middleware import BaseMiddleware
 from channels.auth import AuthMiddlewareStack
-from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import averify_token
 import urllib.parse
 
-User = get_user_model()
+
+def query_token(scope):
+    """The ?token= of a WebSocket handshake, or None."""
+    query_string = scope.get('query_string', b'').decode()
+    return urllib.parse.parse_qs(query_string).get('token', [None])[0]
+
 
 class JWTAuthMiddleware(BaseMiddleware):
-    def __init__(self, inner):
-        super().__init__(inner)
+    """
+    Sets scope['user'] from the ?token= access token. Verification goes
+    through the shared token cache, so a reconnect with the same token costs
+    no decode and no query. Without a valid token the user the inner stack
+    found (session, or AnonymousUser) is left in place.
+    """
 
     async def __call__(self, scope, receive, send):
-        close_old_connections()
-        
-        # Get token from query string
-        query_string = scope.get('query_string', b'').decode()
-        query_params = urllib.parse.parse_qs(query_string)
-        token = query_params.get('token', [None])[0]
-        
+        token = query_token(scope)
         if token:
             try:
-                # Validate token
-                UntypedToken(token)
-                
-                # Decode token to get user info
-                decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-                user_id = decoded_data.get('user_id')
-                
-                if user_id:
-                    user = await self.get_user(user_id)
-                    scope['user'] = user
-                else:
-                    scope['user'] = AnonymousUser()
-            except Exception:
-                scope['user'] = AnonymousUser()
-        else:
-            scope['user'] = AnonymousUser()
-        
+                scope = dict(scope, user=await averify_token(token))
+            except AuthenticationFailed:
+                pass
         return await super().__call__(scope, receive, send)
-    
-    @database_sync_to_async  
-    def get_user(self, user_id):
-        try:
-            from django.contrib.auth import get_user_model
-            User = get_user_model()
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return AnonymousUser()
-        except Exception:
-            return AnonymousUser()
+
 
 def JWTAuthMiddlewareStack(inner):
-    return JWTAuthMiddleware(AuthMiddlewareStack(inner))
\ No newline at end of file
+    return AuthMiddlewareStack(JWTAuthMiddleware(inner))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 02:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Not initial: databases adopted with migrate --fake-initial still build these
+
+    dependencies = [
+        ('chat', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['room', 'timestamp'], name='message_room_timestamp_idx'),
+        ),
+    ]
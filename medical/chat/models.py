@@ -99,6 +99,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['room', 'timestamp'], name='message_room_timestamp_idx'),
+            models.Index(fields=['room', 'id'], name='message_room_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sender.first_name}: {self.message[:20]}"
@@ -0,0 +1,154 @@
+"""
+Micro-batched persistence for messages received over the chat WebSocket.
+
+ChatConsumer.receive awaits submit() instead of writing the row itself.
+Messages queue per event loop and are written together with one
+bulk_create when CHAT_MESSAGE_BATCH_SIZE of them are waiting or
+CHAT_MESSAGE_BATCH_WINDOW_MS after the first one arrived, whichever comes
+first. Each submit() resolves with the row's real id and timestamp once
+its batch has committed, so the sender can be acked and peers can be sent
+the stored message.
+
+Batches are written on the thread database_sync_to_async shares, so they
+commit in arrival order. A batch costs one room lookup (membership and
+status for every room in it) plus the INSERT; senders who aren't members
+of a room, or rooms that can't take messages, get MessageRejected.
+"""
+import asyncio
+import weakref
+from collections import defaultdict
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .models import ChatRoom, Message
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_WINDOW_MS = 20
+
+
+class MessageRejected(Exception):
+    pass
+
+
+def _batch_size():
+    return getattr(settings, 'CHAT_MESSAGE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+
+def _batch_window():
+    return getattr(settings, 'CHAT_MESSAGE_BATCH_WINDOW_MS', DEFAULT_BATCH_WINDOW_MS) / 1000.0
+
+
+def _room_errors(messages):
+    """{index: reason} for messages their sender may not post."""
+    rooms = {
+        room['id']: room
+        for room in ChatRoom.objects.filter(id__in={message.room_id for message in messages})
+        .values('id', 'patient_id', 'doctor_id', 'status', 'is_deleted')
+    }
+    errors = {}
+    for index, message in enumerate(messages):
+        room = rooms.get(message.room_id)
+        if room is None:
+            errors[index] = "Chat room not found."
+        elif message.sender_id not in (room['patient_id'], room['doctor_id']):
+            errors[index] = "Access denied to this room."
+        elif room['status'] != 'active' or room['is_deleted']:
+            errors[index] = "This chat room is not accepting messages."
+    return errors
+
+
+def _fill_ids(messages):
+    # Backends that can't return ids from a multi-row INSERT (MySQL): read
+    # them back by (room, sender, timestamp); timestamps are per row.
+    timestamps = [message.timestamp for message in messages]
+    rows = Message.objects.filter(
+        room_id__in={message.room_id for message in messages},
+        timestamp__gte=min(timestamps),
+        timestamp__lte=max(timestamps),
+    ).order_by('id').values_list('id', 'room_id', 'sender_id', 'timestamp')
+    ids = defaultdict(list)
+    for message_id, room_id, sender_id, timestamp in rows:
+        ids[(room_id, sender_id, timestamp)].append(message_id)
+    for message in messages:
+        candidates = ids[(message.room_id, message.sender_id, message.timestamp)]
+        message.id = candidates.pop(0) if candidates else None
+
+
+def write_messages(messages):
+    """
+    bulk_create the unsaved Message instances that may be posted. Returns a
+    list with, per message, either the saved instance or a MessageRejected.
+    """
+    errors = _room_errors(messages)
+    accepted = [message for index, message in enumerate(messages) if index not in errors]
+    if accepted:
+        with transaction.atomic():
+            Message.objects.bulk_create(accepted)
+            missing = [message for message in accepted if message.pk is None]
+            if missing:
+                _fill_ids(missing)
+    return [MessageRejected(errors[index]) if index in errors else message for index, message in enumerate(messages)]
+
+
+class MessageBatcher:
+    """Queue of unsaved messages for one event loop, flushed by size or time."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._pending = []
+        self._timer = None
+        # The loop only keeps weak references to tasks; hold on to running writes
+        self._tasks = set()
+
+    def submit(self, room_id, sender_id, text):
+        future = self._loop.create_future()
+        self._pending.append((Message(room_id=room_id, sender_id=sender_id, message=text), future))
+        if len(self._pending) >= _batch_size():
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(_batch_window(), self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._write(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, batch):
+        try:
+            results = await database_sync_to_async(write_messages)([message for message, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+_batchers = weakref.WeakKeyDictionary()
+
+
+async def submit(room_id, sender_id, text):
+    """
+    Queue a message for the next batch and wait for it to commit. Returns
+    the saved Message (id and timestamp set); raises MessageRejected, or
+    the database error that failed the batch.
+    """
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = MessageBatcher(loop)
+    return await batcher.submit(room_id, sender_id, text)
@@ -0,0 +1,46 @@
+"""
+Room membership and status as seen by live WebSocket connections.
+
+ChatConsumer loads a room's state once at connect (one values() query)
+and keeps it for the connection's lifetime. RoomManagementView pushes
+every status change to the room's group so connected consumers update
+their copy; checking a message against it needs no database round trip.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from .models import ChatRoom
+
+
+def room_group_name(room_id):
+    return f'chat_{room_id}'
+
+
+def load_room_state(room_id):
+    """{"member_ids", "status", "is_deleted"} for the room, or None if it doesn't exist."""
+    row = ChatRoom.objects.filter(id=room_id).values('patient_id', 'doctor_id', 'status', 'is_deleted').first()
+    if row is None:
+        return None
+    return {
+        'member_ids': frozenset((row['patient_id'], row['doctor_id'])),
+        'status': row['status'],
+        'is_deleted': row['is_deleted'],
+    }
+
+
+def can_send_messages(state):
+    """Same rule as ChatRoom.can_send_messages, on a cached state."""
+    return state['status'] == 'active' and not state['is_deleted']
+
+
+def broadcast_room_state(room):
+    """Tell the room's live connections about its current status."""
+    try:
+        async_to_sync(get_channel_layer().group_send)(room_group_name(room.id), {
+            'type': 'room_state_changed',
+            'status': room.status,
+            'is_deleted': room.is_deleted,
+        })
+    except Exception as e:
+        # The change is saved; connections re-read the state when they reconnect
+        print(f"[Chat] Could not push state of room {room.id}: {str(e)}")
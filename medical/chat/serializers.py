@@ -16,6 +16,8 @@ class MessageSerializer(serializers.ModelSerializer):
 
     def get_is_read(self, obj):
         """Check if current user has read this message"""
+        if hasattr(obj, 'read_by_user'):
+            return obj.read_by_user
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.is_read_by(request.user)
@@ -23,6 +25,8 @@ class MessageSerializer(serializers.ModelSerializer):
     
     def get_read_by_count(self, obj):
         """Get count of users who have read this message"""
+        if hasattr(obj, 'read_by_total'):
+            return obj.read_by_total
         return obj.read_by.count()
 
 class ChatRoomSerializer(serializers.ModelSerializer):
@@ -52,6 +56,9 @@ class ChatRoomSerializer(serializers.ModelSerializer):
     
     def get_unread_count(self, obj):
         """Get unread message count for current user in this room"""
+        if hasattr(obj, 'unread_count'):
+            # Annotated by chat.unread.with_unread_counts
+            return obj.unread_count
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             user = request.user
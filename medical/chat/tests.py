@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.utils import timezone
@@ -731,4 +731,348 @@ class DoctorPatientCommunicationTest(TestCase):
         self.chatroom.soft_delete()
         self.assertFalse(self.chatroom.can_send_messages())
         self.assertTrue(self.chatroom.is_deleted)
-        self.assertEqual(self.chatroom.status, 'archived')
\ No newline at end of file
+        self.assertEqual(self.chatroom.status, 'archived')
+
+
+class ChatRoomFixture:
+    def setUp(self):
+        self.doctor_user = User.objects.create_user(
+            email='doctor@test.com', password='password123', first_name='Dr. Test', role='doctor'
+        )
+        self.patient_user = User.objects.create_user(
+            email='patient@test.com', password='password123', first_name='Patient Test', role='patient'
+        )
+        self.outsider = User.objects.create_user(
+            email='outsider@test.com', password='password123', first_name='Outsider', role='patient'
+        )
+        availability = AppointmentAvailability.objects.create(
+            doctor=self.doctor_user,
+            start_time=timezone.now() + timezone.timedelta(days=1),
+            end_time=timezone.now() + timezone.timedelta(days=1, hours=1),
+            slot_type='long',
+            timezone='UTC'
+        )
+        appointment = Appointment.objects.create(
+            patient=self.patient_user, availability=availability, status='booked'
+        )
+        self.chatroom = ChatRoom.objects.create(
+            patient=self.patient_user, doctor=self.doctor_user, appointment=appointment
+        )
+
+    async def connect(self, user, room_id=None):
+        import json
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from rest_framework_simplejwt.tokens import AccessToken
+        from .routing import websocket_urlpatterns
+
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns),
+            f'/ws/chat/{room_id or self.chatroom.id}/?token={AccessToken.for_user(user)}'
+        )
+        connected, code = await communicator.connect()
+        if connected:
+            self.assertEqual(json.loads(await communicator.receive_from())['type'], 'welcome')
+        return communicator, connected, code
+
+
+class ChatMessagePipelineTest(ChatRoomFixture, TransactionTestCase):
+    """WebSocket messages are persisted in micro-batches and acked with their DB id"""
+
+    def test_write_messages_saves_batch_and_rejects_non_members(self):
+        from .persistence import MessageRejected, write_messages
+
+        results = write_messages([
+            Message(room_id=self.chatroom.id, sender_id=self.patient_user.id, message='one'),
+            Message(room_id=self.chatroom.id, sender_id=self.outsider.id, message='intruder'),
+            Message(room_id=self.chatroom.id, sender_id=self.doctor_user.id, message='two'),
+        ])
+
+        self.assertIsInstance(results[1], MessageRejected)
+        saved = Message.objects.order_by('id')
+        self.assertEqual([message.message for message in saved], ['one', 'two'])
+        self.assertEqual([results[0].id, results[2].id], [message.id for message in saved])
+        self.assertEqual(results[0].timestamp, saved[0].timestamp)
+
+    def test_inactive_room_rejects_messages(self):
+        from .persistence import MessageRejected, write_messages
+
+        self.chatroom.deactivate()
+        result, = write_messages([Message(room_id=self.chatroom.id, sender_id=self.patient_user.id, message='hi')])
+        self.assertIsInstance(result, MessageRejected)
+        self.assertFalse(Message.objects.exists())
+
+    def test_ids_read_back_when_backend_cannot_return_them(self):
+        from .persistence import _fill_ids
+
+        messages = [
+            Message(room_id=self.chatroom.id, sender_id=self.patient_user.id, message=str(i)) for i in range(3)
+        ]
+        Message.objects.bulk_create(messages)
+        expected = [message.id for message in messages]
+        for message in messages:
+            message.id = None
+        _fill_ids(messages)
+        self.assertEqual([message.id for message in messages], expected)
+
+    @override_settings(CHAT_MESSAGE_BATCH_SIZE=50, CHAT_MESSAGE_BATCH_WINDOW_MS=50)
+    def test_concurrent_submits_share_one_batch(self):
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from unittest import mock
+        from . import persistence
+
+        batches = []
+        running = []
+        real = persistence.write_messages
+
+        def recording(messages):
+            batches.append(len(messages))
+            # The batcher holds a strong reference to the write in flight
+            running.extend(len(batcher._tasks) for batcher in list(persistence._batchers.values()))
+            return real(messages)
+
+        async def send_all():
+            saved = await asyncio.gather(*[
+                persistence.submit(self.chatroom.id, self.patient_user.id, f'message {i}') for i in range(5)
+            ])
+            await asyncio.sleep(0)
+            return saved, persistence._batchers[asyncio.get_running_loop()]._tasks
+
+        with mock.patch.object(persistence, 'write_messages', recording):
+            saved, tasks_after = async_to_sync(send_all)()
+        self.assertEqual(batches, [5])
+        self.assertIn(1, running)
+        self.assertEqual(tasks_after, set())
+        self.assertEqual([message.id for message in saved], list(Message.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_sender_gets_ack_and_peer_gets_stored_message(self):
+        import json
+        from asgiref.sync import async_to_sync
+
+        async def exchange():
+            patient, _, _ = await self.connect(self.patient_user)
+            doctor, _, _ = await self.connect(self.doctor_user)
+            await patient.send_to(text_data=json.dumps({'message': 'Hello doctor', 'client_id': 'c-1'}))
+            ack = json.loads(await patient.receive_from(timeout=5))
+            broadcast = json.loads(await doctor.receive_from(timeout=5))
+            own_copy = await patient.receive_nothing(timeout=0.2)
+            await patient.disconnect()
+            await doctor.disconnect()
+            return ack, broadcast, own_copy
+
+        ack, broadcast, own_copy = async_to_sync(exchange)()
+
+        stored = Message.objects.get()
+        self.assertEqual((ack['type'], ack['client_id'], ack['id']), ('ack', 'c-1', stored.id))
+        self.assertEqual(ack['timestamp'], stored.timestamp.isoformat())
+        self.assertEqual((broadcast['type'], broadcast['id'], broadcast['message']), ('message', stored.id, 'Hello doctor'))
+        self.assertEqual(broadcast['timestamp'], stored.timestamp.isoformat())
+        self.assertTrue(own_copy)
+
+
+class ChatRoomAuthorizationTest(ChatRoomFixture, TransactionTestCase):
+    """Room access is checked once at connect and kept up to date over the channel layer"""
+
+    def test_room_state_is_one_query(self):
+        from .room_state import load_room_state
+
+        with self.assertNumQueries(1):
+            state = load_room_state(self.chatroom.id)
+        self.assertEqual(state['member_ids'], {self.patient_user.id, self.doctor_user.id})
+        self.assertEqual((state['status'], state['is_deleted']), ('active', False))
+
+    def test_non_members_and_missing_rooms_are_refused(self):
+        from asgiref.sync import async_to_sync
+
+        async def attempts():
+            _, outsider_connected, outsider_code = await self.connect(self.outsider)
+            _, missing_connected, missing_code = await self.connect(self.patient_user, room_id=999999)
+            return outsider_connected, outsider_code, missing_connected, missing_code
+
+        self.assertEqual(async_to_sync(attempts)(), (False, 4003, False, 4004))
+
+    def test_status_change_reaches_live_connection(self):
+        import json
+        from asgiref.sync import async_to_sync
+        from channels.db import database_sync_to_async
+        from rest_framework.test import APIClient
+        from django.urls import reverse
+
+        client = APIClient()
+        client.force_authenticate(user=self.doctor_user)
+
+        async def deactivate_then_send():
+            patient, _, _ = await self.connect(self.patient_user)
+            response = await database_sync_to_async(client.patch)(
+                reverse('room-management', args=[self.chatroom.id]), {'action': 'deactivate'}, format='json'
+            )
+            self.assertEqual(response.status_code, 200)
+            state = json.loads(await patient.receive_from(timeout=5))
+            await patient.send_to(text_data=json.dumps({'message': 'Still there?', 'client_id': 'c-2'}))
+            error = json.loads(await patient.receive_from(timeout=5))
+            await patient.disconnect()
+            return state, error
+
+        state, error = async_to_sync(deactivate_then_send)()
+        self.assertEqual(
+            (state['type'], state['status'], state['can_send_messages']), ('room_state', 'inactive', False)
+        )
+        self.assertEqual((error['type'], error['client_id']), ('error', 'c-2'))
+        self.assertFalse(Message.objects.exists())
+
+    def test_deleted_room_closes_connection(self):
+        import json
+        from asgiref.sync import async_to_sync, sync_to_async
+        from .room_state import broadcast_room_state
+
+        async def delete_room():
+            patient, _, _ = await self.connect(self.patient_user)
+            self.chatroom.is_deleted = True
+            self.chatroom.status = 'archived'
+            await sync_to_async(broadcast_room_state)(self.chatroom)
+            state = json.loads(await patient.receive_from(timeout=5))
+            closed = await patient.receive_output(timeout=5)
+            return state, closed
+
+        state, closed = async_to_sync(delete_room)()
+        self.assertTrue(state['is_deleted'])
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': 4004})
+
+    def test_reconnect_through_middleware_uses_cached_token(self):
+        from asgiref.sync import async_to_sync
+        from channels.routing import URLRouter
+        from channels.testing import WebsocketCommunicator
+        from rest_framework_simplejwt.tokens import AccessToken
+        from users.authentication import clear_token_cache, token_cache_metrics
+        from .middleware import JWTAuthMiddlewareStack
+        from .routing import websocket_urlpatterns
+
+        clear_token_cache()
+        application = JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        token = AccessToken.for_user(self.patient_user)
+
+        async def connect(query):
+            communicator = WebsocketCommunicator(application, f'/ws/chat/{self.chatroom.id}/?{query}')
+            connected, code = await communicator.connect()
+            await communicator.disconnect()
+            return connected, code
+
+        async def reconnect():
+            return [await connect(f'token={token}'), await connect(f'token={token}'), await connect('token=bad')]
+
+        first, second, bad = async_to_sync(reconnect)()
+        self.assertTrue(first[0] and second[0])
+        self.assertEqual(bad, (False, 4001))
+        metrics = token_cache_metrics()
+        self.assertEqual((metrics['hits'], metrics['size']), (1, 1))
+
+
+class MessageDeltaSyncTest(ChatRoomFixture, APITestCase):
+    """GET messages/<room_id>/ pages by id and answers 304 to an up-to-date client"""
+
+    def setUp(self):
+        super().setUp()
+        self.messages = Message.objects.bulk_create([
+            Message(room=self.chatroom, sender=self.doctor_user if i % 2 else self.patient_user, message=f'm{i}')
+            for i in range(120)
+        ])
+        self.ids = list(Message.objects.filter(room=self.chatroom).order_by('id').values_list('id', flat=True))
+        self.url = f'/api/v1/chat/messages/{self.chatroom.id}/'
+        self.client.force_authenticate(user=self.patient_user)
+
+    def test_default_page_is_latest_messages(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([m['id'] for m in response.data], self.ids[-50:])
+        self.assertIn('ETag', response)
+
+    def test_since_and_before_ids(self):
+        response = self.client.get(self.url, {'since_id': self.ids[99], 'limit': 500})
+        self.assertEqual([m['id'] for m in response.data], self.ids[100:])
+        response = self.client.get(self.url, {'before_id': self.ids[10], 'limit': 5})
+        self.assertEqual([m['id'] for m in response.data], self.ids[5:10])
+        with override_settings(CHAT_MESSAGE_MAX_PAGE_SIZE=30):
+            self.assertEqual(len(self.client.get(self.url, {'since_id': 1, 'limit': 500}).data), 30)
+        for params in ({'since_id': 'x'}, {'limit': 0}, {'since_id': 1, 'before_id': 5}):
+            self.assertEqual(self.client.get(self.url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_page_queries_do_not_grow_with_messages(self):
+        MessageReadStatus.objects.create(message=self.messages[1], user=self.patient_user)
+        # room, last id, page ids, messages with senders and read flags
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'limit': 200})
+        self.assertEqual(len(response.data), 120)
+        read = {m['id']: (m['is_read'], m['read_by_count']) for m in response.data}
+        self.assertEqual(read[self.ids[1]], (True, 1))
+        self.assertEqual(read[self.ids[2]], (False, 0))
+
+    def test_if_none_match_returns_304_until_room_changes(self):
+        etag = self.client.get(self.url, {'since_id': self.ids[-1]})['ETag']
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'since_id': self.ids[-1]}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        new = Message.objects.create(room=self.chatroom, sender=self.doctor_user, message='new')
+        response = self.client.get(self.url, {'since_id': self.ids[-1]}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual([m['id'] for m in response.data], [new.id])
+
+        etag = response['ETag']
+        self.assertEqual(self.client.post(f'/api/v1/chat/messages/{new.id}/mark-read/').status_code, status.HTTP_200_OK)
+        response = self.client.get(self.url, {'since_id': self.ids[-1]}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data[0]['is_read'])
+
+
+class UnreadCountQueryTest(APITestCase):
+    """Unread counts for every room come from the query that lists the rooms"""
+
+    def setUp(self):
+        self.doctor_user = User.objects.create_user(
+            email='doctor@test.com', password='password123', first_name='Dr. Test', role='doctor'
+        )
+        self.patient_user = User.objects.create_user(
+            email='patient@test.com', password='password123', first_name='Patient Test', role='patient'
+        )
+        start = timezone.now() + timezone.timedelta(days=1)
+        slots = AppointmentAvailability.objects.bulk_create([
+            AppointmentAvailability(
+                doctor=self.doctor_user, start_time=start + timezone.timedelta(hours=i),
+                end_time=start + timezone.timedelta(hours=i, minutes=30), slot_type='short', timezone='UTC'
+            )
+            for i in range(100)
+        ])
+        appointments = Appointment.objects.bulk_create([
+            Appointment(patient=self.patient_user, availability=slot, status='booked') for slot in slots
+        ])
+        self.rooms = ChatRoom.objects.bulk_create([
+            ChatRoom(patient=self.patient_user, doctor=self.doctor_user, appointment=appointment)
+            for appointment in appointments
+        ])
+        # Room i: i % 4 messages from the doctor, the first of them read; one from the patient
+        messages = Message.objects.bulk_create([
+            Message(room=room, sender=self.doctor_user, message='hi')
+            for i, room in enumerate(self.rooms) for _ in range(i % 4)
+        ] + [Message(room=room, sender=self.patient_user, message='hello') for room in self.rooms])
+        first = {}
+        for message in Message.objects.filter(sender=self.doctor_user).order_by('id'):
+            first.setdefault(message.room_id, message)
+        MessageReadStatus.objects.bulk_create([
+            MessageReadStatus(message=message, user=self.patient_user) for message in first.values()
+        ])
+        self.expected = {room.id: max(i % 4 - 1, 0) for i, room in enumerate(self.rooms)}
+        self.client.force_authenticate(user=self.patient_user)
+
+    def test_unread_count_view_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/chat/unread-count/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({room_id: room['unread_count'] for room_id, room in response.data['rooms'].items()}, self.expected)
+        self.assertEqual(response.data['total_unread'], sum(self.expected.values()))
+
+    def test_room_list_counts_are_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/chat/rooms/')
+        self.assertEqual(len(response.data), 100)
+        self.assertEqual({room['id']: room['unread_count'] for room in response.data}, self.expected)
@@ -0,0 +1,35 @@
+"""
+Unread message counts for a user's rooms in the same query that lists them.
+
+A message is unread by a user when someone else sent it and there is no
+MessageReadStatus for it and the user. with_unread_counts() annotates each
+room with a correlated COUNT over its messages, filtered with NOT EXISTS on
+the read status, so a list of rooms and their counts is one statement
+instead of one COUNT per room.
+"""
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Message, MessageReadStatus
+
+
+def unread_messages(user):
+    """Messages the user has not read, across all rooms."""
+    return Message.objects.exclude(sender=user).filter(
+        ~Exists(MessageReadStatus.objects.filter(message=OuterRef('pk'), user=user))
+    )
+
+
+def with_unread_counts(rooms, user):
+    """`rooms` annotated with unread_count for `user`."""
+    counts = (
+        unread_messages(user)
+        .filter(room=OuterRef('pk'))
+        .order_by()
+        .values('room')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return rooms.annotate(
+        unread_count=Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+    )
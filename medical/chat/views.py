@@ -7,6 +7,11 @@ from .models import Message, ChatRoom, MessageReadStatus
 from .serializers import MessageSerializer, ChatRoomSerializer
 from users.permissions import IsDoctor, IsPatient
 from .permissions import HasChatRoomAccess, CanCreateChatRoom, CanModifyMessage
+from .message_sync import (
+    InvalidSyncParams, etag_matches, last_message_id, message_window, messages_etag, parse_sync_params, touch_room,
+)
+from .room_state import broadcast_room_state
+from .unread import with_unread_counts
 
 
 class ChatRoomListCreateView(APIView):
@@ -34,7 +39,10 @@ class ChatRoomListCreateView(APIView):
         status_filter = request.query_params.get('status')
         if status_filter:
             rooms = rooms.filter(status=status_filter)
-        
+
+        rooms = with_unread_counts(
+            rooms.select_related('patient', 'doctor', 'appointment__availability'), user
+        )
         serializer = ChatRoomSerializer(rooms, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -124,15 +132,25 @@ class MessageListCreateView(APIView):
         # Validate room access
         user = request.user
         try:
-            room = ChatRoom.objects.get(id=room_id)
-            if user.id != room.patient.id and user.id != room.doctor.id:
+            room = ChatRoom.objects.only('patient_id', 'doctor_id', 'updated_at').get(id=room_id)
+            if user.id != room.patient_id and user.id != room.doctor_id:
                 return Response({"detail": "Access denied to this room."}, status=status.HTTP_403_FORBIDDEN)
         except ChatRoom.DoesNotExist:
             return Response({"detail": "Room not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        messages = Message.objects.filter(room_id=room_id).order_by('timestamp')
+        try:
+            since_id, before_id, limit = parse_sync_params(request.query_params)
+        except InvalidSyncParams as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Up to date: answer before reading any message
+        etag = messages_etag(room, user, last_message_id(room_id), since_id, before_id, limit)
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        messages = message_window(room_id, user, since_id, before_id, limit)
         serializer = MessageSerializer(messages, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK, headers={'ETag': etag})
 
     def post(self, request, room_id):
         # Validate room access before creating message
@@ -167,6 +185,7 @@ class MarkMessageAsReadView(APIView):
             
             # Mark as read
             message.mark_as_read_by(user)
+            touch_room(room.id)
             
             return Response({
                 "message": "Message marked as read",
@@ -204,6 +223,8 @@ class MarkRoomMessagesAsReadView(APIView):
             for message in unread_messages:
                 message.mark_as_read_by(user)
                 marked_count += 1
+            if marked_count:
+                touch_room(room.id)
             
             return Response({
                 "message": f"Marked {marked_count} messages as read",
@@ -222,38 +243,21 @@ class UnreadCountView(APIView):
     def get(self, request):
         user = request.user
         
-        # Get rooms where user is either patient or doctor
-        user_rooms = ChatRoom.objects.filter(
-            Q(patient=user) | Q(doctor=user)
+        # Rooms where user is either patient or doctor, with their unread counts
+        user_rooms = with_unread_counts(
+            ChatRoom.objects.filter(Q(patient=user) | Q(doctor=user)).select_related('patient', 'doctor'), user
         )
-        
-        # Count unread messages (messages not sent by user and not marked as read)
-        unread_count = Message.objects.filter(
-            room__in=user_rooms
-        ).exclude(
-            sender=user
-        ).exclude(
-            read_by__user=user
-        ).count()
-        
-        # Get unread count per room
+
         room_counts = {}
         for room in user_rooms:
-            room_unread = Message.objects.filter(
-                room=room
-            ).exclude(
-                sender=user
-            ).exclude(
-                read_by__user=user
-            ).count()
-            
             room_counts[room.id] = {
-                "unread_count": room_unread,
+                "unread_count": room.unread_count,
                 "room_info": {
                     "patient": room.patient.get_full_name(),
                     "doctor": room.doctor.get_full_name()
                 }
             }
+        unread_count = sum(room["unread_count"] for room in room_counts.values())
         
         return Response({
             "total_unread": unread_count,
@@ -324,6 +328,9 @@ class RoomManagementView(APIView):
                     {"detail": "Invalid action. Valid actions: activate, deactivate, archive, suspend, delete"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
+
+            # Live WebSocket connections keep their own copy of the room state
+            broadcast_room_state(room)
             
             return Response({
                 "message": message,
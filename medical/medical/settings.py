@@ -76,6 +76,59 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache: Redis in production (CACHE_REDIS_URL), in-process LocMem otherwise
+if os.environ.get('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['CACHE_REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
+
+AVAILABILITY_CALENDAR_CACHE_TTL = 300  # seconds
+
+# WebSocket chat messages are written in micro-batches (chat/persistence.py):
+# a batch is flushed when this many are waiting or this long after the first
+CHAT_MESSAGE_BATCH_SIZE = 100
+CHAT_MESSAGE_BATCH_WINDOW_MS = 20
+
+# Messages per page of GET chat/messages/<room_id>/ (chat/message_sync.py);
+# clients may ask for fewer or, up to the maximum, more with ?limit=
+CHAT_MESSAGE_PAGE_SIZE = 50
+CHAT_MESSAGE_MAX_PAGE_SIZE = 200
+
+# Booking concurrency control: 'pessimistic' (SELECT ... FOR UPDATE) or
+# 'optimistic' (conditional UPDATE on is_booked)
+APPOINTMENT_BOOKING_STRATEGY = os.environ.get('APPOINTMENT_BOOKING_STRATEGY', 'pessimistic')
+
+# Appointment action logs: 'sync' (written in the request), 'memory'
+# (per-process write-behind buffer) or 'redis' (shared buffer drained by the
+# flush-appointment-action-logs beat task). See appointment/audit_log.py.
+APPOINTMENT_AUDIT_BUFFER = os.environ.get('APPOINTMENT_AUDIT_BUFFER', 'sync')
+APPOINTMENT_AUDIT_REDIS_URL = os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379')
+# Action types still written in the request's transaction when buffering
+APPOINTMENT_AUDIT_DURABILITY = {
+    'cancelled': 'sync',
+    'rescheduled': 'sync',
+}
+
+# Archival (appointment/archive.py): unbooked slots this many days past,
+# and final-status appointments this many days past, move to archive tables
+APPOINTMENT_ARCHIVE_SLOT_DAYS = 30
+APPOINTMENT_ARCHIVE_APPOINTMENT_DAYS = 365
+APPOINTMENT_ARCHIVE_CHUNK_SIZE = 500
+
+# Rescheduling (appointment/rescheduling.py): deadlocks are retried this
+# many times, backing off exponentially from this many milliseconds
+RESCHEDULE_DEADLOCK_RETRIES = 3
+RESCHEDULE_RETRY_BACKOFF_MS = 50
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.mysql',
@@ -130,7 +183,7 @@ CORS_ALLOW_HEADERS = [
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -144,6 +197,12 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=10)
 }
 
+# Verified tokens -> user snapshots, per process (users/authentication.py).
+# Entries expire with the token or after the TTL, so user changes made in
+# another process are seen within it.
+JWT_USER_CACHE_TTL_SECONDS = 300
+JWT_USER_CACHE_MAX_ENTRIES = 10000
+
 
 # Static files
 STATIC_URL = 'static/'
@@ -172,3 +231,17 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+CELERY_BEAT_SCHEDULE = {
+    'expire-pending-appointments': {
+        'task': 'appointment.tasks.expire_pending_appointments',
+        'schedule': 60.0,  # seconds
+    },
+    'flush-appointment-action-logs': {
+        'task': 'appointment.tasks.flush_action_logs',
+        'schedule': 5.0,  # seconds
+    },
+    'archive-historical-appointments': {
+        'task': 'appointment.tasks.archive_historical_rows',
+        'schedule': 24 * 60 * 60.0,  # seconds
+    },
+}
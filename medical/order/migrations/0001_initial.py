@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 02:25
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('appointment', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('payment_intent', models.CharField(blank=True, max_length=100, null=True)),
+                ('stripe_session_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='appointment.appointment')),
+            ],
+            options={
+                'db_table': 'orders',
+            },
+        ),
+    ]
@@ -9,6 +9,8 @@ from .models import Order
 from appointment.models import Appointment
 from users.permissions import IsPatient
 from .serializers import OrderSerializer
+from appointment.queryset_optimizer import optimize_for_serializer
+from appointment.holds import release_hold
 from chat.models import ChatRoom
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
@@ -49,6 +51,8 @@ def stripe_webhook(request):
             appointment = order.appointment
             appointment.status = 'booked'
             appointment.save()
+            # The paid appointment now guards the slot; drop the cache hold
+            release_hold(appointment.availability_id)
         except Order.DoesNotExist:
             pass  # Optionally log this
 
@@ -179,6 +183,7 @@ class OrderListAPIView(APIView):
                     {"message": "No orders found."},
                     status=status.HTTP_200_OK,
                 )
+            orders = optimize_for_serializer(orders, OrderSerializer)
             serializer = OrderSerializer(orders, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         
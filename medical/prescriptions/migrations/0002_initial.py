@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-17 02:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('prescriptions', '0001_initial'),
+        ('supplier_products', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescription',
+            name='doctor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescriptions_written', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescriptions_received', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='prescriptiondrug',
+            name='drug',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='prescriptions.drug'),
+        ),
+        migrations.AddField(
+            model_name='prescriptiondrug',
+            name='prescription',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescribed_drugs', to='prescriptions.prescription'),
+        ),
+        migrations.AddField(
+            model_name='prescriptionsupplierproduct',
+            name='prescription',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prescribed_supplier_products', to='prescriptions.prescription'),
+        ),
+        migrations.AddField(
+            model_name='prescriptionsupplierproduct',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='supplier_products.supplierproduct'),
+        ),
+    ]
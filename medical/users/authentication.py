@@ -0,0 +1,192 @@
+"""
+JWT verification shared by the REST API (CachedJWTAuthentication), the
+async appointment views and the chat WebSocket (JWTAuthMiddleware and
+ChatConsumer).
+
+A token is decoded once, with simplejwt's configured token classes, and
+the user it names is cached in this process as a snapshot of their row,
+keyed by the SHA-256 of the raw token. An entry lives until the token's
+exp claim or JWT_USER_CACHE_TTL_SECONDS, whichever comes first, and the
+cache holds at most JWT_USER_CACHE_MAX_ENTRIES tokens, least recently
+used evicted first. A reconnecting client therefore costs neither a
+signature check nor a user query.
+
+Saving or deleting a user drops their entries here (users.signals);
+other processes see a deactivation or role change within the TTL. Every
+hit builds a fresh User instance from the snapshot, so requests never
+share a mutable object.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .models import User
+
+DEFAULT_TTL_SECONDS = 300
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class TokenCache:
+    """Bounded LRU of token hash -> (expires_at, user_id, field values), with hit/miss counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = self.expired = self.evictions = self.invalidations = 0
+
+    def _drop(self, key):
+        _, user_id, _ = self._entries.pop(key)
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, expires_at, user_id, values):
+        max_entries = getattr(settings, 'JWT_USER_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (expires_at, user_id, values)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def forget_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._drop(key)
+                self.invalidations += 1
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = TokenCache()
+
+
+def token_cache_metrics():
+    """Hit/miss counters and size of this process's token cache."""
+    return _cache.metrics()
+
+
+def clear_token_cache():
+    _cache.clear()
+
+
+def forget_user(user_id):
+    """Drop every cached token of the user (they changed or were deleted)."""
+    _cache.forget_user(user_id)
+
+
+def _key(raw_token):
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode()
+    return hashlib.sha256(raw_token).hexdigest()
+
+
+def _snapshot(user):
+    return {field.attname: getattr(user, field.attname) for field in User._meta.concrete_fields}
+
+
+def _from_snapshot(values):
+    return User.from_db(User.objects.db, list(values), list(values.values()))
+
+
+def _validate(raw_token):
+    """Decode and verify once. Returns (user lookup kwargs, expires_at); raises InvalidToken."""
+    validated = JWTAuthentication().get_validated_token(raw_token)
+    try:
+        user_id = validated[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+    ttl = getattr(settings, 'JWT_USER_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+    return {jwt_settings.USER_ID_FIELD: user_id}, min(validated['exp'], time.time() + ttl)
+
+
+def _remember(key, user, expires_at):
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    _cache.set(key, expires_at, user.pk, _snapshot(user))
+    return user
+
+
+def verify_token(raw_token):
+    """The active user `raw_token` (str or bytes) authenticates; raises AuthenticationFailed."""
+    key = _key(raw_token)
+    values = _cache.get(key)
+    if values is not None:
+        return _from_snapshot(values)
+    lookup, expires_at = _validate(raw_token)
+    try:
+        user = User.objects.get(**lookup)
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    return _remember(key, user, expires_at)
+
+
+async def averify_token(raw_token):
+    """verify_token for async callers: a hit does no I/O, a miss reads the user with the async ORM."""
+    key = _key(raw_token)
+    values = _cache.get(key)
+    if values is not None:
+        return _from_snapshot(values)
+    lookup, expires_at = _validate(raw_token)
+    try:
+        user = await User.objects.aget(**lookup)
+    except User.DoesNotExist:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    return _remember(key, user, expires_at)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication backed by the shared token cache. request.auth is not set."""
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        return verify_token(raw_token), None
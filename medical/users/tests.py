@@ -1,3 +1,4 @@
+import time
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from users.models import User, DoctorProfile, PatientProfile
@@ -174,3 +175,101 @@ class UserViewTests(APITestCase):
         self.authenticate(self.doctor_user)
         res = self.client.get(reverse("admin-user-list"))
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DashboardScheduleTests(APITestCase):
+    def setUp(self):
+        from datetime import date
+        from appointment.models import DoctorDailySchedule
+        self.admin = User.objects.create_user(email="admin@example.com", password="admin123", role="admin")
+        self.doctor = User.objects.create_user(email="doctor@example.com", password="doctor123", role="doctor")
+        self.other_doctor = User.objects.create_user(email="doctor2@example.com", password="doctor123", role="doctor")
+        for day in range(1, 11):
+            DoctorDailySchedule.objects.create(doctor=self.doctor, date=date(2030, 5, day), slots=8, booked=4, completed=2, cancelled=1)
+            DoctorDailySchedule.objects.create(doctor=self.other_doctor, date=date(2030, 5, day), slots=4, no_show=1)
+
+    def test_doctor_dashboard_reads_summary_rows(self):
+        self.client.force_authenticate(user=self.doctor)
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse("doctor-dashboard"), {"start_date": "2030-05-01", "end_date": "2030-05-05"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        schedule = res.data["schedule"]
+        self.assertEqual(len(schedule["days"]), 5)
+        self.assertEqual(schedule["totals"]["slots"], 40)
+        self.assertEqual(schedule["totals"]["cancelled"], 5)
+        self.assertEqual(schedule["totals"]["utilisation"], 0.75)
+
+    def test_admin_dashboard_totals_across_doctors(self):
+        self.client.force_authenticate(user=self.admin)
+        with self.assertNumQueries(2):
+            res = self.client.get(reverse("admin-dashboard"), {"start_date": "2030-05-01", "end_date": "2030-05-31"})
+        schedule = res.data["schedule"]
+        self.assertEqual(len(schedule["days"]), 10)
+        self.assertEqual(schedule["days"][0]["slots"], 12)
+        self.assertEqual([d["doctor_id"] for d in schedule["doctors"]], [self.doctor.id, self.other_doctor.id])
+        self.assertEqual(schedule["doctors"][1]["utilisation"], 0.25)
+        self.assertEqual(schedule["totals"]["slots"], 120)
+
+    def test_invalid_range(self):
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.get(reverse("admin-dashboard"), {"start_date": "2030-05-10", "end_date": "2030-05-01"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(reverse("admin-dashboard"), {"start_date": "May 1"})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TokenCacheTests(APITestCase):
+    def setUp(self):
+        from users.authentication import clear_token_cache
+        clear_token_cache()
+        self.admin = User.objects.create_user(email="admin@example.com", password="admin123", role="admin")
+        self.doctor = User.objects.create_user(email="doctor@example.com", password="doctor123", role="doctor")
+        self.url = reverse("doctor-profile-create")
+        self.metrics_url = reverse("token-cache-metrics")
+
+    def bearer(self, user):
+        token = str(RefreshToken.for_user(user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return token
+
+    def test_second_request_skips_user_lookup(self):
+        from users.authentication import verify_token
+        token = self.bearer(self.admin)
+        self.assertEqual(self.client.get(self.metrics_url).status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            user = verify_token(token)
+        self.assertEqual((user.pk, user.role, user.email), (self.admin.pk, "admin", "admin@example.com"))
+        self.assertIsNot(user, verify_token(token))
+        res = self.client.get(self.metrics_url)
+        self.assertEqual((res.data["hits"], res.data["misses"], res.data["size"]), (3, 1, 1))
+
+    def test_saving_user_drops_their_tokens(self):
+        from users.authentication import token_cache_metrics, verify_token
+        token = self.bearer(self.doctor)
+        verify_token(token)
+        self.doctor.is_active = False
+        self.doctor.save()
+        self.assertEqual(token_cache_metrics()["size"], 0)
+        self.assertEqual(self.client.get(self.metrics_url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_entry_expires(self):
+        from unittest import mock
+        from users.authentication import token_cache_metrics, verify_token
+        token = self.bearer(self.doctor)
+        verify_token(token)
+        with self.settings(JWT_USER_CACHE_TTL_SECONDS=60), mock.patch("users.authentication.time.time", return_value=time.time() + 301):
+            with self.assertNumQueries(1):
+                verify_token(token)
+        self.assertEqual(token_cache_metrics()["expired"], 1)
+
+    def test_bounded_and_rejects_bad_tokens(self):
+        from rest_framework.exceptions import AuthenticationFailed
+        from users.authentication import token_cache_metrics, verify_token
+        with self.settings(JWT_USER_CACHE_MAX_ENTRIES=2):
+            for _ in range(3):
+                verify_token(str(RefreshToken.for_user(self.doctor).access_token))
+        self.assertEqual(token_cache_metrics()["evictions"], 1)
+        with self.assertRaises(AuthenticationFailed):
+            verify_token("not-a-token")
+        with self.assertRaises(AuthenticationFailed):
+            verify_token(str(RefreshToken.for_user(self.doctor)))
@@ -10,6 +10,7 @@ from .views import (
     # profile endpoints
     AdminUserListView,
     AdminUserDetailView,
+    TokenCacheMetricsView,
     AdminDoctorProfileView,
     AdminDoctorProfileListView,
     AdminPatientProfileView,
@@ -29,6 +30,7 @@ urlpatterns = [
     # ───── Admin-level user management endpoints  ─────────
     path('admin/users/', AdminUserListView.as_view(), name='admin-user-list'),
     path('admin/users/<int:id>/', AdminUserDetailView.as_view(), name='admin-user-detail'),
+    path('admin/token-cache/', TokenCacheMetricsView.as_view(), name='token-cache-metrics'),
     
     
     path("<int:pk>/", UserDetailView.as_view(), name="user-detail"),
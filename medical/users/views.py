@@ -1,5 +1,7 @@
 from django.contrib.auth import authenticate
 from django.shortcuts import get_object_or_404
+from django.utils.timezone import localdate
+from datetime import datetime, timedelta
 from rest_framework import status, generics, serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -17,6 +19,11 @@ from .serializers import (
     PatientProfileSerializer,
 )
 from .permissions import IsPatient, IsDoctor, IsAdmin
+from .authentication import token_cache_metrics
+from appointment.schedule_summary import clinic_schedule_summary, doctor_schedule_summary
+
+# Widest date range the dashboards summarise in one request
+DASHBOARD_MAX_DAYS = 366
 
 # ──────────────── Login & Register ────────────────
 class LoginView(APIView):
@@ -231,6 +238,13 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated, IsAdmin]
     lookup_field = 'id'
 
+class TokenCacheMetricsView(APIView):
+    """Hit rate and size of the verified-token cache in this process."""
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request):
+        return Response(token_cache_metrics())
+
 # ───── Get User by ID ───────────────────────────────
 class UserDetailView(generics.RetrieveAPIView):
     queryset = User.objects.all()
@@ -251,27 +265,55 @@ class PatientDashboardView(APIView):
             }
         })
 
+def _schedule_window(request):
+    """
+    (start_date, end_date) from ?start_date=&end_date= (YYYY-MM-DD), by
+    default the past week and the coming week. Raises ValidationError.
+    """
+    today = localdate()
+    try:
+        start_date = (
+            datetime.strptime(request.query_params['start_date'], '%Y-%m-%d').date()
+            if request.query_params.get('start_date') else today - timedelta(days=7)
+        )
+        end_date = (
+            datetime.strptime(request.query_params['end_date'], '%Y-%m-%d').date()
+            if request.query_params.get('end_date') else today + timedelta(days=7)
+        )
+    except ValueError:
+        raise serializers.ValidationError({"error": "Dates must be in YYYY-MM-DD format."})
+    if end_date < start_date:
+        raise serializers.ValidationError({"error": "end_date must not be before start_date."})
+    if (end_date - start_date).days >= DASHBOARD_MAX_DAYS:
+        raise serializers.ValidationError({"error": f"Date range cannot exceed {DASHBOARD_MAX_DAYS} days."})
+    return start_date, end_date
+
+
 class DoctorDashboardView(APIView):
     permission_classes = [IsAuthenticated, IsDoctor]
 
     def get(self, request):
+        start_date, end_date = _schedule_window(request)
         return Response({
             "message": "Welcome to the Doctor Dashboard",
             "user": {
                 "email": request.user.email,
                 "role": request.user.role
-            }
+            },
+            "schedule": doctor_schedule_summary(request.user.id, start_date, end_date),
         })
 
 class AdminDashboardView(APIView):
     permission_classes = [IsAuthenticated, IsAdmin]
 
     def get(self, request):
+        start_date, end_date = _schedule_window(request)
         return Response({
             "message": "Welcome to the Admin Dashboard",
             "user": {
                 "email": request.user.email,
                 "role": request.user.role
-            }
+            },
+            "schedule": clinic_schedule_summary(start_date, end_date),
         })
 